@@ -0,0 +1,22 @@
+"""
+Shared fixtures for the Archi3 policy tool tests
+"""
+
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+POLICIES_DIR = Path(__file__).resolve().parent.parent
+
+# The tools import their siblings as top-level modules
+sys.path.insert(0, str(POLICIES_DIR / "tools"))
+
+@pytest.fixture
+def policies_dir(tmp_path: Path) -> Path:
+    """A scratch copy of the policy tree that tests may generate into and edit"""
+    target = tmp_path / "policies"
+    shutil.copytree(POLICIES_DIR, target, ignore=shutil.ignore_patterns(
+        "tests", "effective", "generated", "deployments", "backups", "releases", "__pycache__", ".pytest_cache"))
+    return target
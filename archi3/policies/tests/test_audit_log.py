@@ -0,0 +1,155 @@
+"""
+Tests for the batched audit log
+"""
+
+import threading
+import time
+
+import pytest
+
+from audit_log import Archi3AuditLog, parse_retention
+
+YEAR = 365 * 86400
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_750_000_000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+def _audit_log(tmp_path, clock, **kwargs):
+    return Archi3AuditLog(str(tmp_path / "audit"), clock=clock, flush_interval=0.01, **kwargs)
+
+def test_events_are_durable_after_flush_and_readable_by_category(tmp_path, clock):
+    with _audit_log(tmp_path, clock) as audit_log:
+        audit_log.log("authentication", "login", agent="@coder-manager")
+        audit_log.log("data-access", "file-access", path="/workspace/a")
+        assert audit_log.flush(timeout=5)
+
+        records = list(audit_log.read(categories=["data-access"]))
+
+    assert [record["event"] for record in records] == ["file-access"]
+    assert len(list(audit_log.read())) == 2
+    assert audit_log.verify() == []
+
+def test_failed_write_is_reported_and_retried_without_duplicates(tmp_path, clock, monkeypatch):
+    audit_log = _audit_log(tmp_path, clock).start()
+    write_batch = audit_log._write_batch
+    failures = []
+
+    def failing_once(batch):
+        if not failures:
+            failures.append(len(batch))
+            raise OSError("disk full")
+        write_batch(batch)
+    monkeypatch.setattr(audit_log, "_write_batch", failing_once)
+
+    audit_log.log("compliance", "report-filed", id=1)
+    audit_log.log("compliance", "report-filed", id=2)
+    assert not audit_log.flush(timeout=5)
+    assert audit_log.flush(timeout=5)
+    audit_log.close()
+
+    assert failures == [2]
+    assert [record["id"] for record in audit_log.read()] == [1, 2]
+    assert audit_log.stats()["write_failures"] == 1
+
+def test_partially_written_batch_is_rolled_back(tmp_path, clock, monkeypatch):
+    import audit_log as module
+    audit_log = _audit_log(tmp_path, clock).start()
+    # Open both segments first, so the only fsyncs left are the group commit of each segment
+    audit_log.log("authentication", "login", id=0)
+    audit_log.log("data-access", "read", id=0)
+    assert audit_log.flush(timeout=5)
+    fsync = module.os.fsync
+    calls = []
+
+    def failing_fsync(fd):
+        calls.append(fd)
+        if len(calls) == 2:
+            raise OSError("I/O error")
+        fsync(fd)
+    monkeypatch.setattr(module.os, "fsync", failing_fsync)
+
+    audit_log.log("authentication", "login", id=1)
+    audit_log.log("data-access", "read", id=2)
+    assert not audit_log.flush(timeout=5)
+    monkeypatch.setattr(module.os, "fsync", fsync)
+    assert audit_log.flush(timeout=5)
+    audit_log.close()
+
+    assert sorted(record["id"] for record in audit_log.read()) == [0, 0, 1, 2]
+    assert audit_log.verify() == []
+
+def test_scalar_override_never_shortens_a_class(policies_dir):
+    audit_log = Archi3AuditLog.from_policy(str(policies_dir), "production")
+
+    assert audit_log.retention["compliance-logs"] is None
+    assert audit_log.retention["audit-logs"] == parse_retention("10-years")
+    assert audit_log.retention["security-logs"] == parse_retention("7-years")
+    assert audit_log.retention["standard-logs"] == parse_retention("7-years")
+
+def test_expire_deletes_only_segments_past_their_class_retention(tmp_path, clock):
+    retention = {"standard-logs": YEAR, "compliance-logs": None}
+    with _audit_log(tmp_path, clock, retention=retention) as audit_log:
+        audit_log.log("deploy", "started")
+        audit_log.log("compliance", "report-filed")
+        audit_log.flush(timeout=5)
+
+    expired = audit_log.expire(now=clock.now + 2 * YEAR)
+
+    assert [name.split("/")[0] for name in expired] == ["standard-logs"]
+    assert [record["category"] for record in audit_log.read()] == ["compliance"]
+
+def test_read_merges_classes_in_time_order_and_streams_members(tmp_path, clock, monkeypatch):
+    with _audit_log(tmp_path, clock, bucket_seconds=60) as audit_log:
+        for i in range(6):
+            clock.now += 30
+            audit_log.log("authentication" if i % 2 else "deploy", "event", id=i)
+            assert audit_log.flush(timeout=5)
+
+    opened = []
+    read_member = audit_log._read_member
+    monkeypatch.setattr(audit_log, "_read_member", lambda *args: opened.append(args) or read_member(*args))
+
+    records = audit_log.read()
+    assert next(records)["id"] == 0
+    assert len(opened) == 1
+    assert [record["id"] for record in records] == [1, 2, 3, 4, 5]
+    assert len(opened) == 6
+
+def test_expire_refuses_while_a_writer_holds_the_directory(tmp_path, clock):
+    retention = {"standard-logs": YEAR}
+    with _audit_log(tmp_path, clock, retention=retention) as writer:
+        writer.log("deploy", "started")
+        assert writer.flush(timeout=5)
+
+        with pytest.raises(RuntimeError, match="Another process is writing the audit log"):
+            _audit_log(tmp_path, clock, retention=retention).expire(now=clock.now + 2 * YEAR)
+
+    assert len(_audit_log(tmp_path, clock, retention=retention).expire(now=clock.now + 2 * YEAR)) == 1
+
+def test_shared_writer_closes_before_another_can_take_its_place(policies_dir, monkeypatch):
+    writer = Archi3AuditLog.shared(str(policies_dir), "production")
+    close = writer.close
+    closing = threading.Event()
+
+    def slow_close():
+        closing.set()
+        time.sleep(0.2)
+        close()
+    monkeypatch.setattr(writer, "close", slow_close)
+
+    releaser = threading.Thread(target=writer.release)
+    releaser.start()
+    assert closing.wait(5)
+    reopened = Archi3AuditLog.shared(str(policies_dir), "production")
+    releaser.join()
+
+    assert reopened is not writer
+    reopened.release()
@@ -0,0 +1,103 @@
+"""
+Tests for the content-addressed backup store
+"""
+
+import pytest
+
+from backup_store import Archi3BackupStore
+
+def _write(root, files):
+    for rel, text in files.items():
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+
+def test_identical_content_is_stored_once(tmp_path):
+    source = tmp_path / "source"
+    _write(source, {"core/a.yaml": "same", "core/b.yaml": "same", "environments/prod.yaml": "prod"})
+    store = Archi3BackupStore(str(tmp_path / "backups"))
+
+    first = store.create_backup("backup-1", "prod", {"core": source / "core", "environments": source / "environments"})
+    second = store.create_backup("backup-2", "prod", {"core": source / "core", "environments": source / "environments"})
+
+    assert first["new_objects"] == 2
+    assert second["new_objects"] == 0
+    assert len(list(store.objects_dir.glob("*/*"))) == 2
+    assert store.list_backups("prod") == ["backup-1", "backup-2"]
+    assert store.latest_backup("prod") == "backup-2"
+
+def test_restore_brings_back_content_and_removes_extra_files(tmp_path):
+    source = tmp_path / "source"
+    _write(source, {"core/a.yaml": "original", "core/nested/b.yaml": "nested"})
+    store = Archi3BackupStore(str(tmp_path / "backups"))
+    store.create_backup("backup-1", "prod", {"core": source / "core"})
+
+    _write(source, {"core/a.yaml": "edited", "core/added.yaml": "new"})
+    result = store.restore("backup-1", source)
+
+    assert (source / "core" / "a.yaml").read_text() == "original"
+    assert (source / "core" / "nested" / "b.yaml").read_text() == "nested"
+    assert not (source / "core" / "added.yaml").exists()
+    assert result == {"restored": 1, "removed": 1, "files": 2}
+
+def test_index_is_rebuilt_from_manifests(tmp_path):
+    source = tmp_path / "source"
+    _write(source, {"core/a.yaml": "a"})
+    store = Archi3BackupStore(str(tmp_path / "backups"))
+    store.create_backup("backup-1", "prod", {"core": source / "core"})
+
+    for path in store.index_dir.iterdir():
+        path.unlink()
+    store.index_dir.rmdir()
+
+    assert Archi3BackupStore(str(tmp_path / "backups")).list_backups("prod") == ["backup-1"]
+
+def _dated_backups(tmp_path, store, days):
+    source = tmp_path / "source"
+    for day in days:
+        _write(source, {"core/a.yaml": f"version {day}"})
+        store.create_backup(f"backup-{day}", "prod", {"core": source / "core"})
+    index = store._load_index("prod")
+    for day in days:
+        index[f"backup-{day}"]["timestamp"] = f"2026-03-{day:02d}T12:00:00"
+    store._write_index("prod", index)
+    return source
+
+def test_prune_compacts_retained_backups_and_deletes_the_rest(tmp_path):
+    store = Archi3BackupStore(str(tmp_path / "backups"), gc_grace_seconds=0)
+    _dated_backups(tmp_path, store, [1, 2, 3, 4, 5])
+
+    result = store.prune("prod", keep_last=1, keep_daily=2, keep_weekly=0)
+
+    assert result["compacted"] == ["backup-4"]
+    assert result["deleted"] == ["backup-1", "backup-2", "backup-3"]
+    assert result["removed_objects"] == 4
+    assert store.list_backups("prod") == ["backup-4", "backup-5"]
+    assert store.load_manifest("backup-4") is None
+    assert (store.backup_dir / store._load_index("prod")["backup-4"]["archive"]).exists()
+
+def test_archived_backup_restores_after_its_objects_are_collected(tmp_path):
+    store = Archi3BackupStore(str(tmp_path / "backups"), gc_grace_seconds=0)
+    source = _dated_backups(tmp_path, store, [1, 2, 3])
+    store.prune("prod", keep_last=1, keep_daily=2, keep_weekly=0)
+
+    store.restore("backup-2", source)
+
+    assert (source / "core" / "a.yaml").read_text() == "version 2"
+
+def test_pruned_backup_can_no_longer_be_restored(tmp_path):
+    store = Archi3BackupStore(str(tmp_path / "backups"), gc_grace_seconds=0)
+    source = _dated_backups(tmp_path, store, [1, 2, 3])
+    store.prune("prod", keep_last=1, keep_daily=1, keep_weekly=0)
+
+    with pytest.raises(FileNotFoundError):
+        store.restore("backup-1", source)
+
+def test_rebuilt_index_keeps_archived_backups(tmp_path):
+    store = Archi3BackupStore(str(tmp_path / "backups"), gc_grace_seconds=0)
+    _dated_backups(tmp_path, store, [1, 2])
+    store.prune("prod", keep_last=1, keep_daily=2, keep_weekly=0)
+
+    store.rebuild_index()
+
+    assert store._load_index("prod")["backup-1"]["archive"]
@@ -0,0 +1,30 @@
+"""
+Tests for the generator benchmark harness
+"""
+
+from benchmark import Archi3GeneratorBenchmark
+
+def test_run_covers_every_scenario_and_cleans_up():
+    benchmark = Archi3GeneratorBenchmark(outputs=2, repeat=1)
+    results = benchmark.run([5], [1, 3])
+
+    operations = [(s["operation"], s["renders"]) for s in results["scenarios"]]
+    for renders in (1, 3):
+        assert ("generate_agent_policy", renders) in operations
+        assert ("generate_environment_policy", renders) in operations
+        assert ("generate_agent_policy_catalog", renders) in operations
+    assert ("list_templates", 1) in operations
+    assert ("validate_generated_policy", 1) in operations
+    assert benchmark.work_dir is None
+
+def test_compare_reports_ratios_against_matching_baseline_scenarios():
+    baseline = {"scenarios": [{"operation": "list_templates", "variables": 5, "renders": 1, "total_s": 2.0}]}
+    results = {"scenarios": [
+        {"operation": "list_templates", "variables": 5, "renders": 1, "total_s": 3.0},
+        {"operation": "list_templates", "variables": 50, "renders": 1, "total_s": 1.0}
+    ]}
+
+    comparisons = Archi3GeneratorBenchmark().compare(results, baseline)
+
+    assert len(comparisons) == 1
+    assert comparisons[0]["ratio"] == 1.5
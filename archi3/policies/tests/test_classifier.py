@@ -0,0 +1,59 @@
+"""
+Tests for complexity classification and its signature cache
+"""
+
+import pytest
+
+from classifier import Archi3ComplexityClassifier
+
+@pytest.fixture
+def classifier(policies_dir):
+    return Archi3ComplexityClassifier(str(policies_dir), cache_size=2)
+
+def _count_routing(classifier, monkeypatch):
+    calls = []
+    route_tokens = classifier.router.route_tokens
+    monkeypatch.setattr(classifier.router, "route_tokens", lambda tokens: calls.append(tokens) or route_tokens(tokens))
+    return calls
+
+def test_cache_hit_skips_routing(classifier, monkeypatch):
+    calls = _count_routing(classifier, monkeypatch)
+
+    first = classifier.classify("Fix the code and write a report")
+    second = classifier.classify("Please fix this code, then write one report")
+
+    assert not first["cached"] and second["cached"]
+    assert len(calls) == 1
+    assert {**first, "cached": True} == second
+
+def test_cached_result_matches_direct_routing(classifier):
+    text = "Analyze the data and build a dashboard for the api"
+    classifier.classify(text)
+
+    result = classifier.classify(text)
+
+    assert result["cached"]
+    assert result["domains"] == sorted(classifier.router.route(text)["domains"])
+
+def test_routing_sequence_matches_routing_the_full_text(classifier):
+    router = classifier.router
+    for text in ["security review of the deployment code", "data data code unrelated words security",
+                 "", "nothing relevant here at all"]:
+        tokens = router.tokenize(text)
+        assert router.route_tokens(list(router.routing_sequence(tokens))) == router.route(text)
+
+def test_callers_cannot_modify_the_cached_entry(classifier):
+    result = classifier.classify("Fix the code")
+    result["quality-gates"].append("tampered")
+    result["scores"].clear()
+
+    cached = classifier.classify("Fix the code")
+    assert "tampered" not in cached["quality-gates"] and cached["scores"]
+
+def test_cache_evicts_the_least_recently_used_signature(classifier):
+    for text in ["code", "data", "code", "security"]:
+        classifier.classify(text)
+
+    assert classifier.classify("code")["cached"]
+    assert not classifier.classify("data")["cached"]
+    assert classifier.cache_stats()["size"] == 2
@@ -0,0 +1,99 @@
+"""
+Tests for the database connection pool's queueing and shared query audit
+"""
+
+import threading
+import time
+
+from audit_log import Archi3AuditLog
+from db_pool import Archi3ConnectionPool
+
+def _pool(policies_dir, tmp_path, name="app"):
+    return Archi3ConnectionPool(str(policies_dir), "production", database=str(tmp_path / f"{name}.sqlite3"))
+
+def _queries(policies_dir):
+    audit_log = Archi3AuditLog.from_policy(str(policies_dir), "production")
+    return [event for event in audit_log.read(categories=["data-access"]) if event.get("event") == "database-query"]
+
+def test_two_pools_audit_into_the_shared_environment_log(policies_dir, tmp_path):
+    first = _pool(policies_dir, tmp_path, "first")
+    second = _pool(policies_dir, tmp_path, "second")
+    assert first.audit_log is second.audit_log
+
+    first.execute("SELECT 1")
+    second.execute("SELECT 2")
+    first.close()
+    second.execute("SELECT 3")
+    second.close()
+
+    assert len(_queries(policies_dir)) == 3
+
+def test_last_pool_closed_releases_the_writer(policies_dir, tmp_path):
+    with _pool(policies_dir, tmp_path) as pool:
+        pool.execute("SELECT 1")
+
+    # The environment's writer lock is free again for the next owner
+    with Archi3AuditLog.from_policy(str(policies_dir), "production") as audit_log:
+        assert audit_log.flush(timeout=5)
+    with _pool(policies_dir, tmp_path) as pool:
+        assert pool.audit_log is not audit_log
+
+def test_waiters_are_served_in_arrival_order(policies_dir, tmp_path):
+    with _pool(policies_dir, tmp_path) as pool:
+        held = [pool.acquire(timeout=5) for _ in range(pool.max_connections)]
+        order, threads = [], []
+        for name in range(3):
+            ready = threading.Event()
+
+            def wait(name=name, ready=ready):
+                ready.set()
+                connection = pool.acquire(timeout=5)
+                order.append(name)
+                pool.release(connection)
+
+            thread = threading.Thread(target=wait)
+            thread.start()
+            ready.wait(5)
+            while pool.stats()["waiting"] <= name:
+                time.sleep(0.001)
+            threads.append(thread)
+
+        for connection in held:
+            pool.release(connection)
+        for thread in threads:
+            thread.join()
+
+    assert order == [0, 1, 2]
+
+def test_pools_closing_and_reopening_concurrently_share_one_writer(policies_dir, tmp_path):
+    errors = []
+
+    def churn(name):
+        try:
+            for _ in range(20):
+                with _pool(policies_dir, tmp_path, name) as pool:
+                    pool.execute("SELECT 1")
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=churn, args=(f"pool{i}",)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(_queries(policies_dir)) == 80
+
+def test_turning_audit_queries_off_releases_the_writer(policies_dir, tmp_path):
+    pool = _pool(policies_dir, tmp_path)
+    env_policy = policies_dir / "environments" / "production.yaml"
+    env_policy.write_text(env_policy.read_text().replace("audit-queries: true", "audit-queries: false"))
+
+    assert pool.reload()
+    assert pool.audit_log is None
+
+    # Nothing holds the environment's writer lock any more
+    with Archi3AuditLog.from_policy(str(policies_dir), "production") as audit_log:
+        assert audit_log.flush(timeout=5)
+    pool.close()
@@ -0,0 +1,150 @@
+"""
+Tests for the policy deployer
+"""
+
+import fcntl
+import threading
+import time
+from contextlib import contextmanager
+
+import pytest
+
+from deployer import Archi3PolicyDeployer
+
+@pytest.fixture
+def deployer(policies_dir, monkeypatch):
+    """A deployer whose validation step passes and counts its runs"""
+    deployer = Archi3PolicyDeployer(str(policies_dir))
+    deployer.validations = 0
+
+    def validate(force=False):
+        deployer.validations += 1
+        return {"valid": True, "errors": []}
+
+    monkeypatch.setattr(deployer, "_validate_policies", validate)
+    return deployer
+
+def test_multi_environment_deploy_validates_once(deployer):
+    result = deployer.deploy_to_environments(["production", "development"])
+
+    assert result["success"]
+    assert deployer.validations == 1
+    assert set(result["results"]) == {"production", "development"}
+    assert all("validation" not in r["steps"] for r in result["results"].values())
+
+def test_failed_validation_skips_every_environment(deployer, monkeypatch):
+    monkeypatch.setattr(deployer, "_validate_policies",
+                        lambda force=False: {"valid": False, "errors": ["Policy validation failed"]})
+
+    result = deployer.deploy_to_environments(["production", "development"])
+
+    assert not result["success"]
+    assert result["skipped"] == ["production", "development"]
+    assert result["results"] == {}
+
+def test_one_failing_environment_does_not_stop_the_others(deployer):
+    result = deployer.deploy_to_environments(["production", "missing"])
+
+    assert not result["success"]
+    assert result["results"]["production"]["success"]
+    assert not result["results"]["missing"]["success"]
+
+@contextmanager
+def _held_lock(deployer, environment):
+    """Hold the environment's deploy lock as another process would"""
+    with open(deployer.locks_dir / f"{environment}.lock", 'a') as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+def test_waiting_deploys_coalesce_into_the_one_that_ran(deployer):
+    results = []
+    with _held_lock(deployer, "production"):
+        threads = [threading.Thread(target=lambda: results.append(deployer.deploy_to_environment("production")))
+                   for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.2)
+    for thread in threads:
+        thread.join()
+
+    assert all(result["success"] for result in results)
+    ran = [result for result in results if not result.get("coalesced_into")]
+    assert len(ran) == 1 and deployer.validations == 1
+    assert [result["coalesced_into"] for result in results if result.get("coalesced_into")] == \
+        [ran[0]["deployment_id"]]
+    folded = [result for result in results if result.get("coalesced_into")]
+    assert folded[0]["deployment_id"] == ran[0]["deployment_id"] != folded[0]["requested_id"]
+    assert folded[0]["release"] == ran[0]["release"]
+
+def test_waiting_deploys_with_other_options_are_not_coalesced(deployer):
+    results = {}
+    with _held_lock(deployer, "production"):
+        threads = [threading.Thread(target=lambda: results.setdefault("full", deployer.deploy_to_environment("production"))),
+                   threading.Thread(target=lambda: results.setdefault("unvalidated", deployer.deploy_to_environment(
+                       "production", validate=False)))]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.2)
+    for thread in threads:
+        thread.join()
+
+    assert all(result["success"] for result in results.values())
+    assert not any(result.get("coalesced_into") for result in results.values())
+    assert "validation" in results["full"]["steps"]
+    assert "validation" not in results["unvalidated"]["steps"]
+
+def test_deploy_after_the_last_one_finished_is_not_coalesced(deployer):
+    first = deployer.deploy_to_environment("production")
+    second = deployer.deploy_to_environment("production")
+
+    assert first["success"] and second["success"]
+    assert not second.get("coalesced_into")
+    assert deployer.validations == 2
+
+def test_lock_timeout_fails_the_deploy(deployer):
+    deployer.lock_timeout = 0.1
+    with _held_lock(deployer, "production"):
+        result = deployer.deploy_to_environment("production")
+
+    assert not result["success"]
+    assert "Timed out waiting for the production deploy lock" in result["errors"]
+
+def test_dry_run_does_not_wait_for_the_lock(deployer):
+    deployer.lock_timeout = 0.1
+    with _held_lock(deployer, "production"):
+        result = deployer.deploy_to_environment("production", dry_run=True)
+
+    assert result["success"]
+
+def test_release_rollback_restores_the_policy_tree(deployer, policies_dir):
+    env_policy = policies_dir / "environments" / "production.yaml"
+    good = env_policy.read_text()
+    first = deployer.deploy_to_environment("production")
+
+    env_policy.write_text(good.replace("audit-queries: true", "audit-queries: false"))
+    (policies_dir / "core" / "extra-policies.yaml").write_text("extra: true\n")
+    assert deployer.deploy_to_environment("production")["success"]
+
+    result = deployer.rollback_deployment("production")
+
+    assert result["success"], result["errors"]
+    assert result["to"] == first["release"]
+    assert "restore" in result["steps"]
+    assert env_policy.read_text() == good
+    assert not (policies_dir / "core" / "extra-policies.yaml").exists()
+
+    from resolver import Archi3PolicyResolver
+    policy = Archi3PolicyResolver(str(policies_dir)).load_effective("production")
+    assert policy["environment"]["mcp-servers"]["database"]["audit-queries"] is True
+
+def test_rollback_verification_fails_when_the_tree_differs(deployer, policies_dir):
+    first = deployer.deploy_to_environment("production")
+    (policies_dir / "core" / "extra-policies.yaml").write_text("extra: true\n")
+
+    result = deployer._verify_deployment("production", first["release"])
+
+    assert not result["success"]
+    assert any("core/extra-policies.yaml" in warning for warning in result["warnings"])
@@ -0,0 +1,78 @@
+"""
+Tests for the indexed deployment history
+"""
+
+import json
+
+import pytest
+
+from deployment_history import Archi3DeploymentHistory
+
+def _record(environment, timestamp, number):
+    return {"deployment_id": f"{environment}_{number}", "environment": environment,
+            "timestamp": timestamp, "success": True}
+
+def test_records_are_indexed_by_their_own_timestamp(tmp_path):
+    history = Archi3DeploymentHistory(str(tmp_path))
+    history.append(_record("production", "2026-03-01T10:00:00", 2))
+    history.append(_record("production", "2026-01-01T10:00:00", 1))
+    history.append(_record("production", "2026-05-01T10:00:00", 3))
+
+    ids = [r["deployment_id"] for r in history.read("production")]
+    assert ids == ["production_1", "production_2", "production_3"]
+    in_range = history.read("production", since="2026-02-01T00:00:00", until="2026-04-01T00:00:00")
+    assert [r["deployment_id"] for r in in_range] == ["production_2"]
+    assert [r["deployment_id"] for r in history.read("production", limit=1)] == ["production_3"]
+
+def test_read_merges_environments_in_time_order(tmp_path):
+    history = Archi3DeploymentHistory(str(tmp_path))
+    history.append(_record("production", "2026-01-02T00:00:00", 1))
+    history.append(_record("development", "2026-01-01T00:00:00", 1))
+    history.append(_record("development", "2026-01-03T00:00:00", 2))
+
+    assert [r["deployment_id"] for r in history.read()] == ["development_1", "production_1", "development_2"]
+    assert history.environments() == ["development", "production"]
+
+def test_segments_rotate_when_full(tmp_path):
+    history = Archi3DeploymentHistory(str(tmp_path), max_segment_bytes=200)
+    for number in range(5):
+        history.append(_record("production", f"2026-01-0{number + 1}T00:00:00", number))
+
+    assert len(list((tmp_path / "history").glob("segment-*.jsonl"))) > 1
+    assert len(history.read("production")) == 5
+
+def _write_legacy(tmp_path, records):
+    with open(tmp_path / "deployment-history.json", 'w') as f:
+        json.dump(records, f)
+
+def test_legacy_history_keeps_its_timestamps(tmp_path):
+    _write_legacy(tmp_path, [_record("production", "2025-06-01T12:00:00", 1),
+                             _record("production", "2025-07-01T12:00:00", 2)])
+    history = Archi3DeploymentHistory(str(tmp_path))
+
+    assert [r["deployment_id"] for r in history.read("production", until="2025-06-30T00:00:00")] == ["production_1"]
+    assert not (tmp_path / "deployment-history.json").exists()
+    assert (tmp_path / "deployment-history.json.migrated").exists()
+
+def test_interrupted_migration_resumes_without_duplicates(tmp_path, monkeypatch):
+    legacy = [_record("production", f"2025-06-0{n}T12:00:00", n) for n in range(1, 4)]
+    _write_legacy(tmp_path, legacy)
+
+    appended = []
+    original = Archi3DeploymentHistory._append_locked
+
+    def crash_after_two(self, record):
+        if len(appended) == 2:
+            raise OSError("simulated crash")
+        appended.append(record)
+        return original(self, record)
+
+    monkeypatch.setattr(Archi3DeploymentHistory, "_append_locked", crash_after_two)
+    with pytest.raises(OSError):
+        Archi3DeploymentHistory(str(tmp_path))
+    assert (tmp_path / "deployment-history.json").exists()
+
+    monkeypatch.setattr(Archi3DeploymentHistory, "_append_locked", original)
+    history = Archi3DeploymentHistory(str(tmp_path))
+
+    assert [r["deployment_id"] for r in history.read("production")] == ["production_1", "production_2", "production_3"]
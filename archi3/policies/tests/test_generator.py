@@ -0,0 +1,77 @@
+"""
+Tests for atomic, hash-skipping generator output
+"""
+
+import os
+
+from generator import Archi3PolicyGenerator
+
+WORKFLOW_VARIABLES = {"AUTHOR_NAME": "Tests", "WORKFLOW_PHASES": ["plan", "build"]}
+ENVIRONMENT_VARIABLES = {"ENVIRONMENT_NAME": "staging"}
+
+def test_regenerated_workflow_keeps_its_hash(policies_dir):
+    generator = Archi3PolicyGenerator(str(policies_dir))
+    output = generator.generate_workflow_policy("release", WORKFLOW_VARIABLES)
+    first = generator.load_manifest()
+    with open(output) as f:
+        text = f.read()
+
+    generator = Archi3PolicyGenerator(str(policies_dir))
+    generator.generate_workflow_policy("release", WORKFLOW_VARIABLES)
+
+    assert generator.get_changed_policies(first) == []
+    with open(output) as f:
+        assert f.read() == text
+
+def test_changed_workflow_is_rewritten_and_reported(policies_dir):
+    generator = Archi3PolicyGenerator(str(policies_dir))
+    generator.generate_workflow_policy("release", WORKFLOW_VARIABLES)
+    first = generator.load_manifest()
+    first = {"files": {name: dict(entry) for name, entry in first["files"].items()}}
+
+    generator.generate_workflow_policy("release", dict(WORKFLOW_VARIABLES, WORKFLOW_PHASES=["plan"]))
+
+    assert generator.get_changed_policies(first) == ["release-workflow.yaml"]
+
+def test_unchanged_environment_policy_write_is_skipped(policies_dir):
+    generator = Archi3PolicyGenerator(str(policies_dir))
+    output = policies_dir / "generated" / "staging.yaml"
+    generator.generate_environment_policy("development", ENVIRONMENT_VARIABLES)
+    mtime = output.stat().st_mtime_ns
+
+    generator.generate_environment_policy("development", ENVIRONMENT_VARIABLES)
+
+    assert output.stat().st_mtime_ns == mtime
+
+def test_writes_leave_no_temp_files(policies_dir):
+    generator = Archi3PolicyGenerator(str(policies_dir))
+    generator.generate_environment_policy("development", ENVIRONMENT_VARIABLES)
+    generator.generate_workflow_policy("release", WORKFLOW_VARIABLES)
+
+    assert not [path for path in (policies_dir / "generated").iterdir() if path.name.endswith(".tmp")]
+
+def test_loaded_manifest_is_a_copy(policies_dir):
+    generator = Archi3PolicyGenerator(str(policies_dir))
+    generator.generate_workflow_policy("release", WORKFLOW_VARIABLES)
+    first = generator.load_manifest()
+
+    generator.generate_workflow_policy("release", dict(WORKFLOW_VARIABLES, WORKFLOW_PHASES=["plan"]))
+
+    assert generator.get_changed_policies(first) == ["release-workflow.yaml"]
+    first["files"].clear()
+    assert generator.load_manifest()["files"]
+
+def test_same_size_edit_on_coarse_mtime_is_detected(policies_dir):
+    generator = Archi3PolicyGenerator(str(policies_dir))
+    output = policies_dir / "generated" / "staging.yaml"
+    generator.generate_environment_policy("development", ENVIRONMENT_VARIABLES)
+    text = output.read_text()
+
+    # An edit within the same whole-second tick leaves size and mtime as they were recorded
+    output.write_text(text.replace("development", "DEVELOPMENT"))
+    coarse = output.stat().st_mtime_ns // 1_000_000_000 * 1_000_000_000
+    os.utime(output, ns=(coarse, coarse))
+    generator._manifest["files"]["staging.yaml"]["mtime_ns"] = coarse
+
+    generator.generate_environment_policy("development", ENVIRONMENT_VARIABLES)
+    assert output.read_text() == text
@@ -0,0 +1,86 @@
+"""
+Tests for sensitive data masking
+"""
+
+import io
+
+import pytest
+
+from masking import Archi3DataMasker, PATTERN_CLASSES, luhn_valid
+
+SAMPLE = (
+    b"card 4111 1111 1111 1111 and 4111-1111-1111-1112 ssn 123-45-6789 "
+    b"password=hunter2 \"api_key\": \"abcdef0123456789\" key sk_live_abcdefghijklmnop1234 "
+    b"mail jane.doe@example.com phone (555) 123-4567 token Bearer abcdefghijklmnopqrstuvwxyz012345\n"
+)
+
+def test_mask_replaces_each_class_and_keeps_labels():
+    masked, counts = Archi3DataMasker().mask(SAMPLE)
+
+    assert b"4111 1111 1111 1111" not in masked
+    assert b"password=[MASKED:passwords]" in masked
+    assert b"\"api_key\": \"[MASKED:api-keys]\"" in masked
+    assert b"jane.doe" not in masked and b"sk_live" not in masked
+    assert counts == {"credit-card-numbers": 1, "social-security-numbers": 1, "passwords": 1,
+                      "api-keys": 3, "personal-identifiers": 2}
+
+def test_luhn_rejects_invalid_card_numbers():
+    assert luhn_valid(b"4111111111111111")
+    assert not luhn_valid(b"4111111111111112")
+
+    masked, counts = Archi3DataMasker(["credit-card-numbers"]).mask(b"card 4111-1111-1111-1112 end")
+    assert masked == b"card 4111-1111-1111-1112 end"
+    assert counts == {}
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 1000, 5000])
+def test_chunked_stream_matches_whole_buffer(chunk_size):
+    data = b"".join(SAMPLE.replace(b"hunter2", b"pw%d" % i) for i in range(40))
+    masker = Archi3DataMasker(chunk_size=chunk_size)
+    target = io.BytesIO()
+
+    result = masker.mask_stream(io.BytesIO(data), target)
+
+    assert (target.getvalue(), result["masked"]) == masker.mask(data)
+    assert result["bytes"] == len(data)
+
+def test_tail_match_split_across_chunks_masks_the_whole_address():
+    data = b"x" * 2000 + b" contact averyveryverylonglocalpart@example.com done"
+    masker = Archi3DataMasker(["personal-identifiers"], chunk_size=2030)
+    target = io.BytesIO()
+
+    masker.mask_stream(io.BytesIO(data), target)
+
+    assert target.getvalue() == masker.mask(data)[0]
+    assert b"averyvery" not in target.getvalue()
+
+@pytest.mark.parametrize("environment, patterns", [
+    ("development", []),
+    ("production", list(PATTERN_CLASSES)),
+])
+def test_from_policy_honours_boolean_overrides(policies_dir, environment, patterns):
+    assert Archi3DataMasker.from_policy(str(policies_dir), environment).patterns == patterns
+
+def test_disabled_masker_passes_data_through():
+    target = io.BytesIO()
+    masker = Archi3DataMasker([], chunk_size=16)
+
+    masker.mask_stream(io.BytesIO(SAMPLE), target)
+
+    assert target.getvalue() == SAMPLE
+    assert masker.mask(SAMPLE) == (SAMPLE, {})
+
+@pytest.mark.parametrize("secret, leaked", [
+    (b"Bearer abcdefghijklmnopqrstuvwxyz012345" + b"=" * 3000, False),
+    (b"Bearer" + b" " * 3000 + b"abcdefghijklmnopqrstuvwxyz012345", True),
+    (b"password=" + b" " * 3000 + b"abcdefghijklmnopqrstuvwxyz012345", True)
+], ids=["padding-after", "spaces-before", "spaces-after-keyword"])
+def test_match_straddling_a_chunk_boundary_stays_within_the_overlap(secret, leaked):
+    data = b"x" * 1900 + b" Authorization: " + secret + b" tail\n"
+    masker = Archi3DataMasker(["api-keys", "passwords"], chunk_size=2000)
+    target = io.BytesIO()
+
+    result = masker.mask_stream(io.BytesIO(data), target)
+
+    # No match may outgrow the chunk overlap, so chunked output is the whole-buffer output
+    assert (target.getvalue(), result["masked"]) == masker.mask(data)
+    assert (b"abcdefghijklmnopqrstuvwxyz012345" in target.getvalue()) == leaked
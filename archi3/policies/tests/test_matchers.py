@@ -0,0 +1,59 @@
+"""
+Tests for the MCP path and domain matchers
+"""
+
+import pytest
+
+from matchers import Archi3DomainMatcher, Archi3McpAccessControl, Archi3PathMatcher
+
+def test_path_entries_cover_everything_below_them():
+    matcher = Archi3PathMatcher(["/workspace"], ["/workspace/secrets"])
+
+    assert matcher.allowed("/workspace")
+    assert matcher.allowed("/workspace/project/a.py")
+    assert not matcher.allowed("/workspace/secrets/key")
+    assert not matcher.allowed("/workspacex")
+    assert not matcher.allowed("/etc/passwd")
+
+def test_path_traversal_and_relative_paths_are_rejected():
+    matcher = Archi3PathMatcher(["/workspace"], ["/etc"])
+
+    assert not matcher.allowed("/workspace/../etc/passwd")
+    assert not matcher.allowed("workspace/a.py")
+    with pytest.raises(ValueError):
+        Archi3PathMatcher(["relative/path"])
+
+def test_path_wildcard_matches_one_component():
+    matcher = Archi3PathMatcher(["/home/*/projects"])
+
+    assert matcher.allowed("/home/alex/projects/app")
+    assert not matcher.allowed("/home/alex/documents")
+
+def test_without_allowed_entries_everything_not_blocked_is_allowed():
+    assert Archi3PathMatcher(blocked=["/dev"]).allowed("/tmp/a")
+    assert not Archi3PathMatcher(blocked=["/dev"]).allowed("/dev/null")
+    assert Archi3DomainMatcher(blocked=["*.phishing.com"]).allowed("example.org")
+
+def test_domain_wildcards_cover_subdomains_only():
+    matcher = Archi3DomainMatcher(["*.github.com", "example.org"], ["*.evil.github.com"])
+
+    assert matcher.allowed("api.github.com")
+    assert matcher.allowed("https://raw.cdn.github.com/path?q=1")
+    assert not matcher.allowed("github.com")
+    assert matcher.allowed("EXAMPLE.org:443")
+    assert not matcher.allowed("www.example.org")
+    assert not matcher.allowed("x.evil.github.com")
+    assert not matcher.allowed("notgithub.com")
+
+def test_only_leading_domain_wildcards_are_accepted():
+    with pytest.raises(ValueError):
+        Archi3DomainMatcher(["api.*.com"])
+
+def test_access_control_uses_the_environment_lists(policies_dir):
+    access = Archi3McpAccessControl(str(policies_dir), "production", check_interval=3600)
+
+    assert access.path_allowed("/workspace/repo/README.md")
+    assert not access.path_allowed("/etc/shadow")
+    assert access.domain_allowed("https://en.wikipedia.org/wiki/Trie")
+    assert not access.domain_allowed("login.phishing.com")
+    assert not access.domain_allowed("example.com")
@@ -0,0 +1,35 @@
+"""
+Tests for the Merkle-hashed structural policy diff
+"""
+
+from policy_diff import Archi3PolicyDiff
+
+def test_identical_trees_share_a_root_hash_and_have_no_changes():
+    differ = Archi3PolicyDiff()
+    tree = {"a": {"b": [1, 2, {"c": "x"}]}, "d": True}
+
+    assert differ.build_tree(tree).digest == differ.build_tree({"d": True, "a": {"b": [1, 2, {"c": "x"}]}}).digest
+    assert differ.diff(tree, tree) == []
+
+def test_changed_added_and_removed_paths_are_reported():
+    differ = Archi3PolicyDiff()
+    old = {"security": {"level": "high", "rules": ["a", "b"]}, "legacy": 1}
+    new = {"security": {"level": "low", "rules": ["a", "b", "c"]}, "extra": {"x": 1}}
+
+    changes = {(change["path"], change["change"]) for change in differ.diff(old, new)}
+
+    assert changes == {("security.level", "changed"), ("security.rules[2]", "added"),
+                       ("legacy", "removed"), ("extra", "added")}
+
+def test_scalar_types_are_distinguished():
+    differ = Archi3PolicyDiff()
+
+    assert differ.diff({"port": 1}, {"port": "1"}) == [
+        {"path": "port", "change": "changed", "old": 1, "new": "1"}]
+    assert differ.diff({"on": True}, {"on": 1}) != []
+
+def test_format_change_truncates_long_values():
+    differ = Archi3PolicyDiff(max_value_length=10)
+    change = differ.diff({"k": "short"}, {"k": "x" * 50})[0]
+
+    assert differ.format_change(change) == "k: short → xxxxxxx..."
@@ -0,0 +1,69 @@
+"""
+Tests for token-bucket rate limiting
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from rate_limiter import Archi3RateLimiter, parse_rate
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+@pytest.fixture
+def limiter(policies_dir, clock):
+    limiter = Archi3RateLimiter(str(policies_dir), "production", clock=clock, check_interval=3600)
+    limiter.limits = {"web-browser": parse_rate("2/second")}
+    return limiter
+
+@pytest.mark.parametrize("rate, expected", [
+    ("10 requests/minute", (10.0, 10 / 60)),
+    ("200/hour", (200.0, 200 / 3600)),
+    ("5 req/10s", (5.0, 0.5)),
+])
+def test_parse_rate(rate, expected):
+    assert parse_rate(rate) == pytest.approx(expected)
+
+@pytest.mark.parametrize("rate", ["fast", "0/minute", "5/fortnight"])
+def test_parse_rate_rejects_bad_limits(rate):
+    with pytest.raises(ValueError):
+        parse_rate(rate)
+
+def test_bucket_allows_a_burst_then_refills(limiter, clock):
+    assert limiter.try_acquire_many([("web-browser", "a")] * 3) == [True, True, False]
+    assert limiter.try_acquire("web-browser", "b")
+    assert limiter.try_acquire("unlimited", "a")
+
+    clock.now += 0.5
+    assert limiter.try_acquire("web-browser", "a")
+    assert not limiter.try_acquire("web-browser", "a")
+
+def test_acquire_async_times_out_without_waiting_past_the_deadline(limiter):
+    limiter.try_acquire_many([("web-browser", "a")] * 2)
+
+    assert not asyncio.run(limiter.acquire_async("web-browser", "a", timeout=0.1))
+
+def test_acquire_async_reloads_off_the_event_loop(limiter, clock, monkeypatch):
+    loop_threads = []
+    reload_threads = []
+    reload = limiter.reload
+    monkeypatch.setattr(limiter, "reload", lambda force=False: reload_threads.append(threading.get_ident())
+                        or reload(force))
+
+    async def acquire():
+        loop_threads.append(threading.get_ident())
+        return await limiter.acquire_async("web-browser", "a")
+
+    clock.now += limiter.check_interval
+    assert asyncio.run(acquire())
+    assert reload_threads and loop_threads[0] not in reload_threads
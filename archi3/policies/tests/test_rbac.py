@@ -0,0 +1,87 @@
+"""
+Tests for the bitset RBAC engine
+"""
+
+import threading
+
+import yaml
+import pytest
+
+from rbac import Archi3RbacEngine
+
+@pytest.fixture
+def engine(policies_dir):
+    return Archi3RbacEngine(str(policies_dir), "production", check_interval=3600)
+
+def _edit_roles(policies_dir, edit):
+    path = policies_dir / "core" / "security-policies.yaml"
+    policy = yaml.safe_load(path.read_text())
+    edit(policy["authorization"])
+    path.write_text(yaml.safe_dump(policy, sort_keys=False))
+
+def test_matrix_and_agent_grants(engine):
+    assert engine.allowed("manager", "filesystem", "write")
+    assert not engine.allowed("manager", "filesystem", "delete")
+    assert engine.allowed("admin", "mcp-servers", "anything")
+    assert engine.allowed("@coder-manager", "api-gateway", "anything")
+    assert not engine.allowed("@writer-manager", "filesystem", "execute")
+    assert engine.allowed_many([("viewer", "filesystem", "read"), ("viewer", "policies", "write")]) == [True, False]
+
+def test_restriction_labels_are_never_granted_by_star(engine):
+    for label in ["audit-logging", "multi-factor-required", "no-modifications", "no-execution"]:
+        assert not engine.has_permission("admin", label)
+    assert engine.has_permission("admin", "task-delegation")
+    assert engine.describe()["denials"]["admin"]["constraints"] == ["audit-logging", "multi-factor-required"]
+
+def test_restriction_naming_a_permission_denies_it(engine):
+    assert engine.has_permission("manager", "agent-management")
+    assert not engine.has_permission("specialist", "agent-management")
+    assert not engine.has_permission("manager", "policy-changes")
+
+def test_no_modifications_denies_writes_even_when_granted(policies_dir):
+    def grant_viewer_writes(authorization):
+        authorization["permission-matrix"]["filesystem"]["viewer"] = ["read", "write", "execute"]
+        authorization["permission-matrix"]["mcp-servers"]["viewer"] = ["full-access"]
+    _edit_roles(policies_dir, grant_viewer_writes)
+    engine = Archi3RbacEngine(str(policies_dir), "production", check_interval=3600)
+
+    assert engine.allowed("viewer", "filesystem", "read")
+    assert not engine.allowed("viewer", "filesystem", "write")
+    assert not engine.allowed("viewer", "filesystem", "execute")
+    assert not engine.allowed("viewer", "mcp-servers", "configure")
+    assert engine.allowed("viewer", "mcp-servers", "monitor")
+    assert engine.allowed_many([("viewer", "filesystem", "write"), ("viewer", "mcp-servers", "delete")]) == [False, False]
+
+def test_explicit_denial_wins_over_a_grant(policies_dir):
+    def grant_and_deny(authorization):
+        manager = authorization["role-based-access-control"]["roles"]["manager"]
+        manager["permissions"].append("policy-changes")
+    _edit_roles(policies_dir, grant_and_deny)
+    engine = Archi3RbacEngine(str(policies_dir), "production", check_interval=3600)
+
+    assert not engine.has_permission("manager", "policy-changes")
+    assert engine.has_permission("admin", "policy-changes")
+
+def test_decisions_stay_consistent_across_reloads(policies_dir):
+    engine = Archi3RbacEngine(str(policies_dir), "production", check_interval=3600, cache_size=8)
+    _edit_roles(policies_dir, lambda authorization: authorization["permission-matrix"]["filesystem"].update(
+        {"specialist": ["read"]}))
+    errors = []
+
+    def check():
+        try:
+            for i in range(2000):
+                engine.allowed("manager", "filesystem", "write")
+                engine.allowed("viewer", f"resource-{i % 16}", "read")
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=check) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    engine.reload()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert not engine.allowed("specialist", "filesystem", "write")
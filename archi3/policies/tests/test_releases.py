@@ -0,0 +1,61 @@
+"""
+Tests for versioned releases behind the current symlink
+"""
+
+import os
+
+import pytest
+
+from backup_store import Archi3BackupStore
+from releases import Archi3ReleaseManager
+
+@pytest.fixture
+def manager(tmp_path):
+    return Archi3ReleaseManager(str(tmp_path / "releases"), Archi3BackupStore(str(tmp_path / "backups")), keep_releases=2)
+
+def _release(manager, tmp_path, release_id, text):
+    source = tmp_path / f"{release_id}.yaml"
+    source.write_text(text)
+    return manager.create_release("production", release_id, {"policy.yaml": source})
+
+def test_activate_and_rollback_flip_the_current_link(manager, tmp_path):
+    _release(manager, tmp_path, "r1", "version: 1\n")
+    _release(manager, tmp_path, "r2", "version: 2\n")
+    assert manager.activate("production", "r1") is None
+    assert manager.activate("production", "r2") == "r1"
+
+    assert manager.rollback("production") == {"from": "r2", "to": "r1"}
+    assert (manager.current_path("production") / "policy.yaml").read_text() == "version: 1\n"
+
+def test_unchanged_content_is_hardlinked_not_copied(manager, tmp_path):
+    _release(manager, tmp_path, "r1", "same\n")
+    _release(manager, tmp_path, "r2", "same\n")
+
+    first = manager.release_path("production", "r1") / "policy.yaml"
+    second = manager.release_path("production", "r2") / "policy.yaml"
+    assert os.stat(first).st_ino == os.stat(second).st_ino
+
+def test_existing_release_is_never_overwritten(manager, tmp_path):
+    _release(manager, tmp_path, "r1", "version: 1\n")
+    with pytest.raises(FileExistsError):
+        _release(manager, tmp_path, "r1", "version: 2\n")
+    assert not [path for path in (manager.releases_dir / "production").iterdir() if path.name.startswith(".staging")]
+
+def test_garbage_collect_keeps_the_current_release(manager, tmp_path):
+    for release_id in ("r1", "r2", "r3", "r4"):
+        _release(manager, tmp_path, release_id, f"{release_id}\n")
+    manager.activate("production", "r1")
+
+    assert manager.garbage_collect("production") == ["r2"]
+    assert manager.list_releases("production") == ["r1", "r3", "r4"]
+
+def test_restore_rewrites_only_differing_files(manager, tmp_path):
+    _release(manager, tmp_path, "r1", "version: 1\n")
+    tree = tmp_path / "tree"
+    tree.mkdir()
+    (tree / "policy.yaml").write_text("version: 2\n")
+
+    assert manager.differing_files("production", "r1", tree) == ["policy.yaml"]
+    assert manager.restore("production", "r1", tree)["restored"] == ["policy.yaml"]
+    assert (tree / "policy.yaml").read_text() == "version: 1\n"
+    assert manager.restore("production", "r1", tree)["restored"] == []
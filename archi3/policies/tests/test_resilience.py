@@ -0,0 +1,148 @@
+"""
+Tests for the resilience layer's shared, loop-independent concurrency cap
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from resilience import Archi3ResilientCaller, CircuitOpenError
+
+def test_async_calls_work_across_event_loops(policies_dir):
+    caller = Archi3ResilientCaller(str(policies_dir), "production", max_concurrency=1)
+
+    async def fetch(timeout):
+        await asyncio.sleep(0)
+        return "ok"
+
+    async def contended():
+        return await asyncio.gather(*[caller.call_async("catalog", fetch, timeout=1) for _ in range(3)])
+
+    # Each loop contends for the slot, which binds an asyncio primitive to the loop that waits on it
+    assert asyncio.run(contended()) == ["ok", "ok", "ok"]
+    assert asyncio.run(contended()) == ["ok", "ok", "ok"]
+    assert caller.metrics()["targets"]["catalog"]["in_flight"] == 0
+
+def test_sync_and_async_calls_share_one_cap(policies_dir):
+    caller = Archi3ResilientCaller(str(policies_dir), "production", max_concurrency=1)
+    entered, finish = threading.Event(), threading.Event()
+
+    def hold(timeout):
+        entered.set()
+        finish.wait(5)
+        return "held"
+
+    async def fetch(timeout):
+        return "ok"
+
+    holder = threading.Thread(target=caller.call, args=("catalog", hold, 5))
+    holder.start()
+    try:
+        assert entered.wait(5)
+        with pytest.raises(TimeoutError, match="No free slot for catalog"):
+            asyncio.run(caller.call_async("catalog", fetch, timeout=0.05))
+    finally:
+        finish.set()
+        holder.join()
+
+    assert asyncio.run(caller.call_async("catalog", fetch, timeout=1)) == "ok"
+
+def test_released_slot_wakes_an_async_waiter(policies_dir):
+    caller = Archi3ResilientCaller(str(policies_dir), "production", max_concurrency=1)
+    entered, finish = threading.Event(), threading.Event()
+
+    def hold(timeout):
+        entered.set()
+        finish.wait(5)
+
+    async def fetch(timeout):
+        return "ok"
+
+    holder = threading.Thread(target=caller.call, args=("catalog", hold, 5))
+    holder.start()
+    assert entered.wait(5)
+    threading.Timer(0.05, finish.set).start()
+
+    assert asyncio.run(caller.call_async("catalog", fetch, timeout=5)) == "ok"
+    holder.join()
+
+def test_cancelled_async_waiter_does_not_leak_a_slot(policies_dir):
+    caller = Archi3ResilientCaller(str(policies_dir), "production", max_concurrency=1)
+
+    async def fetch(timeout):
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    async def scenario():
+        first = asyncio.ensure_future(caller.call_async("catalog", fetch, timeout=5))
+        await asyncio.sleep(0)
+        waiting = asyncio.ensure_future(caller.call_async("catalog", fetch, timeout=5))
+        await asyncio.sleep(0.01)
+        waiting.cancel()
+        assert await first == "ok"
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        return await caller.call_async("catalog", fetch, timeout=0.5)
+
+    assert asyncio.run(scenario()) == "ok"
+
+def test_retryable_failures_trip_the_breaker(policies_dir):
+    caller = Archi3ResilientCaller(str(policies_dir), "production", failure_threshold=2, base_delay=0)
+    calls = []
+
+    def broken(timeout):
+        calls.append(timeout)
+        raise ConnectionError("down")
+
+    with pytest.raises(ConnectionError):
+        caller.call("catalog", broken)
+    with pytest.raises(CircuitOpenError):
+        caller.call("catalog", broken)
+
+    assert len(calls) == 2
+    assert caller.state("catalog") == "open"
+    assert caller.metrics()["targets"]["catalog"]["in_flight"] == 0
+
+def test_only_the_probe_itself_frees_the_half_open_slot(policies_dir):
+    now = [0.0]
+    caller = Archi3ResilientCaller(str(policies_dir), "production", failure_threshold=1, base_delay=0,
+                                   reset_timeout=30, clock=lambda: now[0])
+    release_stale, release_probe = threading.Event(), threading.Event()
+    running, probing = threading.Event(), threading.Event()
+
+    def stale(timeout):
+        running.set()
+        release_stale.wait(5)
+        raise ConnectionError("late failure")
+
+    def probe(timeout):
+        probing.set()
+        release_probe.wait(5)
+        return "probe"
+
+    def broken(timeout):
+        raise ConnectionError("down")
+
+    # Admitted while the breaker was closed, this call finishes while a probe is in flight
+    stale_thread = threading.Thread(target=lambda: pytest.raises(ConnectionError, caller.call, "catalog", stale))
+    stale_thread.start()
+    assert running.wait(5)
+    with pytest.raises(ConnectionError):
+        caller.call("catalog", broken)
+    now[0] = 31
+    probe_thread = threading.Thread(target=caller.call, args=("catalog", probe))
+    probe_thread.start()
+    assert probing.wait(5)
+
+    release_stale.set()
+    stale_thread.join()
+    now[0] = 62
+    try:
+        with pytest.raises(CircuitOpenError):
+            caller.call("catalog", lambda timeout: "second probe")
+    finally:
+        release_probe.set()
+        probe_thread.join()
+
+    assert caller.state("catalog") == "closed"
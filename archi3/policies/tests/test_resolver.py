@@ -0,0 +1,44 @@
+"""
+Tests for effective-policy resolution
+"""
+
+from resolver import Archi3PolicyResolver
+
+def test_overlays_merge_onto_core_policies_with_provenance(policies_dir):
+    resolver = Archi3PolicyResolver(str(policies_dir))
+    artifact = resolver.resolve("production")
+    audit = artifact["policy"]["security-policies"]["audit-logging"]
+
+    assert audit["log-retention"] == "7-years"
+    assert "log-levels" in audit  # untouched core keys survive the deep merge
+    assert resolver.get_provenance("production", "security-policies.audit-logging.log-retention") \
+        == "environments/production.yaml"
+    assert artifact["policy"]["environment"]["mcp-servers"]["database"]["max-connections"] == 5
+    assert "security-overrides" not in artifact["policy"]["environment"]
+
+def test_unchanged_sources_reuse_the_persisted_artifact(policies_dir):
+    first = Archi3PolicyResolver(str(policies_dir)).resolve("production")
+
+    resolver = Archi3PolicyResolver(str(policies_dir))
+    assert not resolver.is_stale("production")
+    assert resolver.resolve("production")["generated"] == first["generated"]
+
+def test_editing_a_source_makes_the_policy_stale(policies_dir):
+    resolver = Archi3PolicyResolver(str(policies_dir))
+    resolver.resolve("production")
+    previous_sources = resolver.resolve("production")["sources"]
+
+    path = policies_dir / "environments" / "production.yaml"
+    path.write_text(path.read_text().replace("max-connections: 5", "max-connections: 7"))
+
+    assert resolver.is_stale("production")
+    assert resolver.changed_sections("production", previous_sources) == [
+        "agent-policies", "security-policies", "environment"]
+    assert resolver.load_effective("production")["environment"]["mcp-servers"]["database"]["max-connections"] == 7
+
+def test_output_directory_can_live_outside_the_policy_tree(policies_dir, tmp_path):
+    resolver = Archi3PolicyResolver(str(policies_dir), output_dir=str(tmp_path / "effective"))
+    resolver.resolve("development")
+
+    assert (tmp_path / "effective" / "development.json").exists()
+    assert not (policies_dir / "effective").exists()
@@ -0,0 +1,61 @@
+"""
+Tests for routing task text through the compiled routing tables
+"""
+
+from router import Archi3TaskRouter
+
+TABLES = {
+    "domains": {
+        "code": {"primary-manager": "@coder-manager", "supporting-managers": ["@qa-manager"]},
+        "data": {"primary-manager": "@data-manager", "supporting-managers": ["@coder-manager"]},
+        "docs": {"primary-manager": "@docs-manager", "supporting-managers": []},
+    },
+    "keyword-domains": {
+        "code": ["code"],
+        "unit test": ["code"],
+        "report": ["data"],
+        "documentation": ["docs"],
+    },
+    "domain-combinations": {
+        "code+data": {"task": "development-analysis", "primary-manager": "@coder-manager",
+                      "supporting-managers": ["@data-manager"], "coordination-strategy": "parallel"},
+    },
+    "fallback": {"task": "orchestration", "primary-manager": "@orchestrator",
+                 "supporting-managers": [], "coordination-strategy": "sequential"},
+}
+
+def test_single_domain_routes_to_its_managers():
+    route = Archi3TaskRouter.from_tables(TABLES).route("Refactor the code")
+
+    assert route["task"] == "code"
+    assert route["primary-manager"] == "@coder-manager"
+    assert route["supporting-managers"] == ["@qa-manager"]
+
+def test_phrases_and_plurals_match():
+    route = Archi3TaskRouter.from_tables(TABLES).route("Add unit tests and weekly reports")
+
+    assert route["matched-keywords"] == ["report", "unit test"]
+    assert route["task"] == "development-analysis"
+
+def test_phrase_words_out_of_order_do_not_match():
+    route = Archi3TaskRouter.from_tables(TABLES).route("test the unit")
+
+    assert route["matched-keywords"] == []
+    assert route["primary-manager"] is None
+
+def test_two_domains_without_a_combination_lead_with_the_stronger():
+    route = Archi3TaskRouter.from_tables(TABLES).route("documentation documentation report")
+
+    assert route["primary-manager"] == "@docs-manager"
+    assert route["supporting-managers"] == ["@data-manager"]
+
+def test_three_domains_without_a_combination_fall_back():
+    route = Archi3TaskRouter.from_tables(TABLES).route("code report reports documentation documentation")
+
+    assert route["task"] == "orchestration"
+
+def test_route_many_matches_route():
+    router = Archi3TaskRouter.from_tables(TABLES)
+    texts = ["code", "report", "nothing here"]
+
+    assert router.route_many(texts) == [router.route(text) for text in texts]
@@ -0,0 +1,33 @@
+"""
+Tests for the compiled orchestration routing tables
+"""
+
+import json
+
+from generator import Archi3PolicyGenerator
+
+def test_tables_index_domains_keywords_and_combinations(policies_dir):
+    tables = Archi3PolicyGenerator(str(policies_dir)).load_routing_tables()
+
+    assert tables["domains"]["code-technical-focus"]["primary-manager"] == "@coder-manager"
+    assert "code-technical-focus" in tables["keyword-domains"]["code"]
+    key = Archi3PolicyGenerator.routing_key(["data-analytics-focus", "code-technical-focus"])
+    assert tables["domain-combinations"][key]["task"] == "development-analysis"
+    assert tables["fallback"]["primary-manager"] == "context-dependent"
+    assert tables["complexity-order"] == ["simple", "moderate", "complex", "enterprise"]
+
+def test_routing_key_is_order_and_duplicate_insensitive():
+    assert Archi3PolicyGenerator.routing_key(["b", "a", "b"]) == Archi3PolicyGenerator.routing_key(["a", "b"]) == "a+b"
+
+def test_tables_regenerate_when_the_orchestration_policy_changes(policies_dir):
+    generator = Archi3PolicyGenerator(str(policies_dir))
+    first = generator.load_routing_tables()
+
+    source = policies_dir / "core" / "orchestration-policies.yaml"
+    source.write_text(source.read_text().replace('"code"', '"sourcecode"', 1))
+    tables = generator.load_routing_tables()
+
+    assert "sourcecode" in tables["keyword-domains"]
+    assert tables["source"]["sha256"] != first["source"]["sha256"]
+    with open(policies_dir / "generated" / "routing-tables.json") as f:
+        assert json.load(f)["source"]["sha256"] == tables["source"]["sha256"]
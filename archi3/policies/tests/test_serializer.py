@@ -0,0 +1,29 @@
+"""
+Tests for the policy serializer
+"""
+
+import yaml
+
+from serializer import Archi3PolicySerializer
+
+DOCUMENT = {"version": "1.0.0", "zeta": {"b": 1, "a": [1, 2]}, "alpha": "{{NAME}}"}
+
+def test_dump_keeps_key_order_and_round_trips():
+    serializer = Archi3PolicySerializer()
+    text = serializer.dump(DOCUMENT)
+
+    assert [line.split(":")[0] for line in text.splitlines() if not line.startswith(" ")] == ["version", "zeta", "alpha"]
+    assert yaml.safe_load(text) == DOCUMENT
+
+def test_parallel_dump_matches_serial_dump():
+    documents = [dict(DOCUMENT, index=i) for i in range(20)]
+    serial = Archi3PolicySerializer(workers=1).dump_many(documents)
+    parallel = Archi3PolicySerializer(workers=2, min_parallel=1, chunk_size=3).dump_many(documents)
+
+    assert parallel == serial
+
+def test_stream_round_trips_every_document():
+    serializer = Archi3PolicySerializer()
+    documents = [dict(DOCUMENT, index=i) for i in range(3)]
+
+    assert serializer.load_stream(serializer.dump_stream(documents)) == documents
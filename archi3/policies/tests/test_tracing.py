@@ -0,0 +1,75 @@
+"""
+Tests for span tracing and critical-path analysis
+"""
+
+import contextvars
+import threading
+
+import pytest
+
+from tracing import Archi3Tracer, attribute_values
+
+def _span(span_id, parent, start, end):
+    return {"spanId": span_id, "parentSpanId": parent,
+            "startTimeUnixNano": str(start), "endTimeUnixNano": str(end)}
+
+def test_nested_spans_share_a_trace_and_link_to_their_parent(tmp_path):
+    tracer = Archi3Tracer(str(tmp_path / "traces.jsonl"))
+    with tracer.span("deploy", {"environment": "production", "attempt": 2}) as root:
+        with tracer.span("validate") as child:
+            pass
+
+    spans = tracer.read_trace(root.trace_id)
+
+    assert [span["name"] for span in spans] == ["deploy", "validate"]
+    assert child.trace_id == root.trace_id and child.parent_span_id == root.span_id
+    assert attribute_values(spans[0]) == {"environment": "production", "attempt": 2}
+    assert tracer.find_trace_id("environment", "production") == root.trace_id
+    assert tracer.current_span() is None
+
+def test_failed_span_is_exported_with_an_error_status(tmp_path):
+    tracer = Archi3Tracer(str(tmp_path / "traces.jsonl"))
+    with pytest.raises(RuntimeError):
+        with tracer.span("deploy") as root:
+            raise RuntimeError("target unreachable")
+
+    (record,) = tracer.read_trace(root.trace_id)
+    assert record["status"] == {"code": "STATUS_CODE_ERROR", "message": "target unreachable"}
+
+def test_copied_context_carries_the_parent_into_worker_threads(tmp_path):
+    tracer = Archi3Tracer(str(tmp_path / "traces.jsonl"))
+    spans = []
+    def work():
+        with tracer.span("worker") as span:
+            spans.append(span)
+
+    with tracer.span("deploy") as root:
+        thread = threading.Thread(target=contextvars.copy_context().run, args=(work,))
+        thread.start()
+        thread.join()
+
+    assert spans[0].parent_span_id == root.span_id
+
+def test_critical_path_follows_the_children_that_finished_last(tmp_path):
+    tracer = Archi3Tracer(str(tmp_path / "traces.jsonl"))
+    spans = [
+        _span("root", "", 0, 100),
+        _span("validate", "root", 0, 30),
+        _span("backup", "root", 5, 20),
+        _span("deploy", "root", 30, 95),
+        _span("sync", "deploy", 40, 90),
+    ]
+
+    path = [span["spanId"] for span in tracer.critical_path(spans)]
+
+    assert path == ["root", "validate", "deploy", "sync"]
+
+def test_export_failure_does_not_fail_the_traced_operation(tmp_path):
+    blocker = tmp_path / "not-a-dir"
+    blocker.write_text("")
+    tracer = Archi3Tracer(str(blocker / "traces.jsonl"))
+
+    with tracer.span("deploy"):
+        result = "done"
+
+    assert result == "done"
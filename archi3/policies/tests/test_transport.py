@@ -0,0 +1,101 @@
+"""
+Tests for delta-sync deployment to a target directory
+"""
+
+import json
+import random
+
+import pytest
+
+from transport import Archi3BlockDelta, Archi3DeltaSync, Archi3DeployTarget, LocalDirectoryTarget
+
+def _large_policy(seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    return {f"rule-{i}": {"id": rng.getrandbits(64), "action": rng.choice(["allow", "deny"])} for i in range(4000)}
+
+def _write_json(path, value):
+    path.write_text(json.dumps(value, indent=2, sort_keys=True))
+    return path
+
+def test_deploy_target_is_abstract():
+    with pytest.raises(TypeError):
+        Archi3DeployTarget()
+
+    class ManifestOnly(Archi3DeployTarget):
+        def manifest(self):
+            return {}
+
+    with pytest.raises(TypeError):
+        ManifestOnly()
+
+def test_only_changed_files_are_sent(tmp_path):
+    source = tmp_path / "source"
+    source.mkdir()
+    files = {name: source / name for name in ("a.yaml", "b.yaml")}
+    for name, path in files.items():
+        path.write_text(f"{name}: 1\n")
+    target = LocalDirectoryTarget(str(tmp_path / "target"))
+    sync = Archi3DeltaSync()
+
+    assert sync.sync(target, files)["changed"] == ["a.yaml", "b.yaml"]
+    files["a.yaml"].write_text("a.yaml: 2\n")
+    result = sync.sync(target, files)
+
+    assert result["changed"] == ["a.yaml"] and result["linked"] == 1
+    assert (target.current_path() / "a.yaml").read_text() == "a.yaml: 2\n"
+    assert sync.sync(target, files)["bytes_sent"] == 0
+
+def test_small_edit_to_a_large_file_sends_a_block_delta(tmp_path):
+    policy = _large_policy()
+    effective = _write_json(tmp_path / "production.json", policy)
+    files = {"effective/production.json": effective}
+    target = LocalDirectoryTarget(str(tmp_path / "target"))
+    sync = Archi3DeltaSync()
+    sync.sync(target, files)
+
+    policy["rule-2000"]["action"] = "quarantine"
+    _write_json(effective, policy)
+    result = sync.sync(target, files)
+
+    assert result["delta"] == ["effective/production.json"]
+    assert effective.stat().st_size > 190 * 1024
+    assert result["bytes_sent"] < 8 * 1024
+    assert (target.current_path() / "effective/production.json").read_bytes() == effective.read_bytes()
+
+def test_target_without_block_signatures_receives_whole_files(tmp_path):
+    class WholeFileTarget(LocalDirectoryTarget):
+        def block_signatures(self, rel, block_size):
+            return None
+
+    policy = _large_policy()
+    effective = _write_json(tmp_path / "production.json", policy)
+    target = WholeFileTarget(str(tmp_path / "target"))
+    sync = Archi3DeltaSync()
+    sync.sync(target, {"production.json": effective})
+    policy["rule-1"]["action"] = "quarantine"
+    _write_json(effective, policy)
+
+    result = sync.sync(target, {"production.json": effective})
+
+    assert result["delta"] == []
+    assert (target.current_path() / "production.json").read_bytes() == effective.read_bytes()
+
+@pytest.mark.parametrize("edit", [
+    lambda data: data[:5000] + b"inserted" + data[5000:],
+    lambda data: data[:5000] + data[5100:],
+    lambda data: b"prefix" + data + b"suffix",
+    lambda data: bytes(reversed(data)),
+])
+def test_block_delta_round_trips(edit):
+    codec = Archi3BlockDelta(block_size=512)
+    base = json.dumps(_large_policy(1)).encode("utf-8")[:40000]
+    new = edit(base)
+
+    assert codec.decode(codec.encode(new, codec.signatures(base)), base) == new
+
+def test_block_delta_survives_shifted_content():
+    codec = Archi3BlockDelta(block_size=512)
+    base = json.dumps(_large_policy(2)).encode("utf-8")
+    new = b"x" + base
+
+    assert len(codec.encode(new, codec.signatures(base))) < len(base) // 10
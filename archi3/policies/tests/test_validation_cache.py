@@ -0,0 +1,51 @@
+"""
+Tests for validated-content fingerprints
+"""
+
+from validation_cache import Archi3ValidationCache
+
+def test_fingerprint_is_stable_for_an_unchanged_tree(policies_dir):
+    cache = Archi3ValidationCache(str(policies_dir))
+
+    assert cache.fingerprint() == cache.fingerprint()
+
+def test_content_and_rule_edits_change_the_fingerprint(policies_dir):
+    cache = Archi3ValidationCache(str(policies_dir))
+    before = cache.fingerprint()
+
+    with open(policies_dir / "environments" / "production.yaml", 'a') as f:
+        f.write("\n# edited\n")
+    after_content = cache.fingerprint()
+    rules = policies_dir / "validation" / "rules"
+    rules.mkdir(parents=True, exist_ok=True)
+    (rules / "extra.yaml").write_text("rule: x\n")
+    after_rules = cache.fingerprint()
+
+    assert after_content["content"] != before["content"]
+    assert after_content["fingerprint"] != before["fingerprint"]
+    assert after_rules["rules"] != after_content["rules"]
+    assert after_rules["content"] == after_content["content"]
+
+def test_recorded_fingerprint_is_found_by_a_new_instance(policies_dir):
+    fingerprint = Archi3ValidationCache(str(policies_dir)).fingerprint()
+    Archi3ValidationCache(str(policies_dir)).record(fingerprint, {"errors": 0})
+
+    entry = Archi3ValidationCache(str(policies_dir)).lookup(fingerprint["fingerprint"])
+
+    assert entry["summary"] == {"errors": 0}
+    assert Archi3ValidationCache(str(policies_dir)).lookup("0" * 64) is None
+
+def test_cache_keeps_only_the_newest_entries(policies_dir):
+    cache = Archi3ValidationCache(str(policies_dir), max_entries=2)
+    for name in ("a", "b", "c"):
+        cache.record({"fingerprint": name}, {})
+
+    assert cache.lookup("a") is None
+    assert cache.lookup("b") and cache.lookup("c")
+
+def test_unreadable_cache_is_treated_as_empty(policies_dir):
+    cache = Archi3ValidationCache(str(policies_dir))
+    cache.cache_path.parent.mkdir(parents=True, exist_ok=True)
+    cache.cache_path.write_text("{not json")
+
+    assert cache.lookup("anything") is None
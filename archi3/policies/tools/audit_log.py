@@ -0,0 +1,702 @@
+#!/usr/bin/env python3
+"""
+Archi3 Audit Log
+Append-only audit log with batched group fsync, compressed time-bucketed segments and retention
+"""
+
+import json
+import os
+import sys
+import re
+import copy
+import time
+import zlib
+import fcntl
+import heapq
+import hashlib
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Iterator
+from datetime import datetime, timezone
+import argparse
+import logging
+import yaml
+
+sys.path.append(str(Path(__file__).resolve().parent))
+from resolver import Archi3PolicyResolver
+from masking import Archi3DataMasker
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# audit-logging.logged-events category -> log-retention class; other categories are standard-logs
+RETENTION_CLASSES = {
+    "authentication": "security-logs",
+    "authorization": "security-logs",
+    "security-events": "security-logs",
+    "data-access": "audit-logs",
+    "system-operations": "audit-logs",
+    "compliance": "compliance-logs"
+}
+DEFAULT_RETENTION_CLASS = "standard-logs"
+
+# Started writers handed out by Archi3AuditLog.shared(), keyed by (policies dir, environment)
+_SHARED_WRITERS = {}
+_SHARED_LOCK = threading.Lock()
+
+RETENTION_PATTERN = re.compile(r"^\s*(\d+)\s*-?\s*(day|week|month|year)s?\s*$", re.IGNORECASE)
+RETENTION_UNITS = {"day": 86400, "week": 7 * 86400, "month": 30 * 86400, "year": 365 * 86400}
+
+def parse_retention(value: Any) -> Optional[float]:
+    """Seconds to keep logs for '1-year', '7-years', '90-days'; None for 'permanent'"""
+    if value is None or str(value).strip().lower() in ("permanent", "indefinite", "forever"):
+        return None
+    match = RETENTION_PATTERN.match(str(value))
+    if not match:
+        raise ValueError(f"Unrecognized log retention: {value!r}")
+    return int(match.group(1)) * RETENTION_UNITS[match.group(2).lower()]
+
+def longer_retention(first: Optional[float], second: Optional[float]) -> Optional[float]:
+    """The longer of two retention periods, where None (permanent) is longest"""
+    if first is None or second is None:
+        return None
+    return max(first, second)
+
+class _FlushRequest:
+    """A flush() call waiting on the events queued before it; ok turns False if their write failed"""
+
+    __slots__ = ("done", "ok")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.ok = True
+
+class _Segment:
+    """A segment being appended to: one gzip member per written batch"""
+
+    def __init__(self, path: Path, retention_class: str, bucket_start: float, bucket_end: float):
+        self.path = path
+        self.file = open(path, 'ab')
+        self.index = {
+            "segment": path.name,
+            "retention-class": retention_class,
+            "bucket-start": bucket_start,
+            "bucket-end": bucket_end,
+            "events": 0,
+            "first": None,
+            "last": None,
+            "categories": {},
+            "members": []
+        }
+
+class Archi3AuditLog:
+    """Queue events without blocking, and write them from a background thread in fsync'd batches"""
+
+    SEGMENT_SUFFIX = ".jsonl.gz"
+    INDEX_SUFFIX = ".index.json"
+
+    def __init__(self, log_dir: str, retention: Dict[str, Optional[float]] = None,
+                 bucket_seconds: int = 3600, batch_size: int = 5000, flush_interval: float = 0.2,
+                 max_pending: int = 1000000, masker: Archi3DataMasker = None, enabled: bool = True,
+                 clock=time.time):
+        self.log_dir = Path(log_dir)
+        self.retention = retention or {}
+        self.bucket_seconds = bucket_seconds
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.masker = masker
+        self.enabled = enabled
+        self.clock = clock
+
+        self.written = 0
+        self.dropped = 0
+        self.write_failures = 0
+        self._reported_dropped = 0
+        self._pending = deque()
+        self._wake = threading.Event()
+        self._segments = {}
+        self._writer = None
+        self._lock_file = None
+        self._shared_key = None
+        self._users = 0
+
+    @classmethod
+    def from_policy(cls, policies_dir: str, environment: str, log_dir: str = None,
+                    **kwargs) -> "Archi3AuditLog":
+        """Writer configured by the environment's effective audit-logging policy"""
+        policy = Archi3PolicyResolver(policies_dir).load_effective(environment)
+        audit = policy.get("security-policies", {}).get("audit-logging", {})
+
+        # Environments may replace the per-class retention map with one period for everything, but an
+        # override only ever extends a class: "7-years" must not cut permanent compliance logs short
+        base = cls._core_retention(policies_dir)
+        configured = audit.get("log-retention", {})
+        if isinstance(configured, dict):
+            overrides = {name: parse_retention(value) for name, value in configured.items()}
+        else:
+            period = parse_retention(configured)
+            overrides = {name: period for name in set(RETENTION_CLASSES.values()) | {DEFAULT_RETENTION_CLASS}}
+        retention = dict(base)
+        for name, period in overrides.items():
+            retention[name] = longer_retention(base[name], period) if name in base else period
+
+        masker = None
+        if audit.get("sensitive-data-masking"):
+            masker = Archi3DataMasker.from_policy(policies_dir, environment)
+
+        log_dir = log_dir or str(Path(policies_dir) / "deployments" / "audit" / environment)
+        return cls(log_dir, retention=retention, masker=masker, enabled=audit.get("enabled", True), **kwargs)
+
+    @classmethod
+    def shared(cls, policies_dir: str, environment: str) -> "Archi3AuditLog":
+        """This process's started writer for an environment's audit log, shared by every caller
+
+        Only one writer may hold an audit directory, so components that record into the environment's
+        log take this one instead of starting their own; pair each call with release().
+        """
+        key = (str(Path(policies_dir).resolve()), environment)
+        with _SHARED_LOCK:
+            audit_log = _SHARED_WRITERS.get(key)
+            if audit_log is None:
+                audit_log = cls.from_policy(policies_dir, environment).start()
+                audit_log._shared_key = key
+                _SHARED_WRITERS[key] = audit_log
+            audit_log._users += 1
+            return audit_log
+
+    def release(self):
+        """Give back a writer taken with shared(): flush it, and close it once its last user is done"""
+        with _SHARED_LOCK:
+            self._users -= 1
+            if self._users <= 0:
+                # Close before unregistering: a shared() call waits here rather than starting a
+                # second writer while this one still holds the directory lock
+                self.close()
+                _SHARED_WRITERS.pop(self._shared_key, None)
+                return
+        self.flush()
+
+    @staticmethod
+    def _core_retention(policies_dir: str) -> Dict[str, Optional[float]]:
+        """Per-class retention of the core security policy, before any environment override"""
+        core_path = Path(policies_dir) / "core" / "security-policies.yaml"
+        if not core_path.exists():
+            return {}
+        with open(core_path, 'r') as f:
+            core = yaml.safe_load(f) or {}
+        configured = core.get("audit-logging", {}).get("log-retention", {})
+        if not isinstance(configured, dict):
+            return {}
+        return {name: parse_retention(value) for name, value in configured.items()}
+
+    @staticmethod
+    def audited_servers(policies_dir: str, environment: str) -> List[str]:
+        """MCP servers whose environment policy requires their operations to be audited"""
+        policy = Archi3PolicyResolver(policies_dir).load_effective(environment)
+        servers = policy.get("environment", {}).get("mcp-servers", {}) or {}
+        return sorted(server for server, config in servers.items()
+                      if any((config or {}).get(key) for key in ("audit-logging", "audit-queries", "audit-commits")))
+
+    def start(self) -> "Archi3AuditLog":
+        """Take the writer lock, seal segments left by a previous writer and start the writer thread"""
+        if not self.enabled or self._writer is not None:
+            return self
+        self._lock_file = self._take_lock()
+
+        self._recover()
+        self.expire()
+        self._writer = threading.Thread(target=self._run, name="archi3-audit-writer", daemon=True)
+        self._writer.start()
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def log(self, category: str, event: str, **fields) -> bool:
+        """Queue an event; never blocks, returns False if it had to be dropped"""
+        if not self.enabled:
+            return False
+        pending = self._pending
+        if len(pending) >= self.max_pending:
+            self.dropped += 1
+            return False
+        # deque.append is atomic, so the hot path takes no lock
+        pending.append((self.clock(), category, event, fields))
+        if len(pending) == self.batch_size:
+            self._wake.set()
+        return True
+
+    def flush(self, timeout: float = None) -> bool:
+        """Wait until every event queued so far is written and fsync'd
+
+        False if the wait timed out or the write failed; failed events stay queued and are retried.
+        """
+        if self._writer is None:
+            return True
+        request = _FlushRequest()
+        self._pending.append(request)
+        self._wake.set()
+        return request.done.wait(timeout) and request.ok
+
+    def close(self):
+        """Write everything queued, seal the open segments and stop the writer"""
+        if self._writer is None:
+            return
+        self._pending.append(None)
+        self._wake.set()
+        self._writer.join()
+        self._writer = None
+        fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+        self._lock_file.close()
+        self._lock_file = None
+
+    def expire(self, now: float = None) -> List[str]:
+        """Delete sealed segments older than the retention of their class
+
+        Deleting needs the writer lock, so a running writer cannot be sealing or indexing a segment
+        as it goes; without a started writer the lock is taken for the call, and RuntimeError is
+        raised if another writer holds it.
+        """
+        if self._lock_file is not None:
+            return self._expire(now)
+        lock_file = self._take_lock()
+        try:
+            return self._expire(now)
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            lock_file.close()
+
+    def _expire(self, now: float = None) -> List[str]:
+        now = self.clock() if now is None else now
+        expired = []
+        for index_path in sorted(self.log_dir.glob(f"*/*{self.INDEX_SUFFIX}")):
+            retention_class = index_path.parent.name
+            period = self.retention.get(retention_class, self.retention.get(DEFAULT_RETENTION_CLASS))
+            if period is None:
+                continue
+            index = self._load_index(index_path)
+            if index is None or index["bucket-end"] + period > now:
+                continue
+            segment_path = index_path.parent / index["segment"]
+            if segment_path.exists():
+                segment_path.unlink()
+            index_path.unlink()
+            expired.append(f"{retention_class}/{index['segment']}")
+        if expired:
+            logger.info(f"Expired {len(expired)} audit log segment(s)")
+        return expired
+
+    def read(self, start: float = None, end: float = None,
+             categories: List[str] = None) -> Iterator[Dict[str, Any]]:
+        """Events with start <= ts < end in time order, using segment indexes to skip what is out of range
+
+        Events are streamed: a batch member is only decompressed once the merge reaches its first
+        timestamp, so memory holds the members that overlap in time rather than the whole log.
+        """
+        classes = None
+        if categories:
+            classes = {RETENTION_CLASSES.get(category, DEFAULT_RETENTION_CLASS) for category in categories}
+
+        members = []
+        for segment_path in self.log_dir.glob(f"*/*{self.SEGMENT_SUFFIX}"):
+            if classes is not None and segment_path.parent.name not in classes:
+                continue
+            index = self._load_index(self._index_path(segment_path)) or self._scan(segment_path)
+            if index["events"] == 0 or (start is not None and index["last"] < start) or \
+                    (end is not None and index["first"] >= end):
+                continue
+            for member in index["members"]:
+                if (start is not None and member["last"] < start) or (end is not None and member["first"] >= end):
+                    continue
+                members.append((member["first"], str(segment_path), member["offset"], member["length"]))
+        members.sort()
+
+        # k-way merge on ts that opens a member only when no open one holds an earlier event
+        heap = []
+        opened = 0
+        while heap or opened < len(members):
+            while opened < len(members) and (not heap or members[opened][0] <= heap[0][0]):
+                _, segment_path, offset, length = members[opened]
+                records = iter(self._read_member(Path(segment_path), offset, length, start, end, categories))
+                record = next(records, None)
+                if record is not None:
+                    heapq.heappush(heap, (record["ts"], opened, record, records))
+                opened += 1
+            if not heap:
+                continue
+            _, order, record, records = heap[0]
+            following = next(records, None)
+            if following is None:
+                heapq.heappop(heap)
+            else:
+                heapq.heapreplace(heap, (following["ts"], order, following, records))
+            yield record
+
+    def _read_member(self, segment_path: Path, offset: int, length: int, start: Optional[float],
+                     end: Optional[float], categories: Optional[List[str]]) -> List[Dict[str, Any]]:
+        """Matching events of one batch member, in time order"""
+        with open(segment_path, 'rb') as f:
+            f.seek(offset)
+            data = zlib.decompress(f.read(length), wbits=31)
+        records = []
+        for line in data.splitlines():
+            record = json.loads(line)
+            if (start is None or record["ts"] >= start) and (end is None or record["ts"] < end) and \
+                    (not categories or record["category"] in categories):
+                records.append(record)
+        records.sort(key=lambda record: record["ts"])
+        return records
+
+    def verify(self) -> List[str]:
+        """Check every sealed segment against the digest in its index"""
+        problems = []
+        for index_path in sorted(self.log_dir.glob(f"*/*{self.INDEX_SUFFIX}")):
+            index = self._load_index(index_path)
+            if index is None:
+                problems.append(f"{index_path}: unreadable index")
+                continue
+            segment_path = index_path.parent / index["segment"]
+            if not segment_path.exists():
+                problems.append(f"{segment_path}: missing")
+            elif self._file_digest(segment_path) != index.get("sha256"):
+                problems.append(f"{segment_path}: digest mismatch")
+        return problems
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "log_dir": str(self.log_dir),
+            "enabled": self.enabled,
+            "pending": len(self._pending),
+            "written": self.written,
+            "dropped": self.dropped,
+            "write_failures": self.write_failures,
+            "open_segments": len(self._segments)
+        }
+
+    def _run(self):
+        """Writer thread: drain the queue in batches, one fsync per touched segment per batch"""
+        pending = self._pending
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+
+            stop = False
+            while True:
+                batch = []
+                waiters = []
+                while len(batch) < self.batch_size:
+                    try:
+                        item = pending.popleft()
+                    except IndexError:
+                        break
+                    if item is None:
+                        stop = True
+                    elif isinstance(item, _FlushRequest):
+                        waiters.append(item)
+                    else:
+                        batch.append(item)
+
+                if self.dropped > self._reported_dropped:
+                    # Leave a record of the gap instead of losing it silently
+                    batch.append((self.clock(), "security-events", "audit-events-dropped",
+                                  {"count": self.dropped - self._reported_dropped}))
+                    self._reported_dropped = self.dropped
+
+                failed = False
+                if batch:
+                    try:
+                        self._write_batch(batch)
+                    except Exception as e:
+                        # Put the batch back in order for the next round, and tell its flushers it is not durable
+                        failed = True
+                        self.write_failures += 1
+                        pending.extendleft(reversed(batch))
+                        logger.error(f"Audit log write failed, {len(batch)} events requeued: {e}")
+                        for waiter in waiters:
+                            waiter.ok = False
+                try:
+                    self._seal_finished_buckets()
+                except Exception as e:
+                    logger.error(f"Audit log seal failed: {e}")
+                for waiter in waiters:
+                    waiter.done.set()
+                if failed or len(batch) < self.batch_size:
+                    break
+
+            if stop:
+                unwritten = [item for item in pending if isinstance(item, tuple)]
+                if unwritten:
+                    # Last attempt for events requeued by a failed write
+                    try:
+                        self._write_batch(unwritten)
+                    except Exception as e:
+                        logger.error(f"Audit log closed with {len(unwritten)} unwritten events: {e}")
+                for key in list(self._segments):
+                    self._seal(key)
+                return
+
+    def _write_batch(self, batch: list):
+        now = self.clock()
+        bucket_start = now - now % self.bucket_seconds
+
+        lines = {}
+        for ts, category, event, fields in batch:
+            retention_class = RETENTION_CLASSES.get(category, DEFAULT_RETENTION_CLASS)
+            record = {"ts": ts, "category": category, "event": event, **fields}
+            lines.setdefault(retention_class, []).append((ts, category, json.dumps(record, default=str)))
+
+        touched = []
+        # Segment -> (length, index) before this batch, so a failed write leaves nothing behind to duplicate
+        before = {}
+        try:
+            for retention_class, entries in lines.items():
+                segment = self._segment(retention_class, bucket_start)
+                data = ("\n".join(line for _, _, line in entries) + "\n").encode("utf-8")
+                if self.masker is not None:
+                    data, _ = self.masker.mask(data)
+                compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+                member = compressor.compress(data) + compressor.flush()
+
+                offset = segment.file.tell()
+                before[segment.path] = (segment, offset, copy.deepcopy(segment.index))
+                segment.file.write(member)
+                first = min(ts for ts, _, _ in entries)
+                last = max(ts for ts, _, _ in entries)
+                index = segment.index
+                index["members"].append({"offset": offset, "length": len(member), "events": len(entries),
+                                         "first": first, "last": last})
+                index["events"] += len(entries)
+                index["first"] = first if index["first"] is None else min(index["first"], first)
+                index["last"] = last if index["last"] is None else max(index["last"], last)
+                for _, category, _ in entries:
+                    index["categories"][category] = index["categories"].get(category, 0) + 1
+                touched.append(segment)
+
+            # Group commit: the whole batch becomes durable with one fsync per segment
+            for segment in touched:
+                segment.file.flush()
+                os.fsync(segment.file.fileno())
+        except BaseException:
+            for segment, offset, index in before.values():
+                self._rollback(segment, offset, index)
+            raise
+        self.written += len(batch)
+
+    def _rollback(self, segment: _Segment, offset: int, index: Dict[str, Any]):
+        """Cut a segment back to its length before a failed batch, discarding any buffered bytes"""
+        try:
+            segment.file.close()
+        except OSError:
+            pass
+        os.truncate(segment.path, offset)
+        segment.file = open(segment.path, 'ab')
+        segment.index = index
+
+    def _segment(self, retention_class: str, bucket_start: float) -> _Segment:
+        key = (retention_class, bucket_start)
+        segment = self._segments.get(key)
+        if segment is None:
+            class_dir = self.log_dir / retention_class
+            class_dir.mkdir(parents=True, exist_ok=True)
+            stamp = datetime.fromtimestamp(bucket_start, timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+            sequence = 0
+            # A bucket sealed by an earlier writer gets a new segment rather than being reopened
+            while (class_dir / f"{stamp}-{sequence}{self.SEGMENT_SUFFIX}").exists():
+                sequence += 1
+            segment = _Segment(class_dir / f"{stamp}-{sequence}{self.SEGMENT_SUFFIX}", retention_class,
+                               bucket_start, bucket_start + self.bucket_seconds)
+            self._fsync_dir(class_dir)
+            self._segments[key] = segment
+        return segment
+
+    def _seal_finished_buckets(self):
+        now = self.clock()
+        finished = [key for key, segment in self._segments.items() if segment.index["bucket-end"] <= now]
+        for key in finished:
+            self._seal(key)
+        if finished:
+            self.expire(now)
+
+    def _seal(self, key: tuple):
+        """Close a segment and write its index, which marks it complete"""
+        segment = self._segments.pop(key)
+        segment.file.close()
+        segment.index["sha256"] = self._file_digest(segment.path)
+        self._write_index(segment.path, segment.index)
+
+    def _recover(self):
+        """Index segments a crashed writer left open, dropping a torn final batch"""
+        for segment_path in sorted(self.log_dir.glob(f"*/*{self.SEGMENT_SUFFIX}")):
+            if self._index_path(segment_path).exists():
+                continue
+            index = self._scan(segment_path)
+            with open(segment_path, 'r+b') as f:
+                f.truncate(index.pop("valid_length"))
+                f.flush()
+                os.fsync(f.fileno())
+            index["sha256"] = self._file_digest(segment_path)
+            self._write_index(segment_path, index)
+            logger.warning(f"Recovered unsealed audit segment {segment_path} ({index['events']} events)")
+
+    def _scan(self, segment_path: Path) -> Dict[str, Any]:
+        """Rebuild a segment index by walking its gzip members"""
+        stamp = segment_path.name.split("-", 1)[0]
+        bucket_start = datetime.strptime(stamp, "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc).timestamp()
+        index = {
+            "segment": segment_path.name,
+            "retention-class": segment_path.parent.name,
+            "bucket-start": bucket_start,
+            "bucket-end": bucket_start + self.bucket_seconds,
+            "events": 0,
+            "first": None,
+            "last": None,
+            "categories": {},
+            "members": []
+        }
+        with open(segment_path, 'rb') as f:
+            data = f.read()
+
+        offset = 0
+        while offset < len(data):
+            decompressor = zlib.decompressobj(wbits=31)
+            try:
+                content = decompressor.decompress(data[offset:])
+            except zlib.error:
+                break
+            if not decompressor.eof:
+                break
+            length = len(data) - offset - len(decompressor.unused_data)
+            records = [json.loads(line) for line in content.splitlines()]
+            if records:
+                first = min(record["ts"] for record in records)
+                last = max(record["ts"] for record in records)
+                index["members"].append({"offset": offset, "length": length, "events": len(records),
+                                         "first": first, "last": last})
+                index["events"] += len(records)
+                index["first"] = first if index["first"] is None else min(index["first"], first)
+                index["last"] = last if index["last"] is None else max(index["last"], last)
+                for record in records:
+                    index["categories"][record["category"]] = index["categories"].get(record["category"], 0) + 1
+            offset += length
+        index["valid_length"] = offset
+        return index
+
+    def _take_lock(self):
+        """Open and hold the directory's writer lock; RuntimeError if another writer has it"""
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        lock_file = open(self.log_dir / ".writer.lock", 'w')
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            raise RuntimeError(f"Another process is writing the audit log in {self.log_dir}")
+        return lock_file
+
+    def _index_path(self, segment_path: Path) -> Path:
+        return segment_path.with_name(segment_path.name[:-len(self.SEGMENT_SUFFIX)] + self.INDEX_SUFFIX)
+
+    def _write_index(self, segment_path: Path, index: Dict[str, Any]):
+        index_path = self._index_path(segment_path)
+        tmp_path = index_path.with_name(f".{index_path.name}.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, index_path)
+        self._fsync_dir(index_path.parent)
+
+    def _load_index(self, index_path: Path) -> Optional[Dict[str, Any]]:
+        if not index_path.exists():
+            return None
+        try:
+            with open(index_path, 'r') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable audit index {index_path}: {e}")
+            return None
+
+    def _fsync_dir(self, directory: Path):
+        fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def _file_digest(self, path: Path) -> str:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+def main():
+    """Main CLI interface for the audit log"""
+    parser = argparse.ArgumentParser(description="Archi3 Audit Log")
+    parser.add_argument("--policies-dir", default="./archi3/policies",
+                       help="Path to policies directory")
+    parser.add_argument("--environment", "-e", required=True,
+                       help="Environment whose audit-logging policy applies")
+    parser.add_argument("--log-dir", help="Audit log directory (default: deployments/audit/<environment>)")
+    parser.add_argument("--action", choices=["read", "expire", "verify", "benchmark"], default="read",
+                       help="Action to perform")
+    parser.add_argument("--since", type=float, help="Read events from the last N hours")
+    parser.add_argument("--category", action="append", help="Read only this event category (repeatable)")
+    parser.add_argument("--events", type=int, default=200000, help="Events to log in the benchmark")
+    parser.add_argument("--verbose", "-v", action="store_true",
+                       help="Verbose output")
+
+    args = parser.parse_args()
+
+    if args.verbose:
+        logging.getLogger().setLevel(logging.DEBUG)
+
+    try:
+        audit_log = Archi3AuditLog.from_policy(args.policies_dir, args.environment, log_dir=args.log_dir)
+
+        if args.action == "read":
+            start = time.time() - args.since * 3600 if args.since else None
+            for record in audit_log.read(start=start, categories=args.category):
+                print(json.dumps(record))
+
+        elif args.action == "expire":
+            expired = audit_log.expire()
+            print(f"Expired {len(expired)} segment(s)")
+            for name in expired:
+                print(f"  {name}")
+
+        elif args.action == "verify":
+            problems = audit_log.verify()
+            for problem in problems:
+                print(f"❌ {problem}")
+            print("✅ All sealed segments intact" if not problems else f"{len(problems)} problem(s)")
+            if problems:
+                sys.exit(1)
+
+        elif args.action == "benchmark":
+            audit_log.enabled = True
+            with audit_log:
+                started = time.perf_counter()
+                for i in range(args.events):
+                    audit_log.log("data-access", "file-access", agent="@coder-manager", path=f"/workspace/file-{i}")
+                queued = time.perf_counter() - started
+                audit_log.flush()
+                total = time.perf_counter() - started
+            print(json.dumps({
+                "events": args.events,
+                "log_ns_per_event": round(1e9 * queued / args.events),
+                "durable_events_per_second": round(args.events / total),
+                "dropped": audit_log.dropped
+            }, indent=2))
+
+    except Exception as e:
+        logger.error(f"Audit log operation failed: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
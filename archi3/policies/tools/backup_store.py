@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Archi3 Backup Store
+Content-addressed, deduplicated storage for policy backups
+"""
+
+import json
+import os
+import io
+import time
+import fcntl
+import hashlib
+import tarfile
+import tempfile
+from pathlib import Path
+from typing import Dict, Any, Optional, List
+from contextlib import contextmanager
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Archi3BackupStore:
+    """Store policy backups as content-addressed blobs plus a small JSON manifest per backup"""
+
+    def __init__(self, backup_dir: str, gc_grace_seconds: int = 3600):
+        self.backup_dir = Path(backup_dir)
+        self.objects_dir = self.backup_dir / "objects"
+        self.manifests_dir = self.backup_dir / "manifests"
+        self.archives_dir = self.backup_dir / "archives"
+        self.index_dir = self.backup_dir / "index"
+        self.lock_path = self.backup_dir / ".lock"
+        # Unreferenced objects younger than this are kept, a backup or release may be about to use them
+        self.gc_grace_seconds = gc_grace_seconds
+
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.manifests_dir.mkdir(parents=True, exist_ok=True)
+        self.archives_dir.mkdir(parents=True, exist_ok=True)
+        if not self.index_dir.exists():
+            self.rebuild_index()
+
+    def create_backup(self, backup_name: str, environment: str, sources: Dict[str, Path]) -> Dict[str, Any]:
+        """Back up every file under each source directory, keyed by its path relative to the policies dir"""
+        files = {}
+        new_objects = 0
+        new_bytes = 0
+
+        for prefix, source_dir in sources.items():
+            source_dir = Path(source_dir)
+            if not source_dir.exists():
+                continue
+            for file_path in sorted(source_dir.rglob("*")):
+                if not file_path.is_file():
+                    continue
+                digest, size, created = self.put_file(file_path)
+                files[f"{prefix}/{file_path.relative_to(source_dir).as_posix()}"] = {
+                    "sha256": digest,
+                    "size": size,
+                    "mode": file_path.stat().st_mode & 0o777
+                }
+                if created:
+                    new_objects += 1
+                    new_bytes += size
+
+        manifest = {
+            "backup_name": backup_name,
+            "environment": environment,
+            "timestamp": datetime.now().isoformat(),
+            "files": files,
+            "total_bytes": sum(entry["size"] for entry in files.values()),
+            "new_objects": new_objects,
+            "new_bytes": new_bytes
+        }
+        self._atomic_write(self.manifest_path(backup_name), json.dumps(manifest, indent=2).encode("utf-8"))
+        with self._locked():
+            index = self._load_index(environment)
+            index[backup_name] = {"timestamp": manifest["timestamp"], "archive": None}
+            self._write_index(environment, index)
+
+        logger.info(f"Backup {backup_name}: {len(files)} files, {new_objects} new objects ({new_bytes} bytes)")
+        return manifest
+
+    def put_file(self, file_path: Path) -> tuple:
+        """Store a file's content, returning (sha256, size, created) where created is False for known content"""
+        with open(file_path, 'rb') as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+        object_path = self.object_path(digest)
+
+        if object_path.exists():
+            # Refresh the mtime so garbage collection treats the object as recently used
+            os.utime(object_path)
+            return digest, len(data), False
+
+        object_path.parent.mkdir(exist_ok=True)
+        self._atomic_write(object_path, data, mode=0o444)
+        return digest, len(data), True
+
+    def object_path(self, digest: str) -> Path:
+        """Path of the blob holding content with the given hash"""
+        return self.objects_dir / digest[:2] / digest[2:]
+
+    def manifest_path(self, backup_name: str) -> Path:
+        """Path of a backup's manifest"""
+        return self.manifests_dir / f"{backup_name}.json"
+
+    def load_manifest(self, backup_name: str) -> Optional[Dict[str, Any]]:
+        """Load a backup manifest by name"""
+        path = self.manifest_path(backup_name)
+        if not path.exists():
+            return None
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def list_backups(self, environment: str = None) -> List[str]:
+        """List backup names from the index, oldest first"""
+        if environment:
+            return list(self._load_index(environment))
+        return sorted(name for env in self.environments() for name in self._load_index(env))
+
+    def latest_backup(self, environment: str) -> Optional[str]:
+        """Most recent backup of an environment"""
+        index = self._load_index(environment)
+        return next(reversed(index), None) if index else None
+
+    def find_backup(self, environment: str, backup_name: str) -> Optional[Dict[str, Any]]:
+        """Index entry of a backup, or None if the environment has no such backup"""
+        return self._load_index(environment).get(backup_name)
+
+    def environments(self) -> List[str]:
+        """Environments that have indexed backups"""
+        return sorted(path.stem for path in self.index_dir.glob("*.json"))
+
+    def prune(self, environment: str, keep_last: int = 10, keep_daily: int = 7,
+              keep_weekly: int = 4) -> Dict[str, Any]:
+        """Apply retention to an environment's backups
+
+        The newest keep_last backups stay restorable as they are. The newest backup of each
+        of the last keep_daily days and keep_weekly ISO weeks is compacted into a compressed
+        archive; every other backup is deleted.
+        """
+        with self._locked():
+            index = self._load_index(environment)
+            names = list(index)
+            recent = set(names[-keep_last:]) if keep_last else set()
+
+            dailies, weeklies = {}, {}
+            for name in reversed(names):
+                moment = datetime.fromisoformat(index[name]["timestamp"])
+                day = moment.date().isoformat()
+                week = "%d-W%02d" % moment.isocalendar()[:2]
+                if day not in dailies and len(dailies) < keep_daily:
+                    dailies[day] = name
+                if week not in weeklies and len(weeklies) < keep_weekly:
+                    weeklies[week] = name
+            retained = set(dailies.values()) | set(weeklies.values())
+
+            compacted, deleted = [], []
+            for name in names:
+                if name in recent:
+                    continue
+                if name in retained:
+                    if not index[name]["archive"]:
+                        index[name]["archive"] = self._archive(name)
+                        compacted.append(name)
+                    continue
+                if index[name]["archive"]:
+                    archive_path = self.backup_dir / index[name]["archive"]
+                    if archive_path.exists():
+                        archive_path.unlink()
+                self.manifest_path(name).unlink(missing_ok=True)
+                del index[name]
+                deleted.append(name)
+
+            self._write_index(environment, index)
+            removed_objects = self._collect_garbage()
+
+        logger.info(f"Pruned {environment} backups: {len(compacted)} compacted, {len(deleted)} deleted, "
+                    f"{removed_objects} unreferenced objects removed")
+        return {
+            "environment": environment,
+            "kept": len(index),
+            "compacted": compacted,
+            "deleted": deleted,
+            "removed_objects": removed_objects
+        }
+
+    def rebuild_index(self):
+        """Rebuild the per-environment indexes from the manifests (and archives) on disk"""
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        with self._locked():
+            indexes = {}
+            for path in self.manifests_dir.glob("*.json"):
+                with open(path, 'r') as f:
+                    manifest = json.load(f)
+                indexes.setdefault(manifest["environment"], {})[manifest["backup_name"]] = {
+                    "timestamp": manifest["timestamp"], "archive": None
+                }
+            for path in self.archives_dir.glob("*/*.tar.gz"):
+                manifest = self._read_archived_manifest(path)
+                indexes.setdefault(manifest["environment"], {}).setdefault(manifest["backup_name"], {
+                    "timestamp": manifest["timestamp"],
+                    "archive": path.relative_to(self.backup_dir).as_posix()
+                })
+            for environment, index in indexes.items():
+                self._write_index(environment, index)
+
+    def restore(self, backup_name: str, target_root: Path, prefixes: List[str] = None) -> Dict[str, Any]:
+        """Restore a backup's files under target_root, removing files the backup did not contain"""
+        manifest = self.load_manifest(backup_name)
+        if manifest is None:
+            manifest = self._unarchive(backup_name)
+        if manifest is None:
+            raise FileNotFoundError(f"Backup not found: {backup_name}")
+
+        target_root = Path(target_root)
+        prefixes = prefixes or sorted({rel.split("/", 1)[0] for rel in manifest["files"]})
+        restored = 0
+
+        for rel, entry in manifest["files"].items():
+            if rel.split("/", 1)[0] not in prefixes:
+                continue
+            target = target_root / rel
+            if target.exists() and self._file_digest(target) == entry["sha256"]:
+                continue
+            target.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.object_path(entry["sha256"]), 'rb') as f:
+                self._atomic_write(target, f.read(), mode=entry.get("mode", 0o644))
+            restored += 1
+
+        removed = 0
+        for prefix in prefixes:
+            prefix_dir = target_root / prefix
+            if not prefix_dir.exists():
+                continue
+            for file_path in prefix_dir.rglob("*"):
+                rel = f"{prefix}/{file_path.relative_to(prefix_dir).as_posix()}"
+                if file_path.is_file() and rel not in manifest["files"]:
+                    file_path.unlink()
+                    removed += 1
+
+        return {"restored": restored, "removed": removed, "files": len(manifest["files"])}
+
+    def _archive(self, backup_name: str) -> str:
+        """Pack a backup's manifest and objects into a self-contained tar.gz, dropping the live manifest"""
+        manifest = self.load_manifest(backup_name)
+        archive_path = self.archives_dir / manifest["environment"] / f"{backup_name}.tar.gz"
+        archive_path.parent.mkdir(parents=True, exist_ok=True)
+
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w:gz") as tar:
+            tar.add(str(self.manifest_path(backup_name)), arcname="manifest.json")
+            for digest in sorted({entry["sha256"] for entry in manifest["files"].values()}):
+                tar.add(str(self.object_path(digest)), arcname=f"objects/{digest}")
+        self._atomic_write(archive_path, buffer.getvalue())
+
+        self.manifest_path(backup_name).unlink()
+        return archive_path.relative_to(self.backup_dir).as_posix()
+
+    def _unarchive(self, backup_name: str) -> Optional[Dict[str, Any]]:
+        """Bring an archived backup's objects back into the store and return its manifest"""
+        for environment in self.environments():
+            entry = self._load_index(environment).get(backup_name)
+            if entry and entry["archive"]:
+                break
+        else:
+            return None
+
+        with tarfile.open(self.backup_dir / entry["archive"], mode="r:gz") as tar:
+            manifest = json.load(tar.extractfile("manifest.json"))
+            for member in tar.getmembers():
+                if not member.name.startswith("objects/"):
+                    continue
+                digest = member.name.split("/", 1)[1]
+                if not self.object_path(digest).exists():
+                    data = tar.extractfile(member).read()
+                    if hashlib.sha256(data).hexdigest() != digest:
+                        raise ValueError(f"Corrupt object {digest} in archive {entry['archive']}")
+                    self.object_path(digest).parent.mkdir(exist_ok=True)
+                    self._atomic_write(self.object_path(digest), data, mode=0o444)
+        return manifest
+
+    def _read_archived_manifest(self, archive_path: Path) -> Dict[str, Any]:
+        with tarfile.open(archive_path, mode="r:gz") as tar:
+            return json.load(tar.extractfile("manifest.json"))
+
+    def _collect_garbage(self) -> int:
+        """Delete objects no live manifest references (archives carry their own copies)"""
+        referenced = set()
+        for path in self.manifests_dir.glob("*.json"):
+            with open(path, 'r') as f:
+                referenced.update(entry["sha256"] for entry in json.load(f)["files"].values())
+
+        cutoff = time.time() - self.gc_grace_seconds
+        removed = 0
+        for object_path in self.objects_dir.glob("*/*"):
+            digest = object_path.parent.name + object_path.name
+            if digest not in referenced and object_path.stat().st_mtime < cutoff:
+                object_path.unlink()
+                removed += 1
+        return removed
+
+    def _load_index(self, environment: str) -> Dict[str, Dict[str, Any]]:
+        """Backups of an environment in creation order: name -> {timestamp, archive}"""
+        path = self.index_dir / f"{environment}.json"
+        if not path.exists():
+            return {}
+        with open(path, 'r') as f:
+            return json.load(f)["backups"]
+
+    def _write_index(self, environment: str, index: Dict[str, Dict[str, Any]]):
+        ordered = dict(sorted(index.items(), key=lambda item: (item[1]["timestamp"], item[0])))
+        data = json.dumps({"environment": environment, "backups": ordered}, indent=2).encode("utf-8")
+        self._atomic_write(self.index_dir / f"{environment}.json", data)
+
+    @contextmanager
+    def _locked(self):
+        """Hold an exclusive lock on the store's indexes across processes"""
+        with open(self.lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _file_digest(self, path: Path) -> str:
+        with open(path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+    def _atomic_write(self, path: Path, data: bytes, mode: int = 0o644):
+        """Write data to a temp file beside path and rename it into place"""
+        fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=str(path.parent))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(tmp_name, mode)
+            os.replace(tmp_name, path)
+        except BaseException:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            raise
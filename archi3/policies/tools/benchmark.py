@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Archi3 Policy Generator Benchmark
+Time and profile policy generation on synthetic templates
+"""
+
+import yaml
+import json
+import sys
+import time
+import shutil
+import tempfile
+import platform
+import cProfile
+import pstats
+from pathlib import Path
+from typing import Dict, Any, List
+from datetime import datetime
+import argparse
+import logging
+
+sys.path.append(str(Path(__file__).resolve().parent))
+from generator import Archi3PolicyGenerator
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+class Archi3GeneratorBenchmark:
+    """Benchmark Archi3PolicyGenerator on synthetic templates"""
+
+    def __init__(self, work_dir: str = None, outputs: int = 100, repeat: int = 20):
+        self.work_dir = Path(work_dir) if work_dir else None
+        self.outputs = outputs
+        self.repeat = repeat
+        self._owns_work_dir = work_dir is None
+
+    def run(self, variable_counts: List[int], render_counts: List[int]) -> Dict[str, Any]:
+        """Run every scenario and return the results"""
+        if self.work_dir is None:
+            self.work_dir = Path(tempfile.mkdtemp(prefix="archi3-bench-"))
+
+        # Per-render INFO logging would dominate the timings
+        logging.getLogger("generator").setLevel(logging.WARNING)
+
+        results = {
+            "benchmark": "generator",
+            "timestamp": datetime.now().isoformat(),
+            "environment": {
+                "python": platform.python_version(),
+                "pyyaml": yaml.__version__,
+                "libyaml": getattr(yaml, "__with_libyaml__", False),
+                "platform": platform.platform()
+            },
+            "scenarios": []
+        }
+
+        try:
+            for variable_count in variable_counts:
+                policies_dir = self._prepare_policies_dir(variable_count)
+                generator = Archi3PolicyGenerator(str(policies_dir))
+
+                for render_count in render_counts:
+                    logger.info(f"Benchmarking {variable_count} variables x {render_count} renders")
+                    results["scenarios"].append(
+                        self._bench_generate(generator, "generate_agent_policy", variable_count, render_count))
+                    results["scenarios"].append(
+                        self._bench_generate(generator, "generate_environment_policy", variable_count, render_count))
+                    results["scenarios"].append(
+                        self._bench_catalog(generator, variable_count, render_count))
+
+                results["scenarios"].append(self._bench_list_templates(generator, variable_count))
+                results["scenarios"].append(self._bench_validate(generator, variable_count))
+        finally:
+            if self._owns_work_dir:
+                shutil.rmtree(self.work_dir, ignore_errors=True)
+                self.work_dir = None
+
+        return results
+
+    def compare(self, results: Dict[str, Any], baseline: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Compare scenario timings against a baseline run"""
+        baseline_index = {self._scenario_key(s): s for s in baseline.get("scenarios", [])}
+        comparisons = []
+        for scenario in results["scenarios"]:
+            previous = baseline_index.get(self._scenario_key(scenario))
+            if not previous or not previous["total_s"]:
+                continue
+            comparisons.append({
+                "operation": scenario["operation"],
+                "variables": scenario["variables"],
+                "renders": scenario["renders"],
+                "baseline_s": previous["total_s"],
+                "current_s": scenario["total_s"],
+                "ratio": scenario["total_s"] / previous["total_s"]
+            })
+        return comparisons
+
+    def _scenario_key(self, scenario: Dict[str, Any]) -> tuple:
+        return (scenario["operation"], scenario["variables"], scenario["renders"])
+
+    def _prepare_policies_dir(self, variable_count: int) -> Path:
+        """Create a policies directory with a synthetic template and base environment"""
+        policies_dir = self.work_dir / f"vars-{variable_count}"
+        (policies_dir / "templates").mkdir(parents=True, exist_ok=True)
+        (policies_dir / "environments").mkdir(parents=True, exist_ok=True)
+
+        with open(policies_dir / "templates" / "bench-template.yaml", 'w') as f:
+            yaml.dump(self._synthetic_policy(variable_count, "agent"), f,
+                      default_flow_style=False, sort_keys=False)
+        with open(policies_dir / "environments" / "bench-environment.yaml", 'w') as f:
+            yaml.dump(self._synthetic_policy(variable_count, "environment"), f,
+                      default_flow_style=False, sort_keys=False)
+
+        return policies_dir
+
+    def _synthetic_policy(self, variable_count: int, kind: str) -> Dict[str, Any]:
+        """Build a policy referencing variable_count distinct variables, nested like real policies"""
+        settings = {}
+        for i in range(variable_count):
+            group = settings.setdefault(f"group-{i // 50}", {})
+            group[f"setting-{i}"] = f"{{{{VAR_{i}}}}}"
+
+        return {
+            "version": "1.0.0",
+            "metadata": {
+                "name": "{{AGENT_NAME}}-policy",
+                "description": f"Synthetic {kind} policy with {variable_count} variables"
+            },
+            "agents": {
+                "managers": {
+                    "bench-manager": {
+                        "id": "@bench-manager",
+                        "type": "manager",
+                        "settings": settings
+                    }
+                }
+            }
+        }
+
+    def _variables(self, variable_count: int, render: int) -> Dict[str, str]:
+        """Variables for one render; values change per render so writes are never skipped"""
+        variables = {f"VAR_{i}": f"value-{i}-{render}" for i in range(variable_count)}
+        variables["AGENT_NAME"] = f"bench-{render}"
+        return variables
+
+    def _bench_generate(self, generator: Archi3PolicyGenerator, operation: str,
+                        variable_count: int, render_count: int) -> Dict[str, Any]:
+        """Time a generate method end to end, then split one pass into render, dump and write"""
+        if operation == "generate_agent_policy":
+            source_path = generator.templates_dir / "bench-template.yaml"
+            generate = lambda variables, name: generator.generate_agent_policy("bench-template", variables, name)
+        else:
+            source_path = generator.policies_dir / "environments" / "bench-environment.yaml"
+            generate = lambda variables, name: generator.generate_environment_policy("bench-environment", variables, name)
+
+        variable_sets = [self._variables(variable_count, render) for render in range(render_count)]
+
+        start = time.perf_counter()
+        for render, variables in enumerate(variable_sets):
+            generate(variables, f"bench-{render % self.outputs}")
+        total = time.perf_counter() - start
+
+        # Same pipeline, instrumented per phase (fresh values so writes are not deduplicated)
+        phases = {"load_s": 0.0, "render_s": 0.0, "dump_s": 0.0, "write_s": 0.0}
+        for render in range(render_count):
+            variables = self._variables(variable_count, render_count + render)
+            output_path = generator.output_dir / f"bench-{render % self.outputs}.yaml"
+
+            t0 = time.perf_counter()
+            with open(source_path, 'r') as f:
+                content = yaml.safe_load(f)
+            t1 = time.perf_counter()
+            rendered = generator._substitute_variables(content, variables)
+            t2 = time.perf_counter()
+            text = generator.serializer.dump(rendered)
+            t3 = time.perf_counter()
+            generator._write_output(output_path, text)
+            t4 = time.perf_counter()
+
+            phases["load_s"] += t1 - t0
+            phases["render_s"] += t2 - t1
+            phases["dump_s"] += t3 - t2
+            phases["write_s"] += t4 - t3
+
+        return {
+            "operation": operation,
+            "variables": variable_count,
+            "renders": render_count,
+            "total_s": total,
+            "per_render_ms": total * 1000 / render_count,
+            "phases": phases
+        }
+
+    def _bench_catalog(self, generator: Archi3PolicyGenerator, variable_count: int,
+                       render_count: int) -> Dict[str, Any]:
+        """Time generate_agent_policy_catalog writing every render into one multi-document stream"""
+        variable_sets = [self._variables(variable_count, render) for render in range(render_count)]
+
+        start = time.perf_counter()
+        generator.generate_agent_policy_catalog("bench-template", variable_sets, "bench-catalog")
+        total = time.perf_counter() - start
+
+        return {
+            "operation": "generate_agent_policy_catalog",
+            "variables": variable_count,
+            "renders": render_count,
+            "total_s": total,
+            "per_render_ms": total * 1000 / render_count,
+            "libyaml": generator.serializer.uses_libyaml,
+            "workers": generator.serializer.workers
+        }
+
+    def _bench_list_templates(self, generator: Archi3PolicyGenerator, variable_count: int) -> Dict[str, Any]:
+        """Time list_templates over repeated calls"""
+        start = time.perf_counter()
+        for _ in range(self.repeat):
+            generator.list_templates()
+        total = time.perf_counter() - start
+
+        return {
+            "operation": "list_templates",
+            "variables": variable_count,
+            "renders": self.repeat,
+            "total_s": total,
+            "per_render_ms": total * 1000 / self.repeat
+        }
+
+    def _bench_validate(self, generator: Archi3PolicyGenerator, variable_count: int) -> Dict[str, Any]:
+        """Time validate_generated_policy on a freshly generated policy"""
+        policy_path = generator.generate_agent_policy(
+            "bench-template", self._variables(variable_count, 0), "bench-validate")
+
+        start = time.perf_counter()
+        for _ in range(self.repeat):
+            validation_result = generator.validate_generated_policy(policy_path)
+        total = time.perf_counter() - start
+
+        return {
+            "operation": "validate_generated_policy",
+            "variables": variable_count,
+            "renders": self.repeat,
+            "total_s": total,
+            "per_render_ms": total * 1000 / self.repeat,
+            "valid": validation_result["valid"]
+        }
+
+def _parse_counts(value: str) -> List[int]:
+    return [int(count) for count in value.split(",") if count.strip()]
+
+def main():
+    """Main CLI interface for generator benchmarking"""
+    parser = argparse.ArgumentParser(description="Archi3 Policy Generator Benchmark")
+    parser.add_argument("--variables", default="10,100,1000,10000",
+                       help="Comma-separated template variable counts")
+    parser.add_argument("--renders", default="1,100,1000",
+                       help="Comma-separated render counts (up to 100000)")
+    parser.add_argument("--outputs", type=int, default=100,
+                       help="Number of distinct output files renders rotate through")
+    parser.add_argument("--repeat", type=int, default=20,
+                       help="Repetitions for list_templates and validate_generated_policy")
+    parser.add_argument("--work-dir", help="Directory for synthetic policies (default: temp dir)")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--baseline", help="Baseline results JSON to compare against")
+    parser.add_argument("--fail-threshold", type=float,
+                       help="Exit non-zero if any scenario is slower than baseline by this ratio")
+    parser.add_argument("--profile", help="Write cProfile stats to this file")
+    parser.add_argument("--verbose", "-v", action="store_true",
+                       help="Verbose output")
+
+    args = parser.parse_args()
+
+    if args.verbose:
+        logging.getLogger().setLevel(logging.DEBUG)
+
+    benchmark = Archi3GeneratorBenchmark(args.work_dir, outputs=args.outputs, repeat=args.repeat)
+
+    try:
+        profiler = cProfile.Profile() if args.profile else None
+        if profiler:
+            profiler.enable()
+        results = benchmark.run(_parse_counts(args.variables), _parse_counts(args.renders))
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+            pstats.Stats(profiler).sort_stats("cumulative").print_stats(20)
+            print(f"Profile saved to {args.profile}")
+
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(results, f, indent=2)
+            print(f"Benchmark results saved to {args.output}")
+        else:
+            print(json.dumps(results, indent=2))
+
+        if args.baseline:
+            with open(args.baseline, 'r') as f:
+                baseline = json.load(f)
+            comparisons = benchmark.compare(results, baseline)
+
+            print("Comparison against baseline:")
+            regressions = []
+            for comparison in comparisons:
+                marker = "⚠️ " if args.fail_threshold and comparison["ratio"] > args.fail_threshold else "   "
+                print(f"{marker}{comparison['operation']} vars={comparison['variables']} "
+                      f"renders={comparison['renders']}: {comparison['baseline_s']:.4f}s → "
+                      f"{comparison['current_s']:.4f}s (x{comparison['ratio']:.2f})")
+                if args.fail_threshold and comparison["ratio"] > args.fail_threshold:
+                    regressions.append(comparison)
+
+            if regressions:
+                print(f"❌ {len(regressions)} scenario(s) slower than x{args.fail_threshold}")
+                sys.exit(1)
+
+    except Exception as e:
+        logger.error(f"Benchmark failed: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Archi3 Complexity Classifier
+Classify task descriptions into the task-classification complexity levels
+"""
+
+import json
+import sys
+import time
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, List, Tuple
+import argparse
+import logging
+
+sys.path.append(str(Path(__file__).resolve().parent))
+from generator import Archi3PolicyGenerator
+from router import Archi3TaskRouter, TOKEN_PATTERN
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+STOPWORDS = {"a", "an", "and", "as", "at", "by", "for", "from", "in", "into", "of", "on", "or",
+             "plus", "the", "to", "with"}
+
+class Archi3ComplexityClassifier:
+    """Score task text against each complexity level's examples and characteristics, memoized by signature"""
+
+    # Weight of a fully matched example phrase relative to one level-specific vocabulary token
+    EXAMPLE_WEIGHT = 3.0
+    # Weight of the level implied by how many domains the task touches
+    BREADTH_WEIGHT = 1.0
+
+    def __init__(self, policies_dir: str, cache_size: int = 4096):
+        self.policies_dir = Path(policies_dir)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._compile(Archi3PolicyGenerator(str(self.policies_dir)).load_routing_tables())
+
+    def classify(self, text: str) -> Dict[str, Any]:
+        """Classify one task description"""
+        signature = self.signature(text)
+        with self._lock:
+            result = self._cache.get(signature)
+            if result is not None:
+                self._cache.move_to_end(signature)
+                self.hits += 1
+        cached = result is not None
+
+        if not cached:
+            # Routing only runs on a miss; the routing sequence gives the same domains as the full text
+            vocabulary_tokens, routing_sequence = signature
+            domains = self.router.route_tokens(list(routing_sequence))["domains"]
+            result = self._score((vocabulary_tokens, tuple(sorted(domains))))
+            with self._lock:
+                self.misses += 1
+                self._cache[signature] = result
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        # Callers get their own copy so the cached entry cannot be modified
+        return {**result, "quality-gates": list(result["quality-gates"]),
+                "scores": dict(result["scores"]), "matched-examples": list(result["matched-examples"]),
+                "cached": cached}
+
+    def classify_many(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """Classify a batch of task descriptions"""
+        return [self.classify(text) for text in texts]
+
+    def signature(self, text: str) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+        """Normalized task shape: the level vocabulary it contains and its routing keyword sequence
+
+        Classification depends on nothing else, so tasks that differ only in wording outside
+        the level vocabulary and the routing keywords share a signature and a cache entry.
+        Computing it is a single tokenization pass; domains are only routed on a cache miss.
+        """
+        tokens = self.router.tokenize(text)
+        return tuple(sorted(self.vocabulary.intersection(tokens))), self.router.routing_sequence(tokens)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._cache),
+                "capacity": self.cache_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def _compile(self, routing_tables: Dict[str, Any]):
+        """Turn each level's examples, characteristics and description into weighted token sets"""
+        self.router = Archi3TaskRouter.from_tables(routing_tables)
+        self.levels = routing_tables["complexity"]
+        self.level_order = routing_tables["complexity-order"]
+
+        self.examples = {}
+        level_tokens = {}
+        for level, definition in self.levels.items():
+            self.examples[level] = [(example, frozenset(self._tokenize(example)))
+                                    for example in definition.get("examples", [])]
+            tokens = set(self._tokenize(definition.get("description") or ""))
+            for characteristic in definition.get("characteristics", []):
+                tokens.update(self._tokenize(characteristic))
+            for _, example_tokens in self.examples[level]:
+                tokens.update(example_tokens)
+            level_tokens[level] = tokens
+
+        # A token shared by several levels says less about any one of them
+        levels_per_token = {}
+        for tokens in level_tokens.values():
+            for token in tokens:
+                levels_per_token[token] = levels_per_token.get(token, 0) + 1
+        self.weights = {level: {token: 1.0 / levels_per_token[token] for token in tokens}
+                        for level, tokens in level_tokens.items()}
+        self.vocabulary = frozenset(levels_per_token)
+
+    def _score(self, signature: Tuple[Tuple[str, ...], Tuple[str, ...]]) -> Dict[str, Any]:
+        tokens, domains = signature
+        present = set(tokens)
+
+        # Levels run from single-domain to organization-wide, so breadth points at a position
+        breadth_level = self.level_order[min(max(len(domains) - 1, 0), len(self.level_order) - 1)]
+
+        scores = {}
+        matched_examples = []
+        for level in self.level_order:
+            weights = self.weights[level]
+            score = sum(weights[token] for token in present if token in weights)
+
+            best_coverage = 0.0
+            for example, example_tokens in self.examples[level]:
+                if not example_tokens:
+                    continue
+                coverage = len(example_tokens & present) / len(example_tokens)
+                if coverage == 1.0:
+                    matched_examples.append(example)
+                best_coverage = max(best_coverage, coverage)
+            if best_coverage >= 0.5:
+                score += self.EXAMPLE_WEIGHT * best_coverage
+
+            if level == breadth_level:
+                score += self.BREADTH_WEIGHT
+            scores[level] = round(score, 4)
+
+        # Ties go to the simpler level
+        level = max(self.level_order, key=lambda name: (scores[name], -self.level_order.index(name)))
+        definition = self.levels[level]
+        return {
+            "level": level,
+            "routing-logic": definition.get("routing-logic"),
+            "quality-gates": definition.get("quality-gates", []),
+            "timeline": definition.get("timeline"),
+            "resource-requirements": definition.get("resource-requirements"),
+            "scores": scores,
+            "matched-examples": matched_examples,
+            "domains": list(domains)
+        }
+
+    def _tokenize(self, text: str) -> List[str]:
+        return [self._normalize(token) for token in TOKEN_PATTERN.findall(text.lower())
+                if token not in STOPWORDS and not token.isdigit()]
+
+    _normalize = staticmethod(Archi3TaskRouter._normalize)
+
+def main():
+    """Main CLI interface for complexity classification"""
+    parser = argparse.ArgumentParser(description="Archi3 Complexity Classifier")
+    parser.add_argument("--policies-dir", default="./archi3/policies",
+                       help="Path to policies directory")
+    parser.add_argument("--text", help="Task description to classify")
+    parser.add_argument("--file", help="File with one task description per line")
+    parser.add_argument("--cache-size", type=int, default=4096,
+                       help="Maximum number of task signatures to memoize")
+    parser.add_argument("--output", help="Write classifications as JSON lines to this file")
+    parser.add_argument("--verbose", "-v", action="store_true",
+                       help="Verbose output")
+
+    args = parser.parse_args()
+
+    if args.verbose:
+        logging.getLogger().setLevel(logging.DEBUG)
+
+    if not args.text and not args.file:
+        parser.error("--text or --file is required")
+
+    try:
+        classifier = Archi3ComplexityClassifier(args.policies_dir, cache_size=args.cache_size)
+
+        if args.text:
+            print(json.dumps(classifier.classify(args.text), indent=2))
+            return
+
+        with open(args.file, 'r') as f:
+            texts = [line.rstrip("\n") for line in f if line.strip()]
+
+        started = time.perf_counter()
+        results = classifier.classify_many(texts)
+        elapsed = time.perf_counter() - started
+
+        if args.output:
+            with open(args.output, 'w') as f:
+                for text, result in zip(texts, results):
+                    f.write(json.dumps({"text": text, **result}) + "\n")
+            print(f"Classifications saved to {args.output}")
+
+        levels = {}
+        for result in results:
+            levels[result["level"]] = levels.get(result["level"], 0) + 1
+        stats = classifier.cache_stats()
+        print(f"Classified {len(results)} tasks in {elapsed:.3f}s "
+              f"({1e6 * elapsed / max(len(results), 1):.1f} µs/task, "
+              f"cache hit rate {stats['hit_rate']:.1%})")
+        for level, count in levels.items():
+            print(f"  {level}: {count}")
+
+    except Exception as e:
+        logger.error(f"Classification failed: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+"""
+Archi3 Database Connection Pool
+Share a policy-sized pool of database connections with fair queueing, query timeouts and query auditing
+"""
+
+import json
+import sys
+import os
+import time
+import sqlite3
+import threading
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Callable, Iterator
+import argparse
+import logging
+
+sys.path.append(str(Path(__file__).resolve().parent))
+from audit_log import Archi3AuditLog
+from resilience import parse_duration
+from resolver import Archi3PolicyResolver
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# SQLite VM instructions between query deadline checks
+PROGRESS_STEPS = 1000
+
+# Handed to a waiter instead of a connection: a slot is free, open a new one
+_OPEN_NEW = object()
+
+def sqlite_database(connection_string: Optional[str]) -> Optional[str]:
+    """SQLite database of a 'sqlite:///path' connection string, after ${VAR} expansion; None for other engines"""
+    if not connection_string:
+        return None
+    value = os.path.expandvars(str(connection_string))
+    if not value.startswith("sqlite://"):
+        return None
+    database = value[len("sqlite://"):]
+    return database[1:] if database.startswith("/:memory:") else database
+
+class _Waiter:
+    __slots__ = ("event", "grant")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.grant = None
+
+class Archi3PooledConnection:
+    """A connection checked out of the pool; queries run under the pool's query timeout"""
+
+    def __init__(self, pool: "Archi3ConnectionPool", connection: sqlite3.Connection):
+        self.pool = pool
+        self.connection = connection
+
+    def execute(self, sql: str, params: Any = (), timeout: float = None) -> List[tuple]:
+        """Run a statement and return its rows"""
+        return self.pool._run(self.connection, "execute", sql, params, timeout)
+
+    def executemany(self, sql: str, rows: List[Any], timeout: float = None) -> int:
+        """Run a statement once per parameter row and return the number of rows changed"""
+        return self.pool._run(self.connection, "executemany", sql, rows, timeout)
+
+    def commit(self):
+        self.connection.commit()
+
+    def rollback(self):
+        self.connection.rollback()
+
+class Archi3ConnectionPool:
+    """At most max-connections connections, handed out to waiting callers strictly in arrival order
+
+    A released connection goes straight to the longest waiting caller rather than back to the
+    idle list, so a caller that just arrived can never overtake one that is queued. The pool size,
+    query timeout and auditing follow the environment's database policy and reload when it changes;
+    a smaller pool closes the surplus connections as they are released.
+    """
+
+    def __init__(self, policies_dir: str, environment: str, database: str = None,
+                 connect: Callable[[], Any] = None, audit_log: Archi3AuditLog = None,
+                 server: str = "database", check_interval: float = 5.0):
+        self.policies_dir = Path(policies_dir)
+        self.environment = environment
+        self.server = server
+        self.check_interval = check_interval
+        self.resolver = Archi3PolicyResolver(str(self.policies_dir))
+        self.database = database
+        self._connect = connect
+        self.audit_log = audit_log
+        self._shared_audit_log = False
+
+        self._lock = threading.Lock()
+        self._idle = []
+        self._waiters = deque()
+        self._size = 0
+        self._in_use = 0
+        self._closed = False
+        self.counters = {"acquired": 0, "waited": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0,
+                         "acquire_timeouts": 0, "queries": 0, "query_timeouts": 0, "query_errors": 0,
+                         "max_waiting": 0, "opened": 0, "closed": 0}
+        self.sources = None
+        self.reload()
+
+    @contextmanager
+    def connection(self, timeout: float = None) -> Iterator[Archi3PooledConnection]:
+        """Check out a connection; committed on success, rolled back on error, then returned"""
+        connection = self.acquire(timeout)
+        broken = False
+        try:
+            yield Archi3PooledConnection(self, connection)
+            connection.commit()
+        except BaseException:
+            try:
+                connection.rollback()
+            except sqlite3.Error:
+                broken = True
+            raise
+        finally:
+            self.release(connection, broken)
+
+    def execute(self, sql: str, params: Any = (), timeout: float = None) -> List[tuple]:
+        """Run one statement on a pooled connection in its own transaction"""
+        with self.connection(timeout) as connection:
+            return connection.execute(sql, params, timeout)
+
+    def acquire(self, timeout: float = None):
+        """Take a connection, waiting in line up to timeout seconds (the query timeout by default)"""
+        self._maybe_refresh()
+        timeout = self.query_timeout if timeout is None else timeout
+        started = time.monotonic()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Connection pool is closed")
+            if not self._waiters and self._idle:
+                self._in_use += 1
+                self.counters["acquired"] += 1
+                return self._idle.pop()
+            if not self._waiters and self._size < self.max_connections:
+                self._size += 1
+                self._in_use += 1
+                grant = _OPEN_NEW
+                waiter = None
+            else:
+                waiter = _Waiter()
+                self._waiters.append(waiter)
+                self.counters["max_waiting"] = max(self.counters["max_waiting"], len(self._waiters))
+
+        if waiter is not None:
+            waiter.event.wait(timeout)
+            with self._lock:
+                # A grant can land between the wait timing out and taking the lock
+                if waiter.grant is None:
+                    self._waiters.remove(waiter)
+                    self.counters["acquire_timeouts"] += 1
+                    raise TimeoutError(f"No {self.server} connection free within {timeout:g}s "
+                                       f"({self.max_connections} in use, {len(self._waiters)} waiting)")
+                waited = time.monotonic() - started
+                self.counters["waited"] += 1
+                self.counters["wait_seconds"] += waited
+                self.counters["max_wait_seconds"] = max(self.counters["max_wait_seconds"], waited)
+            grant = waiter.grant
+
+        with self._lock:
+            self.counters["acquired"] += 1
+        if grant is not _OPEN_NEW:
+            return grant
+        try:
+            return self._open()
+        except BaseException:
+            with self._lock:
+                self._in_use -= 1
+                self._free_slot()
+            raise
+
+    def release(self, connection, broken: bool = False):
+        """Return a connection, handing it to the longest waiting caller if there is one"""
+        with self._lock:
+            self._in_use -= 1
+            retire = broken or self._closed or not self.pooling or self._size > self.max_connections
+            if retire:
+                self._free_slot()
+            elif self._waiters:
+                self._in_use += 1
+                self._grant(connection)
+                return
+            else:
+                self._idle.append(connection)
+                return
+        self._close_connection(connection)
+
+    def reload(self) -> bool:
+        """Re-read the database policy if the environment changed; True when it was reloaded"""
+        with self._lock:
+            self._checked_at = time.monotonic()
+            if self.sources is not None and not self.resolver.is_stale(self.environment):
+                return False
+
+            artifact = self.resolver.resolve(self.environment)
+            servers = artifact["policy"].get("environment", {}).get("mcp-servers", {}) or {}
+            config = servers.get(self.server) or {}
+            self.max_connections = max(1, int(config.get("max-connections", 5)))
+            self.query_timeout = parse_duration(config.get("query-timeout", "30s"))
+            self.pooling = bool(config.get("connection-pooling", True))
+            self.audit_queries = bool(config.get("audit-queries", False))
+            if self.database is None:
+                self.database = (sqlite_database(config.get("connection-string"))
+                                 or str(self.policies_dir / "deployments" / "db" / f"{self.environment}.sqlite3"))
+
+            # A larger pool lets queued callers open connections straight away
+            while self._waiters and self._size < self.max_connections:
+                self._size += 1
+                self._in_use += 1
+                self._grant(_OPEN_NEW)
+            surplus = []
+            while self._idle and self._size > self.max_connections:
+                surplus.append(self._idle.pop())
+                self._size -= 1
+            self.sources = artifact["sources"]
+            logger.info(f"Loaded {self.server} pool settings for {self.environment}: "
+                        f"max-connections={self.max_connections} query-timeout={self.query_timeout:g}s "
+                        f"pooling={self.pooling} audit-queries={self.audit_queries}")
+
+        for connection in surplus:
+            self._close_connection(connection)
+        if self.audit_queries and self.audit_log is None:
+            # The environment's log has a single writer per process, shared with every other pool
+            self.audit_log = Archi3AuditLog.shared(str(self.policies_dir), self.environment)
+            self._shared_audit_log = True
+        elif not self.audit_queries and self._shared_audit_log:
+            self._release_audit_log()
+        return True
+
+    def close(self):
+        """Close idle connections now and the rest as they are released; flush the query audit"""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+        for connection in idle:
+            self._close_connection(connection)
+        if self._shared_audit_log:
+            self._release_audit_log()
+        elif self.audit_log is not None:
+            self.audit_log.flush()
+
+    def _release_audit_log(self):
+        """Give the environment's shared audit writer back, closing it if no other pool uses it"""
+        audit_log, self.audit_log = self.audit_log, None
+        self._shared_audit_log = False
+        audit_log.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = {
+                "environment": self.environment,
+                "database": self.database,
+                "max_connections": self.max_connections,
+                "open": self._size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "waiting": len(self._waiters),
+                "saturation": round(self._in_use / self.max_connections, 3)
+            }
+            counters = dict(self.counters)
+        counters["mean_wait_seconds"] = round(counters["wait_seconds"] / counters["waited"], 6) if counters["waited"] else 0.0
+        counters["wait_seconds"] = round(counters["wait_seconds"], 6)
+        counters["max_wait_seconds"] = round(counters["max_wait_seconds"], 6)
+        stats.update(counters)
+        return stats
+
+    def _maybe_refresh(self):
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            self.reload()
+
+    def _grant(self, grant):
+        """Hand a connection, or leave to open one, to the longest waiting caller; lock held"""
+        waiter = self._waiters.popleft()
+        waiter.grant = grant
+        waiter.event.set()
+
+    def _free_slot(self):
+        """Give up a slot, letting the next waiter open a connection in its place; lock held"""
+        self._size -= 1
+        if self._waiters and self._size < self.max_connections and not self._closed:
+            self._size += 1
+            self._in_use += 1
+            self._grant(_OPEN_NEW)
+
+    def _open(self):
+        if self._connect is not None:
+            connection = self._connect()
+        else:
+            if self.database != ":memory:":
+                Path(self.database).parent.mkdir(parents=True, exist_ok=True)
+            # The busy timeout also bounds waits on other writers' locks
+            connection = sqlite3.connect(self.database, timeout=self.query_timeout, check_same_thread=False)
+        with self._lock:
+            self.counters["opened"] += 1
+        return connection
+
+    def _close_connection(self, connection):
+        try:
+            connection.close()
+        except Exception as e:
+            logger.debug(f"Error closing {self.server} connection: {e}")
+        with self._lock:
+            self.counters["closed"] += 1
+
+    def _run(self, connection, method: str, sql: str, params: Any, timeout: Optional[float]):
+        """Run a statement, interrupting it past its deadline, and queue its audit record"""
+        timeout = self.query_timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        interruptible = hasattr(connection, "set_progress_handler")
+        if interruptible:
+            connection.set_progress_handler(lambda: time.monotonic() > deadline, PROGRESS_STEPS)
+        outcome = "ok"
+        rows = None
+        try:
+            cursor = getattr(connection, method)(sql, params)
+            result = cursor.rowcount if method == "executemany" else cursor.fetchall()
+            rows = result if method == "executemany" else len(result)
+            return result
+        except sqlite3.OperationalError as e:
+            if interruptible and "interrupted" in str(e):
+                outcome = "timeout"
+                raise TimeoutError(f"Query exceeded its {timeout:g}s timeout") from e
+            outcome = "error"
+            raise
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            if interruptible:
+                connection.set_progress_handler(None, 0)
+            duration = time.monotonic() - started
+            with self._lock:
+                self.counters["queries"] += 1
+                if outcome == "timeout":
+                    self.counters["query_timeouts"] += 1
+                elif outcome == "error":
+                    self.counters["query_errors"] += 1
+            audit_log = self.audit_log
+            if self.audit_queries and audit_log is not None:
+                # Parameter values stay out of the audit trail; the statement is masked by the log
+                audit_log.log("data-access", "database-query", server=self.server,
+                              environment=self.environment, statement=sql, outcome=outcome,
+                              rows=rows, duration_ms=round(duration * 1000, 3))
+
+def run_benchmark(pool: Archi3ConnectionPool, queries: int = 10000, threads: int = 16) -> Dict[str, Any]:
+    """Run small queries from more threads than connections and report throughput and queueing"""
+    with pool.connection() as connection:
+        connection.execute("CREATE TABLE IF NOT EXISTS pool_benchmark (id INTEGER PRIMARY KEY, value TEXT)")
+        connection.execute("DELETE FROM pool_benchmark")
+        connection.executemany("INSERT INTO pool_benchmark (value) VALUES (?)", [(f"row-{i}",) for i in range(1000)])
+    latencies = []
+    latencies_lock = threading.Lock()
+
+    def worker(count: int, offset: int):
+        own = []
+        for i in range(count):
+            started = time.perf_counter()
+            pool.execute("SELECT value FROM pool_benchmark WHERE id = ?", ((offset + i) % 1000 + 1,))
+            own.append(time.perf_counter() - started)
+        with latencies_lock:
+            latencies.extend(own)
+
+    workers = [threading.Thread(target=worker, args=(queries // threads + (t < queries % threads), t * 7919))
+               for t in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "queries": queries,
+        "threads": threads,
+        "seconds": round(elapsed, 4),
+        "queries_per_second": round(queries / elapsed) if elapsed else None,
+        "latency_ms": {name: round(1000 * latencies[min(len(latencies) - 1, int(fraction * len(latencies)))], 3)
+                       for name, fraction in [("p50", 0.5), ("p99", 0.99), ("max", 1.0)]},
+        "pool": pool.stats()
+    }
+
+def main():
+    """Main CLI interface for the database connection pool"""
+    parser = argparse.ArgumentParser(description="Archi3 Database Connection Pool")
+    parser.add_argument("--policies-dir", default="./archi3/policies",
+                       help="Path to policies directory")
+    parser.add_argument("--environment", "-e", required=True,
+                       help="Environment whose database settings to apply")
+    parser.add_argument("--database", help="SQLite database file (default: from connection-string or deployments/db)")
+    parser.add_argument("--query", action="append", default=[], help="SQL statement to run (repeatable)")
+    parser.add_argument("--benchmark", type=int, metavar="QUERIES",
+                       help="Run this many queries from --threads threads")
+    parser.add_argument("--threads", type=int, default=16,
+                       help="Threads in the benchmark")
+    parser.add_argument("--verbose", "-v", action="store_true",
+                       help="Verbose output")
+
+    args = parser.parse_args()
+
+    if args.verbose:
+        logging.getLogger().setLevel(logging.DEBUG)
+
+    try:
+        with Archi3ConnectionPool(args.policies_dir, args.environment, database=args.database) as pool:
+            for sql in args.query:
+                for row in pool.execute(sql):
+                    print(json.dumps(list(row)))
+            if args.benchmark:
+                print(json.dumps(run_benchmark(pool, args.benchmark, args.threads), indent=2))
+            elif not args.query:
+                print(json.dumps(pool.stats(), indent=2))
+
+    except Exception as e:
+        logger.error(f"Database pool failed: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -9,12 +9,25 @@ import json
 import os
 import sys
 import shutil
+import tempfile
 from pathlib import Path
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Callable
 from datetime import datetime
 import argparse
 import logging
-import subprocess
+import contextvars
+import fcntl
+import time
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+sys.path.append(str(Path(__file__).resolve().parent))
+from backup_store import Archi3BackupStore
+from deployment_history import Archi3DeploymentHistory
+from releases import Archi3ReleaseManager
+from policy_diff import Archi3PolicyDiff
+from transport import Archi3DeltaSync, Archi3DeployTarget, LocalDirectoryTarget
+from tracing import Archi3Tracer, attribute_values
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -23,88 +36,322 @@ logger = logging.getLogger(__name__)
 class Archi3PolicyDeployer:
     """Deploy Archi3 policies to different environments"""
     
-    def __init__(self, policies_dir: str):
+    def __init__(self, policies_dir: str, keep_releases: int = 10,
+                 target_factory: Optional[Callable[[str], Archi3DeployTarget]] = None,
+                 backup_retention: Optional[Dict[str, int]] = None,
+                 lock_timeout: Optional[float] = None):
         self.policies_dir = Path(policies_dir)
         self.core_dir = self.policies_dir / "core"
         self.environments_dir = self.policies_dir / "environments"
         self.deployments_dir = self.policies_dir / "deployments"
         self.backup_dir = self.policies_dir / "backups"
+        self.releases_dir = self.policies_dir / "releases"
         
         # Create necessary directories
         self.deployments_dir.mkdir(exist_ok=True)
         self.backup_dir.mkdir(exist_ok=True)
+        self.backup_store = Archi3BackupStore(str(self.backup_dir))
+        self.history = Archi3DeploymentHistory(str(self.deployments_dir))
+        self.tracer = Archi3Tracer(str(self.deployments_dir / "traces.jsonl"))
+        self.locks_dir = self.deployments_dir / "locks"
+        self.locks_dir.mkdir(exist_ok=True)
+        self.releases = Archi3ReleaseManager(str(self.releases_dir), self.backup_store, keep_releases)
+        # Builds the deployment target for an environment; without one, releases stay local
+        self.target_factory = target_factory
+        # keep_last / keep_daily / keep_weekly applied after each backup; None keeps every backup
+        self.backup_retention = backup_retention
+        # Seconds to wait for another deploy of the same environment; None waits indefinitely
+        self.lock_timeout = lock_timeout
     
     def deploy_to_environment(self, environment: str, validate: bool = True, 
-                            backup: bool = True, dry_run: bool = False) -> Dict[str, Any]:
+                            backup: bool = True, dry_run: bool = False,
+                            force_validate: bool = False) -> Dict[str, Any]:
         """Deploy policies to a specific environment"""
         logger.info(f"Deploying policies to environment: {environment}")
         
+        started = datetime.now()
         deployment_result = {
+            "deployment_id": f"{environment}_{started.strftime('%Y%m%d_%H%M%S_%f')}",
             "environment": environment,
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": started.isoformat(),
             "success": False,
             "steps": [],
             "errors": [],
             "warnings": []
         }
         
+        with self.tracer.span("deploy", {"archi3.environment": environment,
+                                         "archi3.deployment_id": deployment_result["deployment_id"],
+                                         "archi3.dry_run": dry_run}) as span:
+            deployment_result["trace_id"] = span.trace_id
+            
+            if dry_run:
+                # Dry runs change nothing, so they neither wait for nor coalesce with real deploys
+                self._run_deployment(deployment_result, validate, backup, dry_run, force_validate)
+            else:
+                self._run_locked_deployment(deployment_result, started.timestamp(),
+                                            validate, backup, force_validate)
+            
+            span.set_attribute("archi3.success", deployment_result["success"])
+            if deployment_result.get("coalesced_into"):
+                span.set_attribute("archi3.coalesced_into", deployment_result["coalesced_into"])
+            if not deployment_result["success"]:
+                span.set_error("; ".join(deployment_result["errors"]))
+        
+        return deployment_result
+    
+    def _run_locked_deployment(self, deployment_result: Dict[str, Any], requested: float,
+                               validate: bool, backup: bool, force_validate: bool):
+        """Deploy while holding the environment lock, unless a newer deploy already covered this request"""
+        environment = deployment_result["environment"]
+        options = {
+            "validate": validate,
+            "backup": backup,
+            "force_validate": force_validate,
+            "target": self.target_factory(environment).describe() if self.target_factory else None
+        }
+        
+        try:
+            with self._environment_lock(environment):
+                # A deploy that started after this request was made already shipped a tree at least this new;
+                # it only answers for this request if it ran the same steps against the same target
+                last_deploy = self._load_last_deploy(environment)
+                if (last_deploy and last_deploy["started"] >= requested and last_deploy["success"]
+                        and last_deploy.get("options") == options):
+                    deployment_result["success"] = True
+                    deployment_result["requested_id"] = deployment_result["deployment_id"]
+                    deployment_result["deployment_id"] = last_deploy["deployment_id"]
+                    deployment_result["coalesced_into"] = last_deploy["deployment_id"]
+                    if last_deploy.get("release"):
+                        deployment_result["release"] = last_deploy["release"]
+                    deployment_result["steps"].append("coalesced")
+                    logger.info(f"Deployment to {environment} coalesced into {last_deploy['deployment_id']}")
+                    return
+                
+                # Name the deployment after when it actually starts, so release order matches deploy order
+                started = datetime.now()
+                deployment_result["deployment_id"] = f"{environment}_{started.strftime('%Y%m%d_%H%M%S_%f')}"
+                deployment_result["timestamp"] = started.isoformat()
+                self.tracer.current_span().set_attribute("archi3.deployment_id", deployment_result["deployment_id"])
+                
+                self._run_deployment(deployment_result, validate, backup, False, force_validate)
+                self._save_last_deploy(environment, {
+                    "deployment_id": deployment_result["deployment_id"],
+                    "started": started.timestamp(),
+                    "success": deployment_result["success"],
+                    "release": deployment_result.get("release"),
+                    "options": options
+                })
+        except TimeoutError as e:
+            deployment_result["errors"].append(str(e))
+    
+    @contextmanager
+    def _environment_lock(self, environment: str):
+        """Hold the environment's deploy lock, shared by every process using this policies dir"""
+        lock_path = self.locks_dir / f"{environment}.lock"
+        with open(lock_path, 'a') as lock_file:
+            with self.tracer.span("lock-wait"):
+                if self.lock_timeout is None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                else:
+                    deadline = time.monotonic() + self.lock_timeout
+                    while True:
+                        try:
+                            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                            break
+                        except BlockingIOError:
+                            if time.monotonic() >= deadline:
+                                raise TimeoutError(f"Timed out waiting for the {environment} deploy lock")
+                            time.sleep(0.05)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+    
+    def _load_last_deploy(self, environment: str) -> Optional[Dict[str, Any]]:
+        """Start time and outcome of the environment's most recent deploy (read under its lock)"""
+        marker_path = self.locks_dir / f"{environment}.last.json"
+        if not marker_path.exists():
+            return None
+        try:
+            with open(marker_path, 'r') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+    
+    def _save_last_deploy(self, environment: str, marker: Dict[str, Any]):
+        marker_path = self.locks_dir / f"{environment}.last.json"
+        tmp_path = marker_path.with_name(f".{marker_path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(marker, f)
+        os.replace(tmp_path, marker_path)
+    
+    def _run_deployment(self, deployment_result: Dict[str, Any], validate: bool, backup: bool,
+                        dry_run: bool, force_validate: bool):
+        """Run the deployment steps, recording progress in deployment_result"""
+        environment = deployment_result["environment"]
+        
         try:
             # Step 1: Validate policies
             if validate:
-                validation_result = self._validate_policies()
-                deployment_result["steps"].append("validation")
+                validation_result = self._traced("validation", self._validate_policies, force=force_validate)
+                deployment_result["steps"].append("validation-cached" if validation_result.get("cached") else "validation")
                 if not validation_result["valid"]:
                     deployment_result["errors"].extend(validation_result["errors"])
-                    return deployment_result
+                    return
             
             # Step 2: Create backup
             if backup and not dry_run:
-                backup_result = self._create_backup(environment)
+                backup_result = self._traced("backup", self._create_backup, environment, deployment_result["deployment_id"])
                 deployment_result["steps"].append("backup")
-                if not backup_result["success"]:
+                if backup_result["success"]:
+                    deployment_result["backup"] = backup_result["backup_name"]
+                    if self.backup_retention is not None:
+                        prune_result = self._traced("backup-prune", self.prune_backups, environment, **self.backup_retention)
+                        if not prune_result["success"]:
+                            deployment_result["warnings"].append("Backup pruning failed")
+                else:
                     deployment_result["warnings"].append("Backup creation failed")
             
             # Step 3: Deploy core policies
             if not dry_run:
-                core_deployment = self._deploy_core_policies()
+                core_deployment = self._traced("core-deployment", self._deploy_core_policies)
                 deployment_result["steps"].append("core-deployment")
                 if not core_deployment["success"]:
                     deployment_result["errors"].extend(core_deployment["errors"])
-                    return deployment_result
+                    return
             
             # Step 4: Deploy environment-specific policies
             if not dry_run:
-                env_deployment = self._deploy_environment_policies(environment)
+                env_deployment = self._traced("environment-deployment", self._deploy_environment_policies, environment)
                 deployment_result["steps"].append("environment-deployment")
                 if not env_deployment["success"]:
                     deployment_result["errors"].extend(env_deployment["errors"])
-                    return deployment_result
+                    return
             
             # Step 5: Apply policy overrides
             if not dry_run:
-                override_result = self._apply_policy_overrides(environment)
+                override_result = self._traced("policy-overrides", self._apply_policy_overrides, environment)
                 deployment_result["steps"].append("policy-overrides")
                 if not override_result["success"]:
                     deployment_result["warnings"].append("Some policy overrides failed")
             
-            # Step 6: Verify deployment
-            verification_result = self._verify_deployment(environment)
+            # Step 6: Publish an immutable release and switch current to it
+            if not dry_run:
+                release_result = self._traced("release", self._publish_release, environment, deployment_result["deployment_id"])
+                deployment_result["steps"].append("release")
+                if not release_result["success"]:
+                    deployment_result["errors"].extend(release_result["errors"])
+                    return
+                deployment_result["release"] = release_result["release_id"]
+                
+                # Ship the release to the deployment target
+                if self.target_factory:
+                    sync_result = self._traced("sync", self._sync_to_target, environment)
+                    deployment_result["steps"].append("sync")
+                    if not sync_result["success"]:
+                        deployment_result["errors"].extend(sync_result["errors"])
+                        if release_result["previous_release"]:
+                            self.releases.activate(environment, release_result["previous_release"])
+                        return
+                    deployment_result["sync"] = sync_result["sync"]
+            
+            # Dry runs report what the deployment would change
+            if dry_run:
+                diff_result = self._traced("diff", self._diff_against_current, environment)
+                deployment_result["steps"].append("diff")
+                if diff_result["success"]:
+                    deployment_result["diff"] = diff_result["changes"]
+                    deployment_result["deployed_release"] = diff_result["deployed_release"]
+                else:
+                    deployment_result["warnings"].extend(diff_result["errors"])
+            
+            # Step 7: Verify deployment
+            verification_result = self._traced("verification", self._verify_deployment, environment,
+                                               deployment_result.get("release"))
             deployment_result["steps"].append("verification")
             if not verification_result["success"]:
                 deployment_result["warnings"].extend(verification_result["warnings"])
             
-            # Step 7: Update deployment history
+            deployment_result["success"] = True
+            
+            # Step 8: Update deployment history
             if not dry_run:
-                self._update_deployment_history(deployment_result)
+                self._traced("history", self._update_deployment_history, deployment_result)
             
-            deployment_result["success"] = True
             logger.info(f"Successfully deployed to {environment}")
             
         except Exception as e:
             logger.error(f"Deployment failed: {e}")
             deployment_result["errors"].append(str(e))
+
+    
+    def deploy_to_environments(self, environments: List[str], validate: bool = True,
+                               backup: bool = True, dry_run: bool = False,
+                               max_parallel: int = 4, fail_fast: bool = False,
+                               force_validate: bool = False) -> Dict[str, Any]:
+        """Validate once, then deploy to several environments concurrently"""
+        logger.info(f"Deploying policies to {len(environments)} environments: {', '.join(environments)}")
         
-        return deployment_result
+        multi_result = {
+            "environments": environments,
+            "timestamp": datetime.now().isoformat(),
+            "success": False,
+            "results": {},
+            "skipped": [],
+            "errors": []
+        }
+        
+        with self.tracer.span("deploy-many", {"archi3.environments": ",".join(environments),
+                                              "archi3.dry_run": dry_run}) as span:
+            multi_result["trace_id"] = span.trace_id
+            self._run_multi_deployment(multi_result, validate, backup, dry_run,
+                                       max_parallel, fail_fast, force_validate)
+            if not multi_result["success"]:
+                span.set_error("; ".join(multi_result["errors"]) or "Some environments failed")
+        
+        return multi_result
+    
+    def _run_multi_deployment(self, multi_result: Dict[str, Any], validate: bool, backup: bool,
+                              dry_run: bool, max_parallel: int, fail_fast: bool, force_validate: bool):
+        """Validate once and fan the deployments out over a thread pool"""
+        environments = multi_result["environments"]
+        
+        # The tree is shared by every environment, so it only needs validating once
+        if validate:
+            validation_result = self._traced("validation", self._validate_policies, force=force_validate)
+            if not validation_result["valid"]:
+                multi_result["errors"].extend(validation_result["errors"])
+                multi_result["skipped"] = list(environments)
+                return
+        
+        with ThreadPoolExecutor(max_workers=max(1, max_parallel)) as executor:
+            # Each worker runs in a copy of this context so its deploy span joins the trace
+            futures = {
+                executor.submit(contextvars.copy_context().run, self.deploy_to_environment, environment,
+                                validate=False, backup=backup, dry_run=dry_run): environment
+                for environment in environments
+            }
+            
+            for future in as_completed(futures):
+                environment = futures[future]
+                if future.cancelled():
+                    continue
+                result = future.result()
+                multi_result["results"][environment] = result
+                
+                if not result["success"] and fail_fast:
+                    logger.error(f"Deployment to {environment} failed, cancelling pending environments")
+                    for pending in futures:
+                        pending.cancel()
+        
+        multi_result["skipped"] = [env for env in environments if env not in multi_result["results"]]
+        multi_result["success"] = (not multi_result["skipped"] and
+                                   all(r["success"] for r in multi_result["results"].values()))
+    
+    def list_environments(self) -> List[str]:
+        """List environments that have a policy file"""
+        return sorted(path.stem for path in self.environments_dir.glob("*.yaml"))
     
     def rollback_deployment(self, environment: str, deployment_id: str = None) -> Dict[str, Any]:
         """Rollback deployment to previous version"""
@@ -118,26 +365,77 @@ class Archi3PolicyDeployer:
             "errors": []
         }
         
+        with self.tracer.span("rollback", {"archi3.environment": environment,
+                                           "archi3.deployment_id": deployment_id or ""}) as span:
+            rollback_result["trace_id"] = span.trace_id
+            try:
+                with self._environment_lock(environment):
+                    self._run_rollback(rollback_result, deployment_id)
+            except TimeoutError as e:
+                rollback_result["errors"].append(str(e))
+            span.set_attribute("archi3.success", rollback_result["success"])
+            if not rollback_result["success"]:
+                span.set_error("; ".join(rollback_result["errors"]))
+        
+        return rollback_result
+    
+    def _run_rollback(self, rollback_result: Dict[str, Any], deployment_id: str = None):
+        """Run the rollback steps, recording progress in rollback_result"""
+        environment = rollback_result["environment"]
+        
         try:
+            # Releases make rollback a pointer flip; older deployments only have backups
+            if self._has_release(environment, deployment_id):
+                flip = self._traced("activate", self.releases.rollback, environment, deployment_id)
+                rollback_result["steps"].append("activate")
+                rollback_result["from"] = flip["from"]
+                rollback_result["to"] = flip["to"]
+                
+                # Policy consumers and the next deploy read the source tree, so it goes back too
+                restore_result = self._traced("restore", self._restore_release, environment, flip["to"])
+                rollback_result["steps"].append("restore")
+                if not restore_result["success"]:
+                    rollback_result["errors"].extend(restore_result["errors"])
+                    if flip["from"]:
+                        self.releases.activate(environment, flip["from"])
+                    return
+                
+                if self.target_factory:
+                    sync_result = self._traced("sync", self._sync_to_target, environment)
+                    rollback_result["steps"].append("sync")
+                    if not sync_result["success"]:
+                        rollback_result["errors"].extend(sync_result["errors"])
+                        return
+                
+                verification_result = self._traced("verification", self._verify_deployment, environment, flip["to"])
+                rollback_result["steps"].append("verification")
+                if not verification_result["success"]:
+                    rollback_result["errors"].extend(verification_result["warnings"])
+                    return
+                
+                rollback_result["success"] = True
+                logger.info(f"Rolled back {environment} from {flip['from']} to {flip['to']}")
+                return
+            
             # Find backup to restore
-            backup_path = self._find_backup(environment, deployment_id)
+            backup_path = self._traced("find-backup", self._find_backup, environment, deployment_id)
             if not backup_path:
                 rollback_result["errors"].append("No backup found for rollback")
-                return rollback_result
+                return
             
             # Restore from backup
-            restore_result = self._restore_from_backup(backup_path)
+            restore_result = self._traced("restore", self._restore_from_backup, backup_path)
             rollback_result["steps"].append("restore")
             if not restore_result["success"]:
                 rollback_result["errors"].extend(restore_result["errors"])
-                return rollback_result
+                return
             
             # Verify rollback
-            verification_result = self._verify_deployment(environment)
+            verification_result = self._traced("verification", self._verify_deployment, environment)
             rollback_result["steps"].append("verification")
             if not verification_result["success"]:
-                rollback_result["errors"].extend(verification_result["errors"])
-                return rollback_result
+                rollback_result["errors"].extend(verification_result["warnings"])
+                return
             
             rollback_result["success"] = True
             logger.info(f"Successfully rolled back {environment}")
@@ -145,30 +443,101 @@ class Archi3PolicyDeployer:
         except Exception as e:
             logger.error(f"Rollback failed: {e}")
             rollback_result["errors"].append(str(e))
-        
-        return rollback_result
+
+    
+    def prune_backups(self, environment: str, keep_last: int = 10, keep_daily: int = 7,
+                      keep_weekly: int = 4) -> Dict[str, Any]:
+        """Apply backup retention to an environment, compacting older keepers into archives"""
+        try:
+            prune_result = self.backup_store.prune(environment, keep_last=keep_last,
+                                                   keep_daily=keep_daily, keep_weekly=keep_weekly)
+            return {"success": True, **prune_result}
+        except Exception as e:
+            logger.error(f"Backup pruning failed: {e}")
+            return {
+                "success": False,
+                "errors": [str(e)]
+            }
     
-    def list_deployments(self, environment: str = None) -> List[Dict[str, Any]]:
-        """List deployment history"""
-        deployments = []
+    def get_trace(self, trace_or_deployment_id: str) -> Optional[Dict[str, Any]]:
+        """Load the spans of a trace, by trace ID or by the deployment it recorded"""
+        trace_id, root_span_id = trace_or_deployment_id, None
         
-        history_file = self.deployments_dir / "deployment-history.json"
-        if history_file.exists():
-            with open(history_file, 'r') as f:
-                all_deployments = json.load(f)
-            
-            if environment:
-                deployments = [d for d in all_deployments if d.get("environment") == environment]
-            else:
-                deployments = all_deployments
+        # Successful deployments are in the history; failed ones are only found in the trace file
+        deployment = self._find_deployment(trace_or_deployment_id)
+        if deployment and deployment.get("trace_id"):
+            trace_id = deployment["trace_id"]
+        else:
+            trace_id = self.tracer.find_trace_id("archi3.deployment_id", trace_or_deployment_id) or trace_id
+        
+        spans = self.tracer.read_trace(trace_id)
+        if not spans:
+            return None
+        
+        if trace_id != trace_or_deployment_id:
+            root_span_id = next((record["spanId"] for record in spans
+                                 if attribute_values(record).get("archi3.deployment_id") == trace_or_deployment_id),
+                                None)
+        return {
+            "trace_id": trace_id,
+            "spans": spans,
+            "critical_path": self.tracer.critical_path(spans, root_span_id),
+            "root_span_id": root_span_id
+        }
+    
+    def list_deployments(self, environment: str = None, since: str = None, until: str = None,
+                         limit: int = None) -> List[Dict[str, Any]]:
+        """List deployment history, oldest first"""
+        return self.history.read(environment, since=since, until=until, limit=limit)
+    
+    def _traced(self, step: str, func: Callable, *args, **kwargs) -> Any:
+        """Run a deployment step inside a span, marking the span failed if the step reports failure"""
+        with self.tracer.span(step) as span:
+            result = func(*args, **kwargs)
+            if isinstance(result, dict):
+                for key, value in result.items():
+                    if isinstance(value, (bool, int)) and key not in ("success", "valid"):
+                        span.set_attribute(f"archi3.{key}", value)
+                if not result.get("success", result.get("valid", True)):
+                    span.set_error("; ".join(result.get("errors") or result.get("warnings") or []))
+            return result
+    
+    def _find_deployment(self, deployment_id: str) -> Optional[Dict[str, Any]]:
+        """Look up a deployment record by ID, using the timestamp embedded in the ID to skip older history"""
+        parts = deployment_id.rsplit("_", 3)
+        if len(parts) != 4:
+            return None
+        try:
+            started = datetime.strptime("_".join(parts[1:]), "%Y%m%d_%H%M%S_%f")
+        except ValueError:
+            return None
         
-        return deployments
+        for record in self.history.read(parts[0], since=started.isoformat(timespec="microseconds")):
+            if record.get("deployment_id") == deployment_id:
+                return record
+        return None
     
-    def _validate_policies(self) -> Dict[str, Any]:
-        """Validate all policies before deployment"""
+    def _validate_policies(self, force: bool = False) -> Dict[str, Any]:
+        """Validate all policies before deployment, reusing a passed validation of identical content"""
         try:
-            # Import validator
             sys.path.append(str(self.policies_dir / "tools"))
+            from validation_cache import Archi3ValidationCache
+            
+            if not force:
+                cache = Archi3ValidationCache(str(self.policies_dir))
+                fingerprint = cache.fingerprint()["fingerprint"]
+                record = cache.lookup(fingerprint)
+                if record:
+                    logger.info(f"Policies already validated at {record['validated_at']} (fingerprint {fingerprint[:12]})")
+                    return {
+                        "valid": True,
+                        "errors": [],
+                        "cached": True,
+                        "fingerprint": fingerprint,
+                        "details": record
+                    }
+            
+            # Import validator
             from validator import Archi3PolicyValidator
             
             validator = Archi3PolicyValidator(str(self.policies_dir))
@@ -186,39 +555,26 @@ class Archi3PolicyDeployer:
                 "errors": [str(e)]
             }
     
-    def _create_backup(self, environment: str) -> Dict[str, Any]:
+    def _create_backup(self, environment: str, backup_name: str = None) -> Dict[str, Any]:
         """Create backup of current deployment"""
         try:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_name = f"{environment}_{timestamp}"
-            backup_path = self.backup_dir / backup_name
-            
-            # Create backup directory
-            backup_path.mkdir(exist_ok=True)
-            
-            # Copy core policies
-            if self.core_dir.exists():
-                shutil.copytree(self.core_dir, backup_path / "core")
-            
-            # Copy environment policies
-            if self.environments_dir.exists():
-                shutil.copytree(self.environments_dir, backup_path / "environments")
-            
-            # Create backup metadata
-            backup_metadata = {
-                "environment": environment,
-                "timestamp": datetime.now().isoformat(),
-                "backup_path": str(backup_path),
-                "files": list(backup_path.rglob("*"))
-            }
+            if not backup_name:
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                backup_name = f"{environment}_{timestamp}"
             
-            with open(backup_path / "backup-metadata.json", 'w') as f:
-                json.dump(backup_metadata, f, indent=2)
+            # Store file contents once in the shared object store; unchanged files cost nothing
+            manifest = self.backup_store.create_backup(backup_name, environment, {
+                "core": self.core_dir,
+                "environments": self.environments_dir
+            })
             
             return {
                 "success": True,
-                "backup_path": str(backup_path),
-                "backup_name": backup_name
+                "backup_path": str(self.backup_store.manifest_path(backup_name)),
+                "backup_name": backup_name,
+                "files": len(manifest["files"]),
+                "new_objects": manifest["new_objects"],
+                "new_bytes": manifest["new_bytes"]
             }
             
         except Exception as e:
@@ -267,8 +623,7 @@ class Archi3PolicyDeployer:
                     "errors": [f"Environment policy not found: {env_policy_file}"]
                 }
             
-            # Environment policies are already in place
-            # In a real deployment, you would copy them to the target system
+            # Environment policies are already in place; they reach the target with the release sync
             return {"success": True}
             
         except Exception as e:
@@ -280,26 +635,96 @@ class Archi3PolicyDeployer:
     def _apply_policy_overrides(self, environment: str) -> Dict[str, Any]:
         """Apply environment-specific policy overrides"""
         try:
-            # Load environment policy
+            # Import resolver
+            sys.path.append(str(self.policies_dir / "tools"))
+            from resolver import Archi3PolicyResolver
+            
+            # Materialize the effective policy (core policies merged with environment overlays)
+            resolver = Archi3PolicyResolver(str(self.policies_dir))
+            artifact = resolver.resolve(environment)
+            
             env_policy_file = self.environments_dir / f"{environment}.yaml"
             with open(env_policy_file, 'r') as f:
                 env_policy = yaml.safe_load(f)
             
-            # Apply overrides (in a real system, this would modify the running configuration)
-            overrides_applied = []
+            overrides_applied = [section for section in
+                                 ["agent-overrides", "mcp-servers", "security-overrides"]
+                                 if section in env_policy]
             
-            if "agent-overrides" in env_policy:
-                overrides_applied.append("agent-overrides")
+            return {
+                "success": True,
+                "overrides_applied": overrides_applied,
+                "effective_policy": str(resolver.artifact_path(environment)),
+                "sources": artifact["sources"]
+            }
             
-            if "mcp-servers" in env_policy:
-                overrides_applied.append("mcp-servers")
+        except Exception as e:
+            return {
+                "success": False,
+                "errors": [str(e)]
+            }
+    
+    def _publish_release(self, environment: str, release_id: str) -> Dict[str, Any]:
+        """Publish the deployed policy set as a release and make it current"""
+        try:
+            files = {f"core/{path.name}": path for path in sorted(self.core_dir.glob("*.yaml"))}
+            files[f"environments/{environment}.yaml"] = self.environments_dir / f"{environment}.yaml"
+            
+            effective_policy = self.policies_dir / "effective" / f"{environment}.json"
+            if effective_policy.exists():
+                files[f"effective/{environment}.json"] = effective_policy
+            
+            self.releases.create_release(environment, release_id, files)
+            previous = self.releases.activate(environment, release_id)
+            removed = self.releases.garbage_collect(environment)
+            
+            return {
+                "success": True,
+                "release_id": release_id,
+                "previous_release": previous,
+                "removed_releases": removed
+            }
+            
+        except Exception as e:
+            return {
+                "success": False,
+                "errors": [str(e)]
+            }
+    
+    def _diff_against_current(self, environment: str) -> Dict[str, Any]:
+        """Diff the effective policy of the current release against the candidate in the tree"""
+        try:
+            deployed_release = self.releases.current_release(environment)
+            if not deployed_release:
+                return {"success": False, "errors": [f"No deployed release of {environment} to diff against"]}
+            
+            sys.path.append(str(self.policies_dir / "tools"))
+            from resolver import Archi3PolicyResolver
             
-            if "security-overrides" in env_policy:
-                overrides_applied.append("security-overrides")
+            release_dir = self.releases.current_path(environment)
+            deployed_path = release_dir / "effective" / f"{environment}.json"
+            if deployed_path.exists():
+                with open(deployed_path, 'r') as f:
+                    deployed = json.load(f)
+            else:
+                # Releases published without an effective policy are resolved from their own files
+                with tempfile.TemporaryDirectory() as scratch_dir:
+                    release_resolver = Archi3PolicyResolver(str(release_dir), output_dir=scratch_dir)
+                    deployed = release_resolver.resolve(environment, persist=False)
+            
+            resolver = Archi3PolicyResolver(str(self.policies_dir))
+            candidate = resolver.resolve(environment, persist=False)
+            
+            # Sections whose source files are byte-identical cannot differ, so only the rest are hashed
+            sections = set(resolver.changed_sections(environment, deployed["sources"]))
+            sections.update(set(deployed["policy"]) ^ set(candidate["policy"]))
+            deployed_policy = {s: v for s, v in deployed["policy"].items() if s in sections}
+            candidate_policy = {s: v for s, v in candidate["policy"].items() if s in sections}
             
             return {
                 "success": True,
-                "overrides_applied": overrides_applied
+                "deployed_release": deployed_release,
+                "changes": Archi3PolicyDiff().diff(deployed_policy, candidate_policy)
             }
             
         except Exception as e:
@@ -308,8 +733,32 @@ class Archi3PolicyDeployer:
                 "errors": [str(e)]
             }
     
-    def _verify_deployment(self, environment: str) -> Dict[str, Any]:
-        """Verify deployment was successful"""
+    def _sync_to_target(self, environment: str) -> Dict[str, Any]:
+        """Delta-sync the environment's current release to its deployment target"""
+        try:
+            release_dir = self.releases.current_path(environment).resolve()
+            files = {path.relative_to(release_dir).as_posix(): path
+                     for path in sorted(release_dir.rglob("*"))
+                     if path.is_file() and path.name != self.releases.METADATA}
+            
+            sync_result = Archi3DeltaSync().sync(self.target_factory(environment), files)
+            return {"success": True, "sync": sync_result}
+            
+        except Exception as e:
+            return {
+                "success": False,
+                "errors": [f"Sync to target failed: {e}"]
+            }
+    
+    def _has_release(self, environment: str, release_id: str = None) -> bool:
+        """Check whether a rollback can be served by flipping the current release"""
+        if release_id:
+            return release_id in self.releases.list_releases(environment)
+        return self.releases.current_release(environment) is not None and \
+            len(self.releases.list_releases(environment)) > 1
+    
+    def _verify_deployment(self, environment: str, release_id: str = None) -> Dict[str, Any]:
+        """Verify deployment was successful, and that the policy tree holds release_id's files when given"""
         try:
             verification_result = {
                 "success": True,
@@ -327,6 +776,33 @@ class Archi3PolicyDeployer:
                 verification_result["success"] = False
                 verification_result["warnings"].append(f"Environment policy not found: {env_policy}")
             
+            # Check that the current release resolves to a complete policy set
+            current_release = self.releases.current_release(environment)
+            if current_release:
+                release_dir = self.releases.current_path(environment)
+                if not release_dir.is_dir():
+                    verification_result["success"] = False
+                    verification_result["warnings"].append(f"Current release is unreachable: {current_release}")
+                elif not (release_dir / "environments" / f"{environment}.yaml").exists():
+                    verification_result["success"] = False
+                    verification_result["warnings"].append(f"Release {current_release} has no environment policy")
+                elif len(list((release_dir / "core").glob("*.yaml"))) < 3:
+                    verification_result["warnings"].append(f"Release {current_release} may be missing core policies")
+            
+            # The live tree is what consumers enforce; it must match the release just made current
+            if release_id:
+                if current_release != release_id:
+                    verification_result["success"] = False
+                    verification_result["warnings"].append(f"Current release is {current_release}, not {release_id}")
+                released = set(self.releases.load_metadata(environment, release_id)["files"])
+                differing = self.releases.differing_files(environment, release_id, self.policies_dir)
+                differing += [f"core/{path.name}" for path in sorted(self.core_dir.glob("*.yaml"))
+                              if f"core/{path.name}" not in released]
+                if differing:
+                    verification_result["success"] = False
+                    verification_result["warnings"].append(
+                        f"Policy tree differs from release {release_id}: {', '.join(differing)}")
+            
             return verification_result
             
         except Exception as e:
@@ -335,52 +811,66 @@ class Archi3PolicyDeployer:
                 "warnings": [str(e)]
             }
     
+    def _restore_release(self, environment: str, release_id: str) -> Dict[str, Any]:
+        """Write a release's policies back into the tree, dropping core policies it did not ship"""
+        try:
+            restore_stats = self.releases.restore(environment, release_id, self.policies_dir)
+            released = set(restore_stats["files"])
+            removed = []
+            for path in sorted(self.core_dir.glob("*.yaml")):
+                rel = f"core/{path.name}"
+                if rel not in released:
+                    path.unlink()
+                    removed.append(rel)
+            
+            return {
+                "success": True,
+                "restored": restore_stats["restored"],
+                "removed": removed
+            }
+            
+        except Exception as e:
+            return {
+                "success": False,
+                "errors": [str(e)]
+            }
+    
     def _update_deployment_history(self, deployment_result: Dict[str, Any]):
         """Update deployment history"""
-        history_file = self.deployments_dir / "deployment-history.json"
-        
-        # Load existing history
-        history = []
-        if history_file.exists():
-            with open(history_file, 'r') as f:
-                history = json.load(f)
-        
-        # Add new deployment
-        history.append(deployment_result)
-        
-        # Keep only last 100 deployments
-        if len(history) > 100:
-            history = history[-100:]
-        
-        # Save updated history
-        with open(history_file, 'w') as f:
-            json.dump(history, f, indent=2)
+        self.history.append(deployment_result)
     
     def _find_backup(self, environment: str, deployment_id: str = None) -> Optional[Path]:
         """Find backup for rollback"""
         if deployment_id:
             # Find specific backup
+            if self.backup_store.find_backup(environment, deployment_id):
+                return self.backup_store.manifest_path(deployment_id)
+            
+            # Backups taken before the object store are full directory copies
             backup_path = self.backup_dir / deployment_id
-            if backup_path.exists():
+            if backup_path.is_dir():
                 return backup_path
         else:
-            # Find latest backup for environment
-            env_backups = list(self.backup_dir.glob(f"{environment}_*"))
-            if env_backups:
-                # Sort by timestamp and return latest
-                env_backups.sort(key=lambda x: x.name)
-                return env_backups[-1]
+            # Find latest backup for environment from the index
+            latest = self.backup_store.latest_backup(environment)
+            if latest:
+                return self.backup_store.manifest_path(latest)
+            
+            legacy_backups = sorted(path for path in self.backup_dir.glob(f"{environment}_*") if path.is_dir())
+            if legacy_backups:
+                return legacy_backups[-1]
         
         return None
     
     def _restore_from_backup(self, backup_path: Path) -> Dict[str, Any]:
         """Restore from backup"""
         try:
-            # Load backup metadata
-            metadata_file = backup_path / "backup-metadata.json"
-            if metadata_file.exists():
-                with open(metadata_file, 'r') as f:
-                    metadata = json.load(f)
+            if backup_path.suffix == ".json":
+                # Content-addressed backup: rewrite only files whose content differs
+                restore_stats = self.backup_store.restore(
+                    backup_path.stem, self.policies_dir, prefixes=["core", "environments"]
+                )
+                return {"success": True, **restore_stats}
             
             # Restore core policies
             core_backup = backup_path / "core"
@@ -409,17 +899,45 @@ def main():
     parser = argparse.ArgumentParser(description="Archi3 Policy Deployer")
     parser.add_argument("--policies-dir", default="./archi3/policies",
                        help="Path to policies directory")
-    parser.add_argument("--environment", required=True,
+    parser.add_argument("--environment",
                        help="Target environment")
-    parser.add_argument("--action", choices=["deploy", "rollback", "list"], 
+    parser.add_argument("--environments",
+                       help="Comma-separated target environments for a concurrent deploy")
+    parser.add_argument("--all-environments", action="store_true",
+                       help="Deploy to every environment with a policy file")
+    parser.add_argument("--max-parallel", type=int, default=4,
+                       help="Maximum environments deployed concurrently")
+    parser.add_argument("--fail-fast", action="store_true",
+                       help="Stop starting new environments after the first failure")
+    parser.add_argument("id", nargs="?",
+                       help="Deployment or trace ID for --action trace")
+    parser.add_argument("--action", choices=["deploy", "rollback", "list", "prune", "trace"], 
                        default="deploy", help="Action to perform")
     parser.add_argument("--deployment-id", help="Deployment ID for rollback")
+    parser.add_argument("--since", help="List deployments recorded at or after this ISO timestamp")
+    parser.add_argument("--until", help="List deployments recorded at or before this ISO timestamp")
+    parser.add_argument("--limit", type=int, default=10,
+                       help="Maximum number of deployments to list (0 for all)")
     parser.add_argument("--validate", action="store_true", default=True,
                        help="Validate policies before deployment")
+    parser.add_argument("--force-validate", action="store_true",
+                       help="Run full validation even if identical content already passed")
+    parser.add_argument("--keep-backups", type=int,
+                       help="Backup retention: newest backups kept restorable as-is (enables pruning on deploy)")
+    parser.add_argument("--keep-daily", type=int,
+                       help="Backup retention: days whose newest backup is archived")
+    parser.add_argument("--keep-weekly", type=int,
+                       help="Backup retention: ISO weeks whose newest backup is archived")
     parser.add_argument("--no-backup", action="store_true",
                        help="Skip backup creation")
     parser.add_argument("--dry-run", action="store_true",
                        help="Perform dry run without actual deployment")
+    parser.add_argument("--target-dir",
+                       help="Delta-sync each deployed release to <target-dir>/<environment>")
+    parser.add_argument("--lock-timeout", type=float,
+                       help="Seconds to wait for a running deploy of the same environment (default: wait)")
+    parser.add_argument("--keep-releases", type=int, default=10,
+                       help="Number of releases to keep per environment")
     parser.add_argument("--verbose", "-v", action="store_true",
                        help="Verbose output")
     
@@ -429,20 +947,90 @@ def main():
         logging.getLogger().setLevel(logging.DEBUG)
     
     # Initialize deployer
-    deployer = Archi3PolicyDeployer(args.policies_dir)
+    target_factory = None
+    if args.target_dir:
+        target_factory = lambda environment: LocalDirectoryTarget(str(Path(args.target_dir) / environment))
+    backup_retention = None
+    if args.keep_backups is not None or args.keep_daily is not None or args.keep_weekly is not None:
+        backup_retention = {
+            "keep_last": 10 if args.keep_backups is None else args.keep_backups,
+            "keep_daily": 7 if args.keep_daily is None else args.keep_daily,
+            "keep_weekly": 4 if args.keep_weekly is None else args.keep_weekly
+        }
+    deployer = Archi3PolicyDeployer(args.policies_dir, keep_releases=args.keep_releases,
+                                    target_factory=target_factory, backup_retention=backup_retention,
+                                    lock_timeout=args.lock_timeout)
+    
+    if args.environments or args.all_environments:
+        if args.action not in ("deploy", "prune"):
+            parser.error("--environments and --all-environments only apply to --action deploy and prune")
+    elif args.action == "trace":
+        if not (args.id or args.deployment_id):
+            parser.error("--action trace needs a deployment or trace ID")
+    elif not args.environment and args.action != "list":
+        parser.error("--environment is required")
     
     try:
-        if args.action == "deploy":
+        if args.action == "deploy" and (args.environments or args.all_environments):
+            if args.all_environments:
+                environments = deployer.list_environments()
+            else:
+                environments = [env.strip() for env in args.environments.split(",") if env.strip()]
+            
+            multi_result = deployer.deploy_to_environments(
+                environments,
+                validate=args.validate,
+                backup=not args.no_backup,
+                dry_run=args.dry_run,
+                max_parallel=args.max_parallel,
+                fail_fast=args.fail_fast,
+                force_validate=args.force_validate
+            )
+            
+            for error in multi_result["errors"]:
+                print(f"❌ Error: {error}")
+            for environment in environments:
+                result = multi_result["results"].get(environment)
+                if result is None:
+                    print(f"⏭️  {environment}: skipped")
+                elif result.get("coalesced_into"):
+                    print(f"⏭️  {environment}: coalesced into {result['coalesced_into']}")
+                elif result["success"]:
+                    print(f"✅ {environment}: {', '.join(result['steps'])}")
+                    for warning in result["warnings"]:
+                        print(f"   Warning: {warning}")
+                else:
+                    print(f"❌ {environment}: failed")
+                    for error in result["errors"]:
+                        print(f"   Error: {error}")
+            
+            if not multi_result["success"]:
+                sys.exit(1)
+        
+        elif args.action == "deploy":
             result = deployer.deploy_to_environment(
                 args.environment,
                 validate=args.validate,
                 backup=not args.no_backup,
-                dry_run=args.dry_run
+                dry_run=args.dry_run,
+                force_validate=args.force_validate
             )
             
-            if result["success"]:
+            if result.get("coalesced_into"):
+                print(f"⏭️  Deployment to {args.environment} coalesced into {result['coalesced_into']}, "
+                      f"which started after this request")
+            elif result["success"]:
                 print(f"✅ Successfully deployed to {args.environment}")
                 print(f"Steps completed: {', '.join(result['steps'])}")
+                print(f"Deployment ID: {result['deployment_id']} (trace {result['trace_id']})")
+                if "sync" in result:
+                    print(f"Synced to {result['sync']['target']}: {len(result['sync']['changed'])} changed, "
+                          f"{len(result['sync']['deleted'])} deleted, {result['sync']['bytes_sent']} bytes sent")
+                if "diff" in result:
+                    print(f"Changes against release {result['deployed_release']}: {len(result['diff'])}")
+                    differ = Archi3PolicyDiff()
+                    for change in result["diff"]:
+                        print(f"   {differ.format_change(change)}")
             else:
                 print(f"❌ Deployment to {args.environment} failed")
                 for error in result["errors"]:
@@ -459,6 +1047,8 @@ def main():
             
             if result["success"]:
                 print(f"✅ Successfully rolled back {args.environment}")
+                if "to" in result:
+                    print(f"Current release: {result['from']} → {result['to']}")
                 print(f"Steps completed: {', '.join(result['steps'])}")
             else:
                 print(f"❌ Rollback of {args.environment} failed")
@@ -466,17 +1056,86 @@ def main():
                     print(f"   Error: {error}")
                 sys.exit(1)
         
+        elif args.action == "prune":
+            if args.all_environments:
+                environments = deployer.backup_store.environments()
+            elif args.environments:
+                environments = [env.strip() for env in args.environments.split(",") if env.strip()]
+            else:
+                environments = [args.environment]
+            
+            failed = False
+            for environment in environments:
+                result = deployer.prune_backups(environment, **(backup_retention or {}))
+                if result["success"]:
+                    print(f"✅ {environment}: kept {result['kept']} backups "
+                          f"({len(result['compacted'])} newly archived), deleted {len(result['deleted'])}, "
+                          f"removed {result['removed_objects']} unreferenced objects")
+                else:
+                    failed = True
+                    print(f"❌ {environment}: pruning failed")
+                    for error in result["errors"]:
+                        print(f"   Error: {error}")
+            
+            if failed:
+                sys.exit(1)
+        
+        elif args.action == "trace":
+            trace_id = args.id or args.deployment_id
+            trace = deployer.get_trace(trace_id)
+            if trace is None:
+                print(f"❌ No trace found for {trace_id}")
+                sys.exit(1)
+            
+            spans = trace["spans"]
+            on_path = {record["spanId"] for record in trace["critical_path"]}
+            root = trace["critical_path"][0]
+            root_start = int(root["startTimeUnixNano"])
+            root_duration = max(int(root["endTimeUnixNano"]) - root_start, 1)
+            
+            children = {}
+            for record in spans:
+                children.setdefault(record["parentSpanId"], []).append(record)
+            
+            print(f"Trace {trace['trace_id']} ({root['name']}, {root_duration / 1e6:.1f} ms)")
+            print("   start ms   duration ms   span (* = critical path)")
+            
+            def render(record, depth):
+                start = (int(record["startTimeUnixNano"]) - root_start) / 1e6
+                duration = (int(record["endTimeUnixNano"]) - int(record["startTimeUnixNano"])) / 1e6
+                marker = "*" if record["spanId"] in on_path else " "
+                status = " ❌ " + record["status"]["message"] if record["status"]["code"] == "STATUS_CODE_ERROR" else ""
+                label = record["name"]
+                attributes = attribute_values(record)
+                if "archi3.environment" in attributes and record["name"] != "deploy-many":
+                    label += f" [{attributes['archi3.environment']}]"
+                print(f"   {start:8.1f}   {duration:11.1f}   {marker} {'  ' * depth}{label}{status}")
+                for child in children.get(record["spanId"], []):
+                    render(child, depth + 1)
+            
+            render(root, 0)
+            
+            print("Critical path:")
+            for record in trace["critical_path"]:
+                duration = int(record["endTimeUnixNano"]) - int(record["startTimeUnixNano"])
+                print(f"   {record['name']}: {duration / 1e6:.1f} ms ({100 * duration / root_duration:.0f}%)")
+        
         elif args.action == "list":
-            deployments = deployer.list_deployments(args.environment)
+            deployments = deployer.list_deployments(
+                args.environment,
+                since=args.since,
+                until=args.until,
+                limit=args.limit or None
+            )
             
             if deployments:
-                print(f"Deployment history for {args.environment}:")
-                for deployment in deployments[-10:]:  # Show last 10
+                print(f"Deployment history for {args.environment or 'all environments'}:")
+                for deployment in deployments:
                     status = "✅" if deployment["success"] else "❌"
                     timestamp = deployment["timestamp"]
-                    print(f"   {status} {timestamp}")
+                    print(f"   {status} {timestamp} {deployment.get('deployment_id', '')}")
             else:
-                print(f"No deployments found for {args.environment}")
+                print(f"No deployments found for {args.environment or 'any environment'}")
         
     except Exception as e:
         logger.error(f"Deployment operation failed: {e}")
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Archi3 Deployment History
+Append-only, segment-rotated deployment log with a per-environment index
+"""
+
+import json
+import os
+import re
+import fcntl
+import heapq
+import tempfile
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Iterator
+from contextlib import contextmanager
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Archi3DeploymentHistory:
+    """Append deployment records to rotated JSONL segments indexed by environment and time"""
+
+    # Fixed-width index records allow binary search by timestamp: "<timestamp> <segment> <offset> <length>\n"
+    INDEX_RECORD = "{timestamp:<32} {segment:06d} {offset:012d} {length:010d}\n"
+    INDEX_RECORD_SIZE = 64
+
+    def __init__(self, deployments_dir: str, max_segment_bytes: int = 4 * 1024 * 1024):
+        self.deployments_dir = Path(deployments_dir)
+        self.history_dir = self.deployments_dir / "history"
+        self.index_dir = self.history_dir / "index"
+        self.lock_path = self.history_dir / ".lock"
+        self.max_segment_bytes = max_segment_bytes
+
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self._migrate_legacy_history()
+
+    def append(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Append a deployment record; safe against concurrent writers in other processes"""
+        with self._locked():
+            return self._append_locked(record)
+
+    def _append_locked(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Write a record to the active segment and index it under its own timestamp"""
+        line = (json.dumps(record, sort_keys=True) + "\n").encode("utf-8")
+        environment = record.get("environment", "unknown")
+
+        segment = self._active_segment(len(line))
+        segment_path = self._segment_path(segment)
+        with open(segment_path, 'ab') as f:
+            offset = f.tell()
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+        timestamp = self._index_timestamp(record)
+        index_record = self.INDEX_RECORD.format(
+            timestamp=timestamp, segment=segment, offset=offset, length=len(line)
+        ).encode("ascii")
+        index_path = self._index_path(environment)
+        with open(index_path, 'ab+') as f:
+            size = f.tell()
+            torn = size % self.INDEX_RECORD_SIZE
+            if torn:
+                # Drop a record torn by a crash so later records stay aligned
+                size -= torn
+                f.truncate(size)
+            last = None
+            if size:
+                f.seek(size - self.INDEX_RECORD_SIZE)
+                last = self._parse_index_record(f.read(self.INDEX_RECORD_SIZE))[0]
+            if last is None or last <= timestamp:
+                f.seek(size)
+                f.write(index_record)
+                f.flush()
+                os.fsync(f.fileno())
+                return {"segment": segment, "offset": offset, "length": len(line), "recorded": timestamp}
+
+        # Older than the newest indexed record (an imported or late record): rewrite the index in order
+        self._insert_index_record(index_path, index_record)
+        return {"segment": segment, "offset": offset, "length": len(line), "recorded": timestamp}
+
+    def _index_timestamp(self, record: Dict[str, Any]) -> str:
+        """The record's own timestamp in the fixed microsecond form the index compares; now if it has none"""
+        try:
+            moment = datetime.fromisoformat(record["timestamp"])
+        except (KeyError, TypeError, ValueError):
+            moment = datetime.now()
+        if moment.tzinfo is not None:
+            # Local naive time like the deployer's own records, and short enough for the fixed-width field
+            moment = moment.astimezone().replace(tzinfo=None)
+        return moment.isoformat(timespec="microseconds")
+
+    def _insert_index_record(self, index_path: Path, index_record: bytes):
+        """Insert a record at its sorted position, replacing the index file atomically"""
+        with open(index_path, 'rb') as f:
+            data = f.read()
+        data = data[:len(data) - len(data) % self.INDEX_RECORD_SIZE]
+        records = [data[i:i + self.INDEX_RECORD_SIZE] for i in range(0, len(data), self.INDEX_RECORD_SIZE)]
+        timestamp = self._parse_index_record(index_record)[0]
+        position = len(records)
+        while position and self._parse_index_record(records[position - 1])[0] > timestamp:
+            position -= 1
+        records.insert(position, index_record)
+
+        fd, tmp_name = tempfile.mkstemp(prefix=f".{index_path.name}.", suffix=".tmp", dir=str(index_path.parent))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(b"".join(records))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_name, index_path)
+        except BaseException:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            raise
+
+    def read(self, environment: str = None, since: str = None, until: str = None,
+             limit: int = None) -> List[Dict[str, Any]]:
+        """Read records for one or all environments, oldest first, optionally bounded by time and count"""
+        if environment:
+            entries = list(self._index_range(environment, since, until, limit))
+        else:
+            entries = list(heapq.merge(*[self._index_range(env, since, until, limit)
+                                         for env in self.environments()]))
+
+        if limit is not None:
+            entries = entries[-limit:] if limit else []
+
+        records = []
+        for _, segment, offset, length in entries:
+            record = self._read_record(segment, offset, length)
+            if record is not None:
+                records.append(record)
+        return records
+
+    def environments(self) -> List[str]:
+        """Environments that have at least one recorded deployment"""
+        return sorted(self._decode_name(path.stem) for path in self.index_dir.glob("*.idx"))
+
+    def _index_range(self, environment: str, since: str = None, until: str = None,
+                     limit: int = None) -> Iterator[tuple]:
+        """Yield (timestamp, segment, offset, length) for index records within [since, until]"""
+        index_path = self._index_path(environment)
+        if not index_path.exists():
+            return
+
+        with open(index_path, 'rb') as f:
+            count = os.fstat(f.fileno()).st_size // self.INDEX_RECORD_SIZE
+            start = self._bisect(f, count, since) if since else 0
+            if limit is not None and until is None:
+                # Only the newest records can survive the limit, skip straight to them
+                start = max(start, count - limit)
+
+            f.seek(start * self.INDEX_RECORD_SIZE)
+            for _ in range(start, count):
+                entry = self._parse_index_record(f.read(self.INDEX_RECORD_SIZE))
+                if until and entry[0] > until:
+                    break
+                yield entry
+
+    def _bisect(self, f, count: int, since: str) -> int:
+        """Find the first index record whose timestamp is >= since"""
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            f.seek(middle * self.INDEX_RECORD_SIZE)
+            if self._parse_index_record(f.read(self.INDEX_RECORD_SIZE))[0] < since:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _parse_index_record(self, raw: bytes) -> tuple:
+        timestamp, segment, offset, length = raw.decode("ascii").split()
+        return timestamp, int(segment), int(offset), int(length)
+
+    def _read_record(self, segment: int, offset: int, length: int) -> Optional[Dict[str, Any]]:
+        with open(self._segment_path(segment), 'rb') as f:
+            f.seek(offset)
+            try:
+                return json.loads(f.read(length))
+            except json.JSONDecodeError:
+                logger.warning(f"Skipping corrupt history record in segment {segment} at {offset}")
+                return None
+
+    def _active_segment(self, incoming_bytes: int) -> int:
+        """Return the segment to append to, rotating when the current one is full"""
+        segments = sorted(int(path.stem.split("-")[1]) for path in self.history_dir.glob("segment-*.jsonl"))
+        if not segments:
+            return 1
+
+        current = segments[-1]
+        if self._segment_path(current).stat().st_size + incoming_bytes > self.max_segment_bytes:
+            return current + 1
+        return current
+
+    def _segment_path(self, segment: int) -> Path:
+        return self.history_dir / f"segment-{segment:06d}.jsonl"
+
+    def _index_path(self, environment: str) -> Path:
+        return self.index_dir / f"{self._encode_name(environment)}.idx"
+
+    def _encode_name(self, environment: str) -> str:
+        return re.sub(r'[^A-Za-z0-9_.-]', lambda m: f"%{ord(m.group(0)):02x}", environment)
+
+    def _decode_name(self, name: str) -> str:
+        return re.sub(r'%([0-9a-f]{2})', lambda m: chr(int(m.group(1), 16)), name)
+
+    @contextmanager
+    def _locked(self):
+        """Hold an exclusive lock on the history across processes"""
+        with open(self.lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _migrate_legacy_history(self):
+        """Import deployment-history.json written by earlier deployer versions"""
+        legacy_path = self.deployments_dir / "deployment-history.json"
+        if not legacy_path.exists():
+            return
+
+        with self._locked():
+            if not legacy_path.exists():
+                return
+            try:
+                with open(legacy_path, 'r') as f:
+                    legacy = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning(f"Could not migrate {legacy_path}: {e}")
+                return
+
+            # A migration interrupted before the rename is resumed without duplicating what it appended
+            imported = {self._record_key(record) for record in self.read()}
+            missing = [record for record in legacy if self._record_key(record) not in imported]
+            for record in missing:
+                self._append_locked(record)
+            legacy_path.rename(legacy_path.with_suffix(".json.migrated"))
+
+        logger.info(f"Migrated {len(missing)} of {len(legacy)} deployments from {legacy_path}")
+
+    def _record_key(self, record: Dict[str, Any]) -> str:
+        return record.get("deployment_id") or json.dumps(record, sort_keys=True)
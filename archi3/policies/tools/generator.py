@@ -6,15 +6,21 @@ Generate policies from templates with variable substitution
 
 import yaml
 import json
+import copy
 import os
 import sys
+import hashlib
+import tempfile
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List
 from datetime import datetime
 import argparse
 import logging
 import re
 
+sys.path.append(str(Path(__file__).resolve().parent))
+from serializer import Archi3PolicySerializer
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -22,10 +28,15 @@ logger = logging.getLogger(__name__)
 class Archi3PolicyGenerator:
     """Generate Archi3 policies from templates"""
     
+    ROUTING_TABLES_VERSION = "1.1.0"
+    
     def __init__(self, policies_dir: str):
         self.policies_dir = Path(policies_dir)
         self.templates_dir = self.policies_dir / "templates"
         self.output_dir = self.policies_dir / "generated"
+        self.manifest_path = self.output_dir / "manifest.json"
+        self._manifest = None
+        self.serializer = Archi3PolicySerializer()
         
         # Create output directory if it doesn't exist
         self.output_dir.mkdir(exist_ok=True)
@@ -51,11 +62,37 @@ class Archi3PolicyGenerator:
         
         output_path = self.output_dir / f"{output_name}.yaml"
         
-        # Write generated policy
-        with open(output_path, 'w') as f:
-            yaml.dump(substituted_content, f, default_flow_style=False, sort_keys=False)
+        # Write generated policy (skipped when content is unchanged)
+        if self._write_policy(output_path, substituted_content):
+            logger.info(f"Generated agent policy: {output_path}")
+        else:
+            logger.info(f"Agent policy unchanged: {output_path}")
+        return str(output_path)
+    
+    def generate_agent_policy_catalog(self, template_name: str, variable_sets: List[Dict[str, str]],
+                                      output_name: str = None) -> str:
+        """Generate many agent policies from one template into a multi-document YAML stream"""
+        template_path = self.templates_dir / f"{template_name}.yaml"
+        
+        if not template_path.exists():
+            raise FileNotFoundError(f"Template not found: {template_path}")
+        
+        # Load template once for the whole catalog
+        with open(template_path, 'r') as f:
+            template_content = yaml.safe_load(f)
         
-        logger.info(f"Generated agent policy: {output_path}")
+        documents = [self._substitute_variables(template_content, variables) for variables in variable_sets]
+        
+        if not output_name:
+            output_name = f"{template_name}-catalog"
+        
+        output_path = self.output_dir / f"{output_name}.yaml"
+        
+        # Write all policies as one stream (skipped when content is unchanged)
+        if self._write_output(output_path, self.serializer.dump_stream(documents)):
+            logger.info(f"Generated catalog of {len(documents)} agent policies: {output_path}")
+        else:
+            logger.info(f"Agent policy catalog unchanged: {output_path}")
         return str(output_path)
     
     def generate_environment_policy(self, base_environment: str, variables: Dict[str, str],
@@ -79,11 +116,11 @@ class Archi3PolicyGenerator:
         
         output_path = self.output_dir / f"{output_name}.yaml"
         
-        # Write generated policy
-        with open(output_path, 'w') as f:
-            yaml.dump(substituted_content, f, default_flow_style=False, sort_keys=False)
-        
-        logger.info(f"Generated environment policy: {output_path}")
+        # Write generated policy (skipped when content is unchanged)
+        if self._write_policy(output_path, substituted_content):
+            logger.info(f"Generated environment policy: {output_path}")
+        else:
+            logger.info(f"Environment policy unchanged: {output_path}")
         return str(output_path)
     
     def generate_workflow_policy(self, workflow_type: str, variables: Dict[str, str],
@@ -97,7 +134,7 @@ class Archi3PolicyGenerator:
             "metadata": {
                 "name": f"{workflow_type}-workflow",
                 "description": f"Workflow policy for {workflow_type}",
-                "lastUpdated": datetime.now().isoformat(),
+                "lastUpdated": None,
                 "author": variables.get("AUTHOR_NAME", "Archi3 System")
             },
             "workflow": {
@@ -118,13 +155,234 @@ class Archi3PolicyGenerator:
         
         output_path = self.output_dir / f"{output_name}.yaml"
         
-        # Write generated policy
-        with open(output_path, 'w') as f:
-            yaml.dump(workflow_template, f, default_flow_style=False, sort_keys=False)
+        # A regenerated but otherwise identical workflow keeps its timestamp, so its hash is unchanged
+        workflow_template["metadata"]["lastUpdated"] = self._stable_timestamp(output_path, workflow_template)
         
-        logger.info(f"Generated workflow policy: {output_path}")
+        # Write generated policy (skipped when content is unchanged)
+        if self._write_policy(output_path, workflow_template):
+            logger.info(f"Generated workflow policy: {output_path}")
+        else:
+            logger.info(f"Workflow policy unchanged: {output_path}")
         return str(output_path)
-    
+
+    def generate_routing_tables(self, output_name: str = None) -> str:
+        """Compile orchestration task-classification and agent-selection into lookup tables"""
+        source_path = self.policies_dir / "core" / "orchestration-policies.yaml"
+
+        if not source_path.exists():
+            raise FileNotFoundError(f"Orchestration policy not found: {source_path}")
+
+        with open(source_path, 'rb') as f:
+            source_bytes = f.read()
+        orchestration = yaml.safe_load(source_bytes)
+
+        agent_selection = orchestration.get("agent-selection", {})
+        complexity_levels = orchestration.get("task-classification", {}).get("complexity-levels", {})
+
+        # Single domains and the keywords that trigger them
+        domains = {}
+        keyword_domains = {}
+        manager_domains = {}
+        for domain, definition in agent_selection.get("primary-domain-classification", {}).items():
+            domains[domain] = {
+                "primary-manager": definition.get("primary-manager"),
+                "supporting-managers": definition.get("supporting-managers", []),
+                "trigger-keywords": definition.get("trigger-keywords", [])
+            }
+            manager_domains.setdefault(definition.get("primary-manager"), domain)
+            for keyword in definition.get("trigger-keywords", []):
+                keyword_domains.setdefault(keyword.lower(), []).append(domain)
+
+        # Multi-domain tasks keyed by the sorted combination of domains they cover
+        domain_combinations = {}
+        fallback = None
+        for task, definition in agent_selection.get("multi-domain-tasks", {}).items():
+            supporting = definition.get("supporting-managers", definition.get("supporting-manager"))
+            route = {
+                "task": task,
+                "primary-manager": definition.get("primary-manager"),
+                "supporting-managers": supporting if isinstance(supporting, list) else [supporting],
+                "coordination-strategy": definition.get("coordination-strategy")
+            }
+
+            covered = [manager_domains.get(manager) for manager in [route["primary-manager"]] + route["supporting-managers"]]
+            if None in covered:
+                # Managers such as "context-dependent" do not name a domain
+                fallback = route
+                continue
+            domain_combinations[self.routing_key(covered)] = route
+
+        complexity = {}
+        for level, definition in complexity_levels.items():
+            complexity[level] = {
+                "description": definition.get("description"),
+                "characteristics": [key for item in definition.get("characteristics", []) for key in item],
+                "examples": definition.get("examples", []),
+                "routing-logic": definition.get("routing-logic"),
+                "quality-gates": definition.get("quality-gates", []),
+                "timeline": definition.get("timeline"),
+                "resource-requirements": definition.get("resource-requirements")
+            }
+
+        routing_tables = {
+            "version": self.ROUTING_TABLES_VERSION,
+            "source": {
+                "file": "core/orchestration-policies.yaml",
+                "sha256": hashlib.sha256(source_bytes).hexdigest()
+            },
+            "domains": domains,
+            "keyword-domains": keyword_domains,
+            "domain-combinations": domain_combinations,
+            "fallback": fallback,
+            "complexity": complexity,
+            # Least to most complex; the JSON keys above are sorted
+            "complexity-order": list(complexity)
+        }
+
+        if not output_name:
+            output_name = "routing-tables"
+
+        output_path = self.output_dir / f"{output_name}.json"
+
+        # JSON loads far faster than YAML at orchestrator startup
+        if self._write_output(output_path, json.dumps(routing_tables, indent=2, sort_keys=True)):
+            logger.info(f"Generated routing tables: {output_path}")
+        else:
+            logger.info(f"Routing tables unchanged: {output_path}")
+        return str(output_path)
+
+    def load_routing_tables(self) -> Dict[str, Any]:
+        """Return the routing tables, regenerating them if missing, outdated or built from an older policy"""
+        tables_path = self.output_dir / "routing-tables.json"
+        with open(self.policies_dir / "core" / "orchestration-policies.yaml", 'rb') as f:
+            source_digest = hashlib.sha256(f.read()).hexdigest()
+
+        if tables_path.exists():
+            with open(tables_path, 'r') as f:
+                routing_tables = json.load(f)
+            if (routing_tables.get("version") == self.ROUTING_TABLES_VERSION and
+                    routing_tables.get("source", {}).get("sha256") == source_digest):
+                return routing_tables
+            logger.info("Routing tables are stale, regenerating")
+
+        with open(self.generate_routing_tables(), 'r') as f:
+            return json.load(f)
+
+    @staticmethod
+    def routing_key(domains: List[str]) -> str:
+        """Lookup key of a domain combination in the compiled routing tables"""
+        return "+".join(sorted(set(domains)))
+
+    def load_manifest(self) -> Dict[str, Any]:
+        """Load the manifest of generated output hashes; a copy the caller is free to change"""
+        return copy.deepcopy(self._load_manifest())
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        """The cached manifest the generator updates as it writes"""
+        if self._manifest is None:
+            manifest = {"version": "1.0.0", "files": {}}
+            if self.manifest_path.exists():
+                try:
+                    with open(self.manifest_path, 'r') as f:
+                        manifest = json.load(f)
+                except (OSError, json.JSONDecodeError) as e:
+                    logger.warning(f"Ignoring unreadable manifest {self.manifest_path}: {e}")
+            self._manifest = manifest
+        return self._manifest
+
+    def get_changed_policies(self, previous_manifest: Dict[str, Any]) -> List[str]:
+        """List generated outputs whose content differs from a previously seen manifest"""
+        previous_files = previous_manifest.get("files", {})
+        changed = []
+        for name, entry in self._load_manifest()["files"].items():
+            if previous_files.get(name, {}).get("sha256") != entry["sha256"]:
+                changed.append(name)
+        return sorted(changed)
+
+    def _stable_timestamp(self, output_path: Path, content: Dict[str, Any]) -> str:
+        """lastUpdated of the existing output if it matches content apart from that field, else now"""
+        if output_path.exists():
+            try:
+                with open(output_path, 'r') as f:
+                    previous = yaml.safe_load(f)
+                previous_timestamp = previous["metadata"]["lastUpdated"]
+                previous["metadata"]["lastUpdated"] = content["metadata"]["lastUpdated"]
+                if previous == content:
+                    return previous_timestamp
+            except (OSError, yaml.YAMLError, KeyError, TypeError) as e:
+                logger.debug(f"Not reusing timestamp of {output_path}: {e}")
+        return datetime.now().isoformat()
+
+    def _write_policy(self, output_path: Path, content: Any) -> bool:
+        """Serialize a policy and write it, returning False when the file is already current"""
+        return self._write_output(output_path, self.serializer.dump(content))
+
+    def _write_output(self, output_path: Path, text: str) -> bool:
+        """Write generated output atomically, skipping the write when its hash is unchanged"""
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        manifest = self._load_manifest()
+        entry = manifest["files"].get(output_path.name)
+
+        if output_path.exists() and self._hash_matches(output_path, entry, digest):
+            if entry is None or entry.get("sha256") != digest:
+                # File is current but the manifest lost track of it
+                self._record_output(manifest, output_path, digest, len(data))
+                self._save_manifest(manifest)
+            return False
+
+        self._atomic_write(output_path, data)
+        self._record_output(manifest, output_path, digest, len(data))
+        self._save_manifest(manifest)
+        return True
+
+    def _hash_matches(self, output_path: Path, entry: Optional[Dict[str, Any]], digest: str) -> bool:
+        """Check whether an existing file already holds content with the given hash
+
+        A file whose size and mtime are those recorded when we wrote it is taken to be untouched,
+        and its recorded hash is trusted instead of rereading it. On filesystems with coarse
+        (millisecond or whole-second) mtimes a same-size edit made within the same tick would keep
+        that mtime, so there the file is always hashed.
+        """
+        stat = output_path.stat()
+        if (entry and entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns
+                and stat.st_mtime_ns % 1_000_000):
+            return entry.get("sha256") == digest
+
+        with open(output_path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest() == digest
+
+    def _record_output(self, manifest: Dict[str, Any], output_path: Path, digest: str, size: int):
+        """Record the hash of a generated output in the manifest"""
+        manifest["files"][output_path.name] = {
+            "sha256": digest,
+            "size": size,
+            "mtime_ns": output_path.stat().st_mtime_ns,
+            "updated": datetime.now().isoformat()
+        }
+
+    def _save_manifest(self, manifest: Dict[str, Any]):
+        """Persist the output manifest"""
+        manifest["lastUpdated"] = datetime.now().isoformat()
+        data = json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8")
+        self._atomic_write(self.manifest_path, data)
+
+    def _atomic_write(self, path: Path, data: bytes):
+        """Write data to a temp file in the target directory and rename it into place"""
+        mode = path.stat().st_mode & 0o777 if path.exists() else 0o644
+        fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=str(path.parent))
+        try:
+            os.fchmod(fd, mode)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_name, path)
+        except BaseException:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            raise
+
     def _substitute_variables(self, content: Any, variables: Dict[str, str]) -> Any:
         """Recursively substitute variables in content"""
         if isinstance(content, dict):
@@ -205,9 +463,9 @@ class Archi3PolicyGenerator:
             
             validator = Archi3PolicyValidator(str(self.policies_dir))
             
-            # Load and validate the policy
+            # Load and validate the policy (catalogs hold one policy per document)
             with open(policy_path, 'r') as f:
-                policy_content = yaml.safe_load(f)
+                policy_documents = self.serializer.load_stream(f.read())
             
             # Basic validation
             validation_result = {
@@ -216,17 +474,20 @@ class Archi3PolicyGenerator:
                 "warnings": []
             }
             
-            # Check required fields
-            required_fields = ["version", "metadata", "agents"]
-            for field in required_fields:
-                if field not in policy_content:
-                    validation_result["valid"] = False
-                    validation_result["errors"].append(f"Missing required field: {field}")
-            
-            # Check for unresolved variables
-            unresolved_vars = self._find_unresolved_variables(policy_content)
-            if unresolved_vars:
-                validation_result["warnings"].extend([f"Unresolved variable: {var}" for var in unresolved_vars])
+            for index, policy_content in enumerate(policy_documents):
+                prefix = f"Document {index}: " if len(policy_documents) > 1 else ""
+                
+                # Check required fields
+                required_fields = ["version", "metadata", "agents"]
+                for field in required_fields:
+                    if field not in policy_content:
+                        validation_result["valid"] = False
+                        validation_result["errors"].append(f"{prefix}Missing required field: {field}")
+                
+                # Check for unresolved variables
+                unresolved_vars = self._find_unresolved_variables(policy_content)
+                if unresolved_vars:
+                    validation_result["warnings"].extend([f"{prefix}Unresolved variable: {var}" for var in unresolved_vars])
             
             return validation_result
             
@@ -260,9 +521,9 @@ def main():
     parser = argparse.ArgumentParser(description="Archi3 Policy Generator")
     parser.add_argument("--policies-dir", default="./archi3/policies",
                        help="Path to policies directory")
-    parser.add_argument("--template", required=True,
+    parser.add_argument("--template",
                        help="Template name to use")
-    parser.add_argument("--type", choices=["agent", "environment", "workflow"], 
+    parser.add_argument("--type", choices=["agent", "catalog", "environment", "workflow", "routing"], 
                        default="agent", help="Type of policy to generate")
     parser.add_argument("--output", help="Output filename")
     parser.add_argument("--variables", help="Variables as JSON string")
@@ -287,6 +548,14 @@ def main():
             print(json.dumps(templates, indent=2))
             return
         
+        if args.type == "routing":
+            output_path = generator.generate_routing_tables(args.output)
+            print(f"Generated routing tables: {output_path}")
+            return
+        
+        if not args.template:
+            parser.error("--template is required for agent, catalog, environment and workflow policies")
+        
         # Parse variables
         variables = {}
         if args.variables:
@@ -297,8 +566,14 @@ def main():
                 sys.exit(1)
         
         # Generate policy
+        if args.type == "catalog" and not isinstance(variables, list):
+            logger.error("Catalog generation expects --variables as a JSON array of variable sets")
+            sys.exit(1)
+        
         if args.type == "agent":
             output_path = generator.generate_agent_policy(args.template, variables, args.output)
+        elif args.type == "catalog":
+            output_path = generator.generate_agent_policy_catalog(args.template, variables, args.output)
         elif args.type == "environment":
             output_path = generator.generate_environment_policy(args.template, variables, args.output)
         elif args.type == "workflow":
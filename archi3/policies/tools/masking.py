@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Archi3 Sensitive Data Masking
+Mask the audit-logging sensitive-data-masking pattern classes in streams and log files
+"""
+
+import json
+import os
+import sys
+import re
+import time
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, List, BinaryIO, Tuple
+import argparse
+import logging
+
+sys.path.append(str(Path(__file__).resolve().parent))
+from resolver import Archi3PolicyResolver
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def _keyword_value(keywords: List[bytes], value_group: bytes, value: bytes) -> Tuple[bytes, bytes]:
+    """Branch anchored on the ':' or '=' after a keyword such as password=, "api_key": or pwd:"""
+    labels = [b"(?<=(?<![\\w-])(?i:%s)%s[:=])" % (keyword, quote)
+              for keyword in keywords for quote in [b"", b"\"", b"'"]]
+    return rb":=", b"(?:%s)[ \t]{0,16}[\"']?(?P<%s>%s)" % (b"|".join(labels), value_group, value)
+
+# Pattern class -> branches of (anchor characters, rest). A match starts with one anchor
+# character and continues with rest, whose look-behinds see the anchor as the previous byte.
+# The anchors of every branch are hoisted into one leading character class so the regex
+# engine skips straight to candidate bytes instead of trying each branch at each position.
+#
+# Every repetition is bounded so no match is longer than MAX_MATCH, which lets a stream be
+# cut into chunks with a fixed overlap. A "<group>_value" subgroup limits the mask to the
+# secret and keeps its label, as in "password=[MASKED]". A "<group>_tail<n>" subgroup marks
+# a branch anchored inside the secret (on "@" or "_"); its mask extends back over the
+# identifier characters before the anchor.
+PATTERN_CLASSES = {
+    "credit-card-numbers": [
+        (rb"\d", rb"(?<![\d-]\d)(?:[ -]?\d){12,18}(?![\d-])")
+    ],
+    "social-security-numbers": [
+        (rb"0-8", rb"(?<![\d-][0-8])\d\d(?<!000)(?<!666)-(?!00)\d\d-(?!0000)\d{4}(?![\d-])")
+    ],
+    "api-keys": [
+        (rb"_", rb"(?<=(?<![\w])[spr]k_)(?:live|test)_[A-Za-z0-9]{16,128}\b(?P<api_keys_tail1>)"),
+        (rb"_", rb"(?<=(?<![\w])gh[pousr]_)[A-Za-z0-9]{36,255}\b(?P<api_keys_tail2>)"),
+        (rb"A", rb"(?<!\wA)KIA[0-9A-Z]{16}\b"),
+        (rb"x", rb"(?<!\wx)ox[abprs]-[A-Za-z0-9-]{10,255}"),
+        (rb"Bb", rb"(?<!\w[Bb])(?i:earer)[ \t]{1,16}[A-Za-z0-9._~+/-]{20,512}={0,2}"),
+        _keyword_value([b"api_key", b"api-key", b"apikey", b"access_token", b"access-token", b"accesstoken",
+                        b"secret_key", b"secret-key", b"secretkey", b"client_secret", b"client-secret"],
+                       b"api_keys_value", rb"[A-Za-z0-9_./+-]{8,256}")
+    ],
+    "passwords": [
+        _keyword_value([b"password", b"passwd", b"pwd", b"passphrase"],
+                       b"passwords_value", rb"[^\s\"',;&]{1,256}")
+    ],
+    "personal-identifiers": [
+        (rb"@", rb"(?<=[A-Za-z0-9._%+-]@)[A-Za-z0-9-]{1,63}(?:\.[A-Za-z0-9-]{1,63}){0,8}\.[A-Za-z]{2,24}\b"
+                rb"(?P<personal_identifiers_tail1>)"),
+        (rb"(", rb"(?<![\w+]\()\d{3}\) ?\d{3}[ .-]\d{4}(?!\d)"),
+        (rb"\d", rb"(?<![\w+]\d)\d{2}[ .-]\d{3}[ .-]\d{4}(?!\d)"),
+        (rb"+", rb"(?<![\w+]\+)(?:1[ .-]?(?:\(\d{3}\) ?|\d{3}[ .-])\d{3}[ .-]\d{4}|[1-9]\d{7,14})(?!\d)")
+    ]
+}
+
+# Upper bound on the length of any match of PATTERN_CLASSES, including a tail extension
+MAX_MATCH = 1024
+
+# Identifier bytes a tail match extends back over: e-mail local parts and key prefixes such as sk
+TAIL_BYTES = frozenset(b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789._%+-")
+MAX_TAIL = 64
+
+def luhn_valid(digits: bytes) -> bool:
+    """Luhn checksum of an ASCII digit string"""
+    total = 0
+    for position, char in enumerate(reversed(digits)):
+        value = char - 48
+        if position % 2:
+            value *= 2
+            if value > 9:
+                value -= 9
+        total += value
+    return total % 10 == 0
+
+class Archi3DataMasker:
+    """Mask every enabled pattern class in one pass of a single combined regex"""
+
+    def __init__(self, patterns: List[str] = None, chunk_size: int = 4 * 1024 * 1024,
+                 mask_format: str = "[MASKED:{name}]"):
+        self.patterns = []
+        for name in patterns if patterns is not None else list(PATTERN_CLASSES):
+            if name in PATTERN_CLASSES:
+                self.patterns.append(name)
+            else:
+                logger.warning(f"Unknown sensitive data pattern class: {name}")
+        self.chunk_size = chunk_size
+        self.mask_format = mask_format
+        self.overlap = MAX_MATCH
+
+        self._groups = {name.replace("-", "_"): name for name in self.patterns}
+        self._masks = {group: mask_format.format(name=name).encode("utf-8")
+                       for group, name in self._groups.items()}
+        self.regex = self._compile() if self.patterns else None
+        groupindex = self.regex.groupindex if self.regex else {}
+        self._value_groups = {group: f"{group}_value" if f"{group}_value" in groupindex else None
+                              for group in self._groups}
+        self._tail_groups = {group: [name for name in groupindex if name.startswith(f"{group}_tail")]
+                             for group in self._groups}
+
+    @classmethod
+    def from_policy(cls, policies_dir: str, environment: str, **kwargs) -> "Archi3DataMasker":
+        """Masker for the pattern classes the environment's effective audit-logging policy enables"""
+        policy = Archi3PolicyResolver(policies_dir).load_effective(environment)
+        masking = policy.get("security-policies", {}).get("audit-logging", {}).get("sensitive-data-masking")
+        # Environments may switch masking off (or on) with a plain boolean
+        if isinstance(masking, bool):
+            patterns = list(PATTERN_CLASSES) if masking else []
+        elif isinstance(masking, dict) and masking.get("enabled", True):
+            patterns = masking.get("patterns", list(PATTERN_CLASSES))
+        else:
+            patterns = []
+        return cls(patterns, **kwargs)
+
+    def mask(self, data: bytes) -> Tuple[bytes, Dict[str, int]]:
+        """Mask a complete buffer"""
+        counts = {}
+        if self.regex is None:
+            return data, counts
+        masked, _ = self._mask_span(data, 0, len(data), True, counts)
+        return masked, counts
+
+    def mask_stream(self, source: BinaryIO, target: BinaryIO) -> Dict[str, Any]:
+        """Mask source into target chunk by chunk, in memory bounded by the chunk size"""
+        counts = {}
+        bytes_in = 0
+        carry = b""
+        start = 0
+        while True:
+            chunk = source.read(self.chunk_size)
+            eof = not chunk
+            bytes_in += len(chunk)
+            buffer = carry + chunk if carry else chunk
+
+            if self.regex is None:
+                target.write(buffer[start:])
+                carry, start = b"", 0
+            else:
+                masked, emitted = self._mask_span(buffer, start, len(buffer), eof, counts)
+                target.write(masked)
+                # Keep the unemitted tail plus a little context for look-behinds and \b
+                context = min(emitted, 64)
+                carry, start = buffer[emitted - context:], context
+            if eof:
+                break
+        return {"bytes": bytes_in, "masked": counts}
+
+    def mask_file(self, source_path: str, target_path: str) -> Dict[str, Any]:
+        """Mask one file into target_path through a temp file and atomic rename"""
+        target_path = Path(target_path)
+        target_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(prefix=f".{target_path.name}.", suffix=".tmp",
+                                        dir=str(target_path.parent))
+        try:
+            with open(source_path, 'rb') as source, os.fdopen(fd, 'wb') as target:
+                result = self.mask_stream(source, target)
+            os.replace(tmp_name, target_path)
+        except BaseException:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            raise
+        return {"source": str(source_path), "target": str(target_path), **result}
+
+    def mask_files(self, files: List[Tuple[str, str]], workers: int = None) -> List[Dict[str, Any]]:
+        """Mask (source, target) file pairs, one file per worker process at a time"""
+        workers = workers or os.cpu_count() or 1
+        if workers <= 1 or len(files) <= 1:
+            return [self.mask_file(source, target) for source, target in files]
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(self.patterns, self.chunk_size, self.mask_format)) as executor:
+            return list(executor.map(_mask_file, files))
+
+    def _compile(self) -> "re.Pattern":
+        """One regex for all enabled classes, led by the union of their anchor characters"""
+        anchors = set()
+        groups = []
+        for group, name in self._groups.items():
+            branches = []
+            for anchor, rest in PATTERN_CLASSES[name]:
+                anchors.add(anchor)
+                branches.append(b"(?<=[%s])%s" % (anchor, rest))
+            groups.append(b"(?P<%s>%s)" % (group.encode("ascii"), b"|".join(branches)))
+        return re.compile(b"[%s](?:%s)" % (b"".join(sorted(anchors)), b"|".join(groups)))
+
+    def _mask_span(self, buffer: bytes, start: int, end: int, eof: bool,
+                   counts: Dict[str, int]) -> Tuple[bytes, int]:
+        """Mask buffer[start:end]; unless eof, stop before the last overlap bytes, which may hold a partial match
+
+        Returns the masked bytes and the buffer offset they run up to.
+        """
+        limit = end if eof else max(end - self.overlap, start)
+        parts = []
+        position = start
+        for match in self.regex.finditer(buffer, start, end):
+            if match.start() >= limit:
+                break
+            group = match.lastgroup
+            name = self._groups[group]
+            if name == "credit-card-numbers" and not luhn_valid(re.sub(rb"[ -]", b"", match.group())):
+                continue
+
+            value_group = self._value_groups[group]
+            if value_group and match.start(value_group) >= 0:
+                mask_start, mask_end = match.span(value_group)
+            else:
+                mask_start, mask_end = match.span()
+                if any(match.start(tail) >= 0 for tail in self._tail_groups[group]):
+                    floor = max(position, mask_start - MAX_TAIL)
+                    while mask_start > floor and buffer[mask_start - 1] in TAIL_BYTES:
+                        mask_start -= 1
+            parts.append(buffer[position:mask_start])
+            parts.append(self._masks[group])
+            position = mask_end
+            counts[name] = counts.get(name, 0) + 1
+
+        # Matches are at most overlap bytes long, so one starting before limit is complete
+        emitted = end if eof else max(position, limit)
+        if not eof:
+            # Hold back a trailing identifier: a tail match in the next chunk may need to mask it
+            floor = max(position, emitted - MAX_TAIL)
+            while emitted > floor and buffer[emitted - 1] in TAIL_BYTES:
+                emitted -= 1
+        parts.append(buffer[position:emitted])
+        return b"".join(parts), emitted
+
+# Masker rebuilt once in each worker process of mask_files
+_worker_masker = None
+
+def _init_worker(patterns: List[str], chunk_size: int, mask_format: str):
+    global _worker_masker
+    _worker_masker = Archi3DataMasker(patterns, chunk_size=chunk_size, mask_format=mask_format)
+
+def _mask_file(pair: Tuple[str, str]) -> Dict[str, Any]:
+    return _worker_masker.mask_file(*pair)
+
+def main():
+    """Main CLI interface for sensitive data masking"""
+    parser = argparse.ArgumentParser(description="Archi3 Sensitive Data Masking")
+    parser.add_argument("--policies-dir", default="./archi3/policies",
+                       help="Path to policies directory")
+    parser.add_argument("--environment", "-e",
+                       help="Take the enabled pattern classes from this environment (default: all)")
+    parser.add_argument("--patterns", nargs="+", choices=list(PATTERN_CLASSES),
+                       help="Pattern classes to mask instead of the policy's")
+    parser.add_argument("inputs", nargs="*",
+                       help="Files to mask (default: stdin to stdout)")
+    parser.add_argument("--output-dir", help="Directory for masked files (required with inputs)")
+    parser.add_argument("--workers", type=int, help="Worker processes for files (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=4 * 1024 * 1024,
+                       help="Bytes read per chunk")
+    parser.add_argument("--verbose", "-v", action="store_true",
+                       help="Verbose output")
+
+    args = parser.parse_args()
+
+    if args.verbose:
+        logging.getLogger().setLevel(logging.DEBUG)
+
+    if args.inputs and not args.output_dir:
+        parser.error("--output-dir is required when masking files")
+
+    try:
+        if args.patterns:
+            masker = Archi3DataMasker(args.patterns, chunk_size=args.chunk_size)
+        elif args.environment:
+            masker = Archi3DataMasker.from_policy(args.policies_dir, args.environment, chunk_size=args.chunk_size)
+        else:
+            masker = Archi3DataMasker(chunk_size=args.chunk_size)
+
+        if not args.inputs:
+            result = masker.mask_stream(sys.stdin.buffer, sys.stdout.buffer)
+            sys.stdout.buffer.flush()
+            logger.info(f"Masked {sum(result['masked'].values())} values in {result['bytes']} bytes")
+            return
+
+        files = [(source, str(Path(args.output_dir) / Path(source).name)) for source in args.inputs]
+        started = time.perf_counter()
+        results = masker.mask_files(files, workers=args.workers)
+        elapsed = time.perf_counter() - started
+
+        total_bytes = sum(result["bytes"] for result in results)
+        masked = {}
+        for result in results:
+            for name, count in result["masked"].items():
+                masked[name] = masked.get(name, 0) + count
+        print(f"Masked {len(results)} files ({total_bytes / 1e6:.1f} MB) in {elapsed:.2f}s "
+              f"({total_bytes / 1e6 / max(elapsed, 1e-9):.1f} MB/s)")
+        print(json.dumps(masked, indent=2, sort_keys=True))
+
+    except Exception as e:
+        logger.error(f"Masking failed: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Archi3 MCP Access Matchers
+Check filesystem paths and browser domains against the MCP server allow and block lists
+"""
+
+import json
+import sys
+import time
+import posixpath
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional, List
+from urllib.parse import urlsplit
+import argparse
+import logging
+
+sys.path.append(str(Path(__file__).resolve().parent))
+from resolver import Archi3PolicyResolver
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Trie node markers, kept as dict keys next to the children so a node is a single dict
+ALLOWED = "\0allowed"
+BLOCKED = "\0blocked"
+ANY = "*"
+
+class Archi3PathMatcher:
+    """Path-component trie over allowed-paths and blocked-paths
+
+    An entry covers the path itself and everything below it; a "*" component matches any
+    single component. A path is allowed when an allowed entry covers it and no blocked entry
+    does. With no allowed entries, everything not blocked is allowed.
+    """
+
+    def __init__(self, allowed: List[str] = None, blocked: List[str] = None):
+        self.root = {}
+        self.has_allowed = bool(allowed)
+        self.entries = 0
+        for path in allowed or []:
+            self._insert(path, ALLOWED)
+        for path in blocked or []:
+            self._insert(path, BLOCKED)
+
+    def allowed(self, path: str) -> bool:
+        components = self._components(path)
+        if components is None:
+            return False
+        covered = not self.has_allowed
+        nodes = [self.root]
+        for depth in range(len(components) + 1):
+            next_nodes = []
+            for node in nodes:
+                if BLOCKED in node:
+                    return False
+                if ALLOWED in node:
+                    covered = True
+                if depth < len(components):
+                    child = node.get(components[depth])
+                    if child is not None:
+                        next_nodes.append(child)
+                    wildcard = node.get(ANY)
+                    if wildcard is not None:
+                        next_nodes.append(wildcard)
+            if not next_nodes:
+                break
+            nodes = next_nodes
+        return covered
+
+    def _insert(self, path: str, marker: str):
+        components = self._components(path)
+        if components is None:
+            raise ValueError(f"Path entries must be absolute: {path!r}")
+        node = self.root
+        for component in components:
+            node = node.setdefault(component, {})
+        node[marker] = True
+        self.entries += 1
+
+    @staticmethod
+    def _components(path: str) -> Optional[List[str]]:
+        """Normalized components of an absolute path, with '..' resolved lexically"""
+        if not path.startswith("/"):
+            return None
+        return [component for component in posixpath.normpath(path).split("/") if component]
+
+class Archi3DomainMatcher:
+    """Reversed-label trie over allowed-domains and blocked-domains
+
+    "example.com" matches only that host, "*.example.com" matches its subdomains at any depth
+    and "*" matches every host. A host is allowed when an allowed entry matches it and no
+    blocked entry does. With no allowed entries, everything not blocked is allowed.
+    """
+
+    def __init__(self, allowed: List[str] = None, blocked: List[str] = None):
+        self.root = {}
+        self.has_allowed = bool(allowed)
+        self.entries = 0
+        for domain in allowed or []:
+            self._insert(domain, ALLOWED)
+        for domain in blocked or []:
+            self._insert(domain, BLOCKED)
+
+    def allowed(self, host_or_url: str) -> bool:
+        labels = self._labels(self.host(host_or_url))
+        if not labels:
+            return False
+
+        covered = not self.has_allowed
+        node = self.root
+        # Wildcards met on the way cover every deeper host
+        for depth, label in enumerate(labels):
+            wildcard = node.get(ANY)
+            if wildcard is not None:
+                if BLOCKED in wildcard:
+                    return False
+                if ALLOWED in wildcard:
+                    covered = True
+            node = node.get(label)
+            if node is None:
+                return covered
+
+        # All labels consumed: exact entries for this host
+        if BLOCKED in node:
+            return False
+        return covered or ALLOWED in node
+
+    @staticmethod
+    def host(host_or_url: str) -> str:
+        """Lower-case host name of a URL or host[:port]"""
+        value = host_or_url.strip()
+        if "//" in value:
+            value = urlsplit(value).hostname or ""
+        elif ":" in value and value.count(":") == 1:
+            value = value.split(":", 1)[0]
+        return value.rstrip(".").lower()
+
+    def _insert(self, domain: str, marker: str):
+        labels = self._labels(domain.strip().rstrip(".").lower())
+        if labels and labels[-1] == ANY:
+            labels = labels[:-1] + [ANY]
+        elif ANY in labels:
+            raise ValueError(f"Only a leading '*.' wildcard is supported: {domain!r}")
+        node = self.root
+        for label in labels:
+            node = node.setdefault(label, {})
+        node[marker] = True
+        self.entries += 1
+
+    @staticmethod
+    def _labels(domain: str) -> List[str]:
+        """Labels from the top-level domain down, so 'a.github.com' -> ['com', 'github', 'a']"""
+        return [label for label in reversed(domain.split(".")) if label]
+
+class Archi3McpAccessControl:
+    """Compiled matchers for the MCP servers of an environment, rebuilt when the policy changes"""
+
+    def __init__(self, policies_dir: str, environment: str, check_interval: float = 5.0):
+        self.policies_dir = Path(policies_dir)
+        self.environment = environment
+        self.check_interval = check_interval
+        self.resolver = Archi3PolicyResolver(str(self.policies_dir))
+        self._lock = threading.Lock()
+        self.sources = None
+        self.reload()
+
+    def path_allowed(self, path: str) -> bool:
+        self._maybe_refresh()
+        return self.filesystem.allowed(path)
+
+    def domain_allowed(self, host_or_url: str) -> bool:
+        self._maybe_refresh()
+        return self.web_browser.allowed(host_or_url)
+
+    def reload(self) -> bool:
+        """Recompile from the effective policy if it changed; True when the matchers were rebuilt"""
+        with self._lock:
+            self._checked_at = time.monotonic()
+            if self.sources is not None and not self.resolver.is_stale(self.environment):
+                return False
+
+            artifact = self.resolver.resolve(self.environment)
+            servers = artifact["policy"].get("environment", {}).get("mcp-servers", {}) or {}
+            filesystem = servers.get("filesystem") or {}
+            browser = servers.get("web-browser") or {}
+            self.filesystem = Archi3PathMatcher(filesystem.get("allowed-paths"), filesystem.get("blocked-paths"))
+            self.web_browser = Archi3DomainMatcher(browser.get("allowed-domains"), browser.get("blocked-domains"))
+            self.sources = artifact["sources"]
+            logger.info(f"Compiled MCP access matchers for {self.environment}: "
+                        f"{self.filesystem.entries} path and {self.web_browser.entries} domain entries")
+            return True
+
+    def _maybe_refresh(self):
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            self.reload()
+
+def run_benchmark(entries: int, checks: int = 100000) -> Dict[str, Any]:
+    """Time checks against synthetic lists of increasing size to show the cost does not grow with them"""
+    results = []
+    for size in sorted({max(1, entries // 100), max(1, entries // 10), entries}):
+        paths = Archi3PathMatcher([f"/workspace/project-{i}" for i in range(size)],
+                                  [f"/workspace/project-{i}/secrets" for i in range(0, size, 10)])
+        domains = Archi3DomainMatcher([f"*.site-{i}.example.com" for i in range(size)],
+                                      [f"*.bad-{i}.example.com" for i in range(size)])
+        probe_paths = [f"/workspace/project-{i % (size * 2)}/src/module/file.py" for i in range(checks)]
+        probe_hosts = [f"www.api.site-{i % (size * 2)}.example.com" for i in range(checks)]
+
+        started = time.perf_counter()
+        for path in probe_paths:
+            paths.allowed(path)
+        path_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for host in probe_hosts:
+            domains.allowed(host)
+        domain_seconds = time.perf_counter() - started
+
+        results.append({
+            "entries": size,
+            "path_us_per_check": round(1e6 * path_seconds / checks, 3),
+            "domain_us_per_check": round(1e6 * domain_seconds / checks, 3)
+        })
+    return {"checks": checks, "results": results}
+
+def main():
+    """Main CLI interface for MCP access checks"""
+    parser = argparse.ArgumentParser(description="Archi3 MCP Access Matchers")
+    parser.add_argument("--policies-dir", default="./archi3/policies",
+                       help="Path to policies directory")
+    parser.add_argument("--environment", "-e", help="Environment whose mcp-servers lists to check against")
+    parser.add_argument("--path", action="append", default=[], help="Filesystem path to check (repeatable)")
+    parser.add_argument("--domain", action="append", default=[], help="Host or URL to check (repeatable)")
+    parser.add_argument("--benchmark", type=int, metavar="ENTRIES",
+                       help="Time checks against synthetic lists of up to this many entries")
+    parser.add_argument("--verbose", "-v", action="store_true",
+                       help="Verbose output")
+
+    args = parser.parse_args()
+
+    if args.verbose:
+        logging.getLogger().setLevel(logging.DEBUG)
+
+    if args.benchmark:
+        print(json.dumps(run_benchmark(args.benchmark), indent=2))
+        return
+
+    if not args.environment:
+        parser.error("--environment is required unless --benchmark is given")
+
+    try:
+        access = Archi3McpAccessControl(args.policies_dir, args.environment)
+        for path in args.path:
+            print(f"{'ALLOW' if access.path_allowed(path) else 'DENY '} path {path}")
+        for domain in args.domain:
+            print(f"{'ALLOW' if access.domain_allowed(domain) else 'DENY '} domain {domain}")
+
+    except Exception as e:
+        logger.error(f"Access check failed: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Archi3 Policy Diff
+Structural diff of policy trees using Merkle hashes of every subtree
+"""
+
+import json
+import hashlib
+from typing import Dict, Any, List
+import logging
+
+logger = logging.getLogger(__name__)
+
+class MerkleNode:
+    """Hash of a mapping or sequence, with child nodes for nested containers and encoded scalars"""
+
+    __slots__ = ("digest", "children", "value")
+
+    def __init__(self, digest: bytes, children: Dict[Any, Any], value: Any):
+        self.digest = digest
+        self.children = children
+        self.value = value
+
+class Archi3PolicyDiff:
+    """Compare two policy trees, descending only into subtrees whose hashes differ"""
+
+    def __init__(self, max_value_length: int = 80):
+        self.max_value_length = max_value_length
+
+    def build_tree(self, value: Any) -> MerkleNode:
+        """Hash a policy tree bottom-up so equal subtrees can be skipped in one comparison"""
+        if isinstance(value, dict):
+            keys = sorted(value, key=str)
+            digest = hashlib.sha256(b"d")
+        else:
+            keys = range(len(value))
+            digest = hashlib.sha256(b"l")
+
+        children = {}
+        for key in keys:
+            child = value[key]
+            if isinstance(child, (dict, list)):
+                child = self.build_tree(child)
+                token = child.digest
+            else:
+                # Scalars are compared by their encoding, hashing them separately would only add cost
+                child = token = self._encode_scalar(child)
+            children[key] = child
+            name = str(key).encode("utf-8")
+            digest.update(b"%d:%s%d:%s" % (len(name), name, len(token), token))
+        return MerkleNode(digest.digest(), children, value)
+
+    def diff(self, old: Any, new: Any) -> List[Dict[str, Any]]:
+        """Return the changed, added and removed key paths between two policy trees"""
+        changes = []
+        if isinstance(old, (dict, list)) and isinstance(new, (dict, list)):
+            self._diff_nodes(self.build_tree(old), self.build_tree(new), "", changes)
+        elif old != new:
+            changes.append({"path": "", "change": "changed", "old": old, "new": new})
+        return changes
+
+    def format_change(self, change: Dict[str, Any]) -> str:
+        """Render a change as 'path: old → new'"""
+        if change["change"] == "added":
+            return f"{change['path']}: + {self._format_value(change['new'])}"
+        if change["change"] == "removed":
+            return f"{change['path']}: - {self._format_value(change['old'])}"
+        return f"{change['path']}: {self._format_value(change['old'])} → {self._format_value(change['new'])}"
+
+    def _diff_nodes(self, old: MerkleNode, new: MerkleNode, path: str, changes: List[Dict[str, Any]]):
+        if old.digest == new.digest:
+            return
+
+        is_list = isinstance(old.value, list)
+        if is_list != isinstance(new.value, list):
+            changes.append({"path": path, "change": "changed", "old": old.value, "new": new.value})
+            return
+
+        for key, old_child in old.children.items():
+            child_path = self._child_path(path, key, is_list)
+            if key not in new.children:
+                changes.append({"path": child_path, "change": "removed", "old": old.value[key], "new": None})
+                continue
+
+            new_child = new.children[key]
+            if isinstance(old_child, MerkleNode) and isinstance(new_child, MerkleNode):
+                self._diff_nodes(old_child, new_child, child_path, changes)
+            elif old_child != new_child:
+                changes.append({"path": child_path, "change": "changed",
+                                "old": old.value[key], "new": new.value[key]})
+
+        for key in new.children:
+            if key not in old.children:
+                changes.append({"path": self._child_path(path, key, is_list), "change": "added",
+                                "old": None, "new": new.value[key]})
+
+    def _child_path(self, path: str, key: Any, is_list: bool) -> str:
+        if is_list:
+            return f"{path}[{key}]"
+        return f"{path}.{key}" if path else str(key)
+
+    def _encode_scalar(self, value: Any) -> bytes:
+        if isinstance(value, str):
+            return b"s" + value.encode("utf-8")
+        if value is None or isinstance(value, (bool, int, float)):
+            return b"p" + repr(value).encode("ascii")
+        return b"o" + json.dumps(value, sort_keys=True, default=str).encode("utf-8")
+
+    def _format_value(self, value: Any) -> str:
+        if isinstance(value, str):
+            text = value
+        else:
+            text = json.dumps(value, sort_keys=True, default=str)
+        if len(text) > self.max_value_length:
+            text = text[:self.max_value_length - 3] + "..."
+        return text
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Archi3 Rate Limiter
+Enforce MCP server rate limits from the environment policy with token buckets
+"""
+
+import json
+import sys
+import re
+import time
+import asyncio
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Tuple
+import argparse
+import logging
+
+sys.path.append(str(Path(__file__).resolve().parent))
+from resolver import Archi3PolicyResolver
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+RATE_PATTERN = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*(?:requests?|req|calls?)?\s*/\s*(\d*)\s*([a-z]+)\s*$",
+                          re.IGNORECASE)
+
+PERIOD_SECONDS = {
+    "s": 1, "sec": 1, "second": 1, "seconds": 1,
+    "m": 60, "min": 60, "minute": 60, "minutes": 60,
+    "h": 3600, "hr": 3600, "hour": 3600, "hours": 3600,
+    "d": 86400, "day": 86400, "days": 86400
+}
+
+def parse_rate(rate: str) -> Tuple[float, float]:
+    """Parse '10 requests/minute' or '200/hour' into (bucket capacity, tokens refilled per second)"""
+    match = RATE_PATTERN.match(str(rate))
+    if not match or match.group(3).lower() not in PERIOD_SECONDS:
+        raise ValueError(f"Unrecognized rate limit: {rate!r}")
+    count = float(match.group(1))
+    period = int(match.group(2) or 1) * PERIOD_SECONDS[match.group(3).lower()]
+    if count <= 0:
+        raise ValueError(f"Rate limit must be positive: {rate!r}")
+    # A full bucket allows one period's worth of requests as a burst
+    return count, count / period
+
+class Archi3RateLimiter:
+    """Token buckets per (server, principal), spread over independently locked shards"""
+
+    def __init__(self, policies_dir: str, environment: str, shards: int = 64,
+                 check_interval: float = 5.0, clock=time.monotonic):
+        self.policies_dir = Path(policies_dir)
+        self.environment = environment
+        self.check_interval = check_interval
+        self.clock = clock
+        self.resolver = Archi3PolicyResolver(str(self.policies_dir))
+        # Round up to a power of two so the shard is picked with a mask
+        self.shard_mask = (1 << max(shards - 1, 0).bit_length()) - 1
+        self._shards = [(threading.Lock(), {}) for _ in range(self.shard_mask + 1)]
+        self._reload_lock = threading.Lock()
+        self.limits = {}
+        self.sources = None
+        self._checked_at = self.clock()
+        self.reload(force=True)
+
+    def try_acquire(self, server: str, principal: str, tokens: float = 1) -> bool:
+        """Take tokens if available right now"""
+        return self._take(server, principal, tokens) == 0.0
+
+    def try_acquire_many(self, requests: List[Tuple[str, str]], tokens: float = 1) -> List[bool]:
+        """Try one take per (server, principal) request, all at a single clock reading"""
+        now = self.clock()
+        if now - self._checked_at >= self.check_interval:
+            self.reload()
+        take = self._take
+        return [take(server, principal, tokens, now) == 0.0 for server, principal in requests]
+
+    def acquire(self, server: str, principal: str, tokens: float = 1,
+                timeout: Optional[float] = None) -> bool:
+        """Wait until tokens are available, or give up after timeout seconds"""
+        deadline = None if timeout is None else self.clock() + timeout
+        while True:
+            wait = self._take(server, principal, tokens)
+            if wait == 0.0:
+                return True
+            if deadline is not None:
+                remaining = deadline - self.clock()
+                if remaining <= 0 or wait > remaining:
+                    return False
+            time.sleep(wait)
+
+    async def acquire_async(self, server: str, principal: str, tokens: float = 1,
+                            timeout: Optional[float] = None) -> bool:
+        """Like acquire, but waits without blocking the event loop"""
+        deadline = None if timeout is None else self.clock() + timeout
+        while True:
+            # Checking the policy for changes reads files, so it runs in a worker thread, off the loop
+            if self.clock() - self._checked_at >= self.check_interval:
+                await asyncio.to_thread(self.reload)
+            # The shard lock is only held for the bucket update, never across an await
+            wait = self._take(server, principal, tokens, self.clock())
+            if wait == 0.0:
+                return True
+            if deadline is not None:
+                remaining = deadline - self.clock()
+                if remaining <= 0 or wait > remaining:
+                    return False
+            await asyncio.sleep(wait)
+
+    def reload(self, force: bool = False) -> bool:
+        """Re-read the limits if the environment policy changed; True when they were reloaded"""
+        with self._reload_lock:
+            self._checked_at = self.clock()
+            if not force and self.sources is not None and not self.resolver.is_stale(self.environment):
+                return False
+
+            artifact = self.resolver.resolve(self.environment)
+            servers = artifact["policy"].get("environment", {}).get("mcp-servers", {}) or {}
+            limits = {}
+            for server, config in servers.items():
+                rate = (config or {}).get("rate-limit")
+                if rate is None:
+                    continue
+                try:
+                    limits[server] = parse_rate(rate)
+                except ValueError as e:
+                    logger.warning(f"Ignoring rate limit of {server}: {e}")
+
+            # Existing buckets pick up a changed limit on their next use
+            self.limits = limits
+            self.sources = artifact["sources"]
+            logger.info(f"Loaded rate limits for {self.environment}: "
+                        + (", ".join(f"{server}={servers[server]['rate-limit']}" for server in limits) or "none"))
+            return True
+
+    def reset(self):
+        """Forget every bucket, so all principals start full again"""
+        for lock, buckets in self._shards:
+            with lock:
+                buckets.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        buckets = sum(len(buckets) for _, buckets in self._shards)
+        return {
+            "environment": self.environment,
+            "limits": {server: {"capacity": capacity, "per_second": rate}
+                       for server, (capacity, rate) in self.limits.items()},
+            "buckets": buckets,
+            "shards": len(self._shards)
+        }
+
+    def _take(self, server: str, principal: str, tokens: float, now: float = None) -> float:
+        """Take tokens from the bucket; 0.0 on success, else seconds until enough will have refilled"""
+        if now is None:
+            now = self.clock()
+            if now - self._checked_at >= self.check_interval:
+                self.reload()
+
+        limit = self.limits.get(server)
+        if limit is None:
+            return 0.0
+        capacity, rate = limit
+        if tokens > capacity:
+            raise ValueError(f"Cannot take {tokens} tokens from a bucket of {capacity:g} ({server})")
+
+        key = (server, principal)
+        lock, buckets = self._shards[hash(key) & self.shard_mask]
+        lock.acquire()
+        try:
+            # Bucket: [tokens, last refill time, limit it was filled under]
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = [capacity, now, limit]
+            elif bucket[2] is not limit:
+                bucket[0] = min(bucket[0], capacity)
+                bucket[2] = limit
+
+            available = bucket[0] + (now - bucket[1]) * rate
+            if available > capacity:
+                available = capacity
+            bucket[1] = now
+            if available >= tokens:
+                bucket[0] = available - tokens
+                return 0.0
+            bucket[0] = available
+            return (tokens - available) / rate
+        finally:
+            lock.release()
+
+def run_benchmark(limiter: Archi3RateLimiter, decisions: int = 1000000, principals: int = 1000,
+                  threads: int = 1, batch: int = 1000) -> Dict[str, Any]:
+    """Time rate limit decisions over many principals of every rate-limited server
+
+    Measures single try_acquire calls and try_acquire_many batches; each thread cycles
+    through the principals from its own offset.
+    """
+    servers = list(limiter.limits) or ["unlimited"]
+    keys = [(servers[i % len(servers)], f"principal-{i}") for i in range(principals)]
+    per_thread = decisions // threads
+    # Request streams are built up front so the timings cover only the limiter
+    streams = [[keys[(t * 7919 + i) % principals] for i in range(per_thread)] for t in range(threads)]
+
+    def single(stream: list, allowed: list):
+        try_acquire = limiter.try_acquire
+        allowed.append(sum(1 for server, principal in stream if try_acquire(server, principal)))
+
+    def batched(stream: list, allowed: list):
+        try_acquire_many = limiter.try_acquire_many
+        allowed.append(sum(sum(try_acquire_many(stream[i:i + batch]))
+                           for i in range(0, len(stream), batch)))
+
+    results = {"decisions": per_thread * threads, "threads": threads, "principals": principals,
+               "shards": len(limiter._shards)}
+    for mode, worker in [("single", single), ("batched", batched)]:
+        limiter.reset()
+        allowed = []
+        workers = [threading.Thread(target=worker, args=(stream, allowed)) for stream in streams]
+        started = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        results[mode] = {
+            "allowed": sum(allowed),
+            "seconds": round(elapsed, 4),
+            "decisions_per_second": round(results["decisions"] / elapsed) if elapsed else None
+        }
+    return results
+
+def main():
+    """Main CLI interface for rate limiting"""
+    parser = argparse.ArgumentParser(description="Archi3 Rate Limiter")
+    parser.add_argument("--policies-dir", default="./archi3/policies",
+                       help="Path to policies directory")
+    parser.add_argument("--environment", "-e", required=True,
+                       help="Environment whose mcp-servers rate limits to enforce")
+    parser.add_argument("--check", nargs=2, metavar=("SERVER", "PRINCIPAL"),
+                       help="Try to take one token for a server and principal")
+    parser.add_argument("--benchmark", type=int, metavar="DECISIONS",
+                       help="Time this many rate limit decisions")
+    parser.add_argument("--principals", type=int, default=1000,
+                       help="Distinct principals in the benchmark")
+    parser.add_argument("--threads", type=int, default=1,
+                       help="Threads in the benchmark")
+    parser.add_argument("--batch", type=int, default=1000,
+                       help="Requests per try_acquire_many call in the benchmark")
+    parser.add_argument("--shards", type=int, default=64,
+                       help="Number of independently locked bucket shards")
+    parser.add_argument("--verbose", "-v", action="store_true",
+                       help="Verbose output")
+
+    args = parser.parse_args()
+
+    if args.verbose:
+        logging.getLogger().setLevel(logging.DEBUG)
+
+    try:
+        limiter = Archi3RateLimiter(args.policies_dir, args.environment, shards=args.shards)
+
+        if args.check:
+            server, principal = args.check
+            print(f"{'ALLOW' if limiter.try_acquire(server, principal) else 'LIMIT'} {server} {principal}")
+        elif args.benchmark:
+            print(json.dumps(run_benchmark(limiter, args.benchmark, args.principals,
+                                                   args.threads, args.batch), indent=2))
+        else:
+            print(json.dumps(limiter.stats(), indent=2))
+
+    except Exception as e:
+        logger.error(f"Rate limiting failed: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
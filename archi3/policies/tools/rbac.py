@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Archi3 RBAC Engine
+Answer authorization checks from security-policies compiled into bitsets
+"""
+
+import json
+import sys
+import time
+import threading
+from pathlib import Path
+from typing import Dict, Any, List, Tuple, Iterable
+import argparse
+import logging
+
+sys.path.append(str(Path(__file__).resolve().parent))
+from resolver import Archi3PolicyResolver
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Grants that allow every action on a resource, including actions the policy never lists
+WILDCARD_ACTIONS = {"*", "full", "full-access"}
+
+# Role restrictions are explicit denials that win over any grant, including "*" and wildcard actions:
+#   no-modifications       denies actions that change state (write, delete, configure, deploy, admin)
+#   no-execution           denies actions that run code (execute, automation)
+#   audit-logging          a condition, not a denial: the role's actions are always audited
+#   multi-factor-required  a condition, not a denial: the role's sessions must pass MFA
+# Any other restriction names a role-level permission the role is denied (e.g. policy-changes).
+RESTRICTION_DENIED_ACTIONS = {
+    "no-modifications": frozenset({"write", "delete", "configure", "deploy", "admin"}),
+    "no-execution": frozenset({"execute", "automation"})
+}
+CONSTRAINT_LABELS = {"audit-logging", "multi-factor-required"}
+
+class Archi3RbacEngine:
+    """Precompute role and agent grants as integers so each check is a few bit operations"""
+
+    def __init__(self, policies_dir: str, environment: str, cache_size: int = 65536,
+                 check_interval: float = 5.0):
+        self.policies_dir = Path(policies_dir)
+        self.environment = environment
+        self.cache_size = cache_size
+        self.check_interval = check_interval
+        self.resolver = Archi3PolicyResolver(str(self.policies_dir))
+        self._lock = threading.Lock()
+        self._decisions = {}
+        self._checked_at = 0.0
+        self.reload()
+
+    def allowed(self, role: str, resource: str, action: str) -> bool:
+        """Whether a role (or an @agent) may perform action on resource"""
+        self._maybe_refresh()
+        key = (role, resource, action)
+        # reload() swaps in a fresh dict, so a lock-free hit only ever sees one policy's decisions
+        decision = self._decisions.get(key)
+        if decision is None:
+            with self._lock:
+                decision = self._decide(role, resource, action)
+                if len(self._decisions) >= self.cache_size:
+                    # Decisions are cheap to recompute; dropping them all beats tracking recency
+                    self._decisions = {}
+                self._decisions[key] = decision
+        return decision
+
+    def allowed_many(self, requests: Iterable[Tuple[str, str, str]]) -> List[bool]:
+        """Check a batch of (role, resource, action) requests against one policy snapshot"""
+        self._maybe_refresh()
+        with self._lock:
+            grants, wildcards, denied_actions = self.grants, self.wildcards, self.denied_actions
+            action_bits, resource_bits = self.action_bits, self.resource_bits
+        results = []
+        for role, resource, action in requests:
+            bit = action_bits.get((resource, action), 0)
+            results.append(bool(grants.get(role, 0) & bit or
+                                wildcards.get(role, 0) & resource_bits.get(resource, 0))
+                           and action not in denied_actions.get(role, ()))
+        return results
+
+    def has_permission(self, role: str, permission: str) -> bool:
+        """Whether a role holds a role-level permission such as task-delegation and is not restricted from it"""
+        self._maybe_refresh()
+        with self._lock:
+            bit = self.permission_bits.get(permission, 0)
+            return bool(self.role_permissions.get(role, 0) & bit and not self.denied_permissions.get(role, 0) & bit)
+
+    def reload(self) -> bool:
+        """Recompile from the effective policy if it changed; True when the bitsets were rebuilt"""
+        with self._lock:
+            self._checked_at = time.monotonic()
+            if getattr(self, "sources", None) is not None and not self.resolver.is_stale(self.environment):
+                return False
+
+            artifact = self.resolver.resolve(self.environment)
+            self._compile(artifact["policy"].get("security-policies", {}).get("authorization", {}))
+            self.sources = artifact["sources"]
+            self._decisions = {}
+            logger.info(f"Compiled RBAC for {self.environment}: {len(self.grants)} subjects, "
+                        f"{len(self.action_bits)} resource actions")
+            return True
+
+    def describe(self) -> Dict[str, Any]:
+        """Expand the compiled bitsets back into readable grants"""
+        self._maybe_refresh()
+        with self._lock:
+            return self._describe()
+
+    def _describe(self) -> Dict[str, Any]:
+        grants = {}
+        for subject in sorted(set(self.grants) | set(self.wildcards)):
+            resources = {}
+            for (resource, action), bit in self.action_bits.items():
+                if self.grants.get(subject, 0) & bit:
+                    resources.setdefault(resource, []).append(action)
+            for resource, bit in self.resource_bits.items():
+                if self.wildcards.get(subject, 0) & bit:
+                    resources[resource] = ["*"]
+            grants[subject] = resources
+        permissions = {role: [name for name, bit in self.permission_bits.items()
+                              if mask & bit and not self.denied_permissions[role] & bit]
+                       for role, mask in self.role_permissions.items()}
+        denials = {role: {"permissions": [name for name, bit in self.permission_bits.items()
+                                          if self.denied_permissions[role] & bit],
+                          "actions": sorted(self.denied_actions[role]),
+                          "constraints": self.constraints[role]}
+                   for role in self.role_permissions}
+        return {"environment": self.environment, "grants": grants, "role-permissions": permissions,
+                "denials": denials}
+
+    def _maybe_refresh(self):
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            self.reload()
+
+    def _decide(self, role: str, resource: str, action: str) -> bool:
+        if action in self.denied_actions.get(role, ()):
+            return False
+        bit = self.action_bits.get((resource, action), 0)
+        return bool(self.grants.get(role, 0) & bit or
+                    self.wildcards.get(role, 0) & self.resource_bits.get(resource, 0))
+
+    def _compile(self, authorization: Dict[str, Any]):
+        """Assign a bit to every (resource, action) and role permission, then OR up each subject's grants"""
+        roles = authorization.get("role-based-access-control", {}).get("roles", {})
+        matrix = authorization.get("permission-matrix", {})
+        agents = authorization.get("agent-specific-permissions", {})
+
+        # Subject -> {resource: [actions]} from the role matrix and the per-agent grants
+        subject_grants = {}
+        for resource, role_actions in matrix.items():
+            for role, actions in (role_actions or {}).items():
+                subject_grants.setdefault(role, {})[resource] = actions or []
+        for agent, resources in agents.items():
+            for resource, actions in (resources or {}).items():
+                subject_grants.setdefault(agent, {})[resource] = actions or []
+
+        action_bits = {}
+        resource_bits = {}
+        for resources in subject_grants.values():
+            for resource, actions in resources.items():
+                resource_bits.setdefault(resource, 1 << len(resource_bits))
+                for action in actions:
+                    if action not in WILDCARD_ACTIONS:
+                        action_bits.setdefault((resource, action), 1 << len(action_bits))
+
+        grants = {}
+        wildcards = {}
+        for subject, resources in subject_grants.items():
+            mask = 0
+            wildcard = 0
+            for resource, actions in resources.items():
+                for action in actions:
+                    if action in WILDCARD_ACTIONS:
+                        wildcard |= resource_bits[resource]
+                    else:
+                        mask |= action_bits[(resource, action)]
+            grants[subject] = mask
+            wildcards[subject] = wildcard
+
+        # Role-level permissions: "*" grants every permission some role is granted, never a restriction label
+        permission_bits = {}
+        for definition in roles.values():
+            for name in definition.get("permissions") or []:
+                if name != "*":
+                    permission_bits.setdefault(name, 1 << len(permission_bits))
+        all_permissions = (1 << len(permission_bits)) - 1
+
+        role_permissions = {}
+        denied_permissions = {}
+        denied_actions = {}
+        constraints = {}
+        for role, definition in roles.items():
+            granted = definition.get("permissions") or []
+            mask = all_permissions if "*" in granted else 0
+            for name in granted:
+                if name != "*":
+                    mask |= permission_bits[name]
+            role_permissions[role] = mask
+
+            # Restrictions go into separate deny masks checked after the grants, see RESTRICTION_DENIED_ACTIONS
+            denied, actions, conditions = 0, set(), []
+            for label in definition.get("restrictions") or []:
+                if label in RESTRICTION_DENIED_ACTIONS:
+                    actions |= RESTRICTION_DENIED_ACTIONS[label]
+                elif label in CONSTRAINT_LABELS:
+                    conditions.append(label)
+                else:
+                    denied |= permission_bits.setdefault(label, 1 << len(permission_bits))
+            denied_permissions[role] = denied
+            denied_actions[role] = frozenset(actions)
+            constraints[role] = conditions
+
+        self.action_bits = action_bits
+        self.resource_bits = resource_bits
+        self.grants = grants
+        self.wildcards = wildcards
+        self.permission_bits = permission_bits
+        self.role_permissions = role_permissions
+        self.denied_permissions = denied_permissions
+        self.denied_actions = denied_actions
+        self.constraints = constraints
+
+def main():
+    """Main CLI interface for authorization checks"""
+    parser = argparse.ArgumentParser(description="Archi3 RBAC Engine")
+    parser.add_argument("--policies-dir", default="./archi3/policies",
+                       help="Path to policies directory")
+    parser.add_argument("--environment", "-e", required=True,
+                       help="Environment whose effective policy to enforce")
+    parser.add_argument("--check", action="append", default=[],
+                       help="Check role:resource:action (repeatable)")
+    parser.add_argument("--file", help="File with one 'role resource action' request per line")
+    parser.add_argument("--describe", action="store_true",
+                       help="Print the compiled grants")
+    parser.add_argument("--verbose", "-v", action="store_true",
+                       help="Verbose output")
+
+    args = parser.parse_args()
+
+    if args.verbose:
+        logging.getLogger().setLevel(logging.DEBUG)
+
+    if not args.check and not args.file and not args.describe:
+        parser.error("--check, --file or --describe is required")
+
+    try:
+        engine = Archi3RbacEngine(args.policies_dir, args.environment)
+
+        if args.describe:
+            print(json.dumps(engine.describe(), indent=2))
+
+        for check in args.check:
+            parts = check.split(":")
+            if len(parts) != 3:
+                parser.error(f"--check expects role:resource:action, got {check}")
+            print(f"{'ALLOW' if engine.allowed(*parts) else 'DENY '} {check}")
+
+        if args.file:
+            with open(args.file, 'r') as f:
+                requests = [tuple(line.split()) for line in f if line.strip()]
+            invalid = [request for request in requests if len(request) != 3]
+            if invalid:
+                parser.error(f"Malformed request line: {' '.join(invalid[0])}")
+
+            started = time.perf_counter()
+            decisions = engine.allowed_many(requests)
+            elapsed = time.perf_counter() - started
+            for request, decision in zip(requests, decisions):
+                print(f"{'ALLOW' if decision else 'DENY '} {':'.join(request)}")
+            print(f"Checked {len(decisions)} requests in {elapsed:.3f}s "
+                  f"({sum(decisions)} allowed, {len(decisions) - sum(decisions)} denied)")
+
+    except Exception as e:
+        logger.error(f"Authorization check failed: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Archi3 Release Manager
+Immutable, versioned release directories behind an atomically swapped "current" symlink
+"""
+
+import json
+import os
+import shutil
+import hashlib
+import tempfile
+from pathlib import Path
+from typing import Dict, Any, Optional, List
+from datetime import datetime
+import logging
+
+from backup_store import Archi3BackupStore
+
+logger = logging.getLogger(__name__)
+
+class Archi3ReleaseManager:
+    """Publish policy releases per environment and switch between them in O(1)"""
+
+    CURRENT = "current"
+    METADATA = "release.json"
+
+    def __init__(self, releases_dir: str, backup_store: Archi3BackupStore, keep_releases: int = 10):
+        self.releases_dir = Path(releases_dir)
+        self.backup_store = backup_store
+        self.keep_releases = keep_releases
+        self.releases_dir.mkdir(parents=True, exist_ok=True)
+
+    def create_release(self, environment: str, release_id: str, files: Dict[str, Path]) -> Dict[str, Any]:
+        """Publish a release holding files (release-relative path -> source file)"""
+        env_dir = self._env_dir(environment)
+        release_dir = env_dir / release_id
+        if release_dir.exists():
+            raise FileExistsError(f"Release already exists: {release_dir}")
+
+        staging_dir = env_dir / f".staging-{release_id}"
+        if staging_dir.exists():
+            shutil.rmtree(staging_dir)
+        staging_dir.mkdir(parents=True)
+
+        manifest = {}
+        try:
+            for rel, source in sorted(files.items()):
+                # Hardlink the stored object: unchanged content costs no extra bytes
+                digest, size, _ = self.backup_store.put_file(Path(source))
+                target = staging_dir / rel
+                target.parent.mkdir(parents=True, exist_ok=True)
+                try:
+                    os.link(self.backup_store.object_path(digest), target)
+                except OSError:
+                    shutil.copyfile(self.backup_store.object_path(digest), target)
+                    os.chmod(target, 0o444)
+                manifest[rel] = {"sha256": digest, "size": size}
+
+            metadata = {
+                "release_id": release_id,
+                "environment": environment,
+                "created": datetime.now().isoformat(),
+                "files": manifest
+            }
+            with open(staging_dir / self.METADATA, 'w') as f:
+                json.dump(metadata, f, indent=2)
+
+            # Publishing is a single rename, readers never see a partial release
+            os.rename(staging_dir, release_dir)
+        except BaseException:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            raise
+
+        logger.info(f"Created release {release_id} for {environment} ({len(manifest)} files)")
+        return metadata
+
+    def activate(self, environment: str, release_id: str) -> Optional[str]:
+        """Point the environment's current symlink at a release, returning the previous release"""
+        env_dir = self._env_dir(environment)
+        if not (env_dir / release_id / self.METADATA).exists():
+            raise FileNotFoundError(f"Release not found: {env_dir / release_id}")
+
+        previous = self.current_release(environment)
+        tmp_link = env_dir / f".{self.CURRENT}.{os.getpid()}.tmp"
+        if tmp_link.is_symlink() or tmp_link.exists():
+            tmp_link.unlink()
+        os.symlink(release_id, tmp_link)
+        os.replace(tmp_link, env_dir / self.CURRENT)
+
+        logger.info(f"Activated release {release_id} for {environment}")
+        return previous
+
+    def rollback(self, environment: str, release_id: str = None) -> Dict[str, Any]:
+        """Flip current to release_id, or to the release preceding the current one"""
+        current = self.current_release(environment)
+        if release_id is None:
+            releases = self.list_releases(environment)
+            if current not in releases or releases.index(current) == 0:
+                raise LookupError(f"No release before {current} for {environment}")
+            release_id = releases[releases.index(current) - 1]
+
+        self.activate(environment, release_id)
+        return {"from": current, "to": release_id}
+
+    def restore(self, environment: str, release_id: str, target_root: Path) -> Dict[str, Any]:
+        """Write a release's files back under target_root, rewriting only those whose content differs"""
+        metadata = self.load_metadata(environment, release_id)
+        target_root = Path(target_root)
+        restored = []
+        for rel in self.differing_files(environment, release_id, target_root):
+            target = target_root / rel
+            target.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.release_path(environment, release_id) / rel, 'rb') as f:
+                self._atomic_write(target, f.read())
+            restored.append(rel)
+
+        logger.info(f"Restored {len(restored)} of {len(metadata['files'])} files from release {release_id}")
+        return {"restored": restored, "files": sorted(metadata["files"])}
+
+    def differing_files(self, environment: str, release_id: str, target_root: Path) -> List[str]:
+        """Release files that are missing under target_root or hold different content"""
+        metadata = self.load_metadata(environment, release_id)
+        target_root = Path(target_root)
+        return [rel for rel, entry in sorted(metadata["files"].items())
+                if not (target_root / rel).is_file() or self._file_digest(target_root / rel) != entry["sha256"]]
+
+    def load_metadata(self, environment: str, release_id: str) -> Dict[str, Any]:
+        metadata_path = self.release_path(environment, release_id) / self.METADATA
+        if not metadata_path.exists():
+            raise FileNotFoundError(f"Release not found: {metadata_path.parent}")
+        with open(metadata_path, 'r') as f:
+            return json.load(f)
+
+    def current_release(self, environment: str) -> Optional[str]:
+        """Release the current symlink points at"""
+        link = self._env_dir(environment) / self.CURRENT
+        if not link.is_symlink():
+            return None
+        return os.readlink(link)
+
+    def current_path(self, environment: str) -> Path:
+        """Stable path readers use to reach the active release"""
+        return self._env_dir(environment) / self.CURRENT
+
+    def release_path(self, environment: str, release_id: str) -> Path:
+        return self._env_dir(environment) / release_id
+
+    def list_releases(self, environment: str) -> List[str]:
+        """Published releases for an environment, oldest first"""
+        env_dir = self._env_dir(environment)
+        if not env_dir.exists():
+            return []
+        return sorted(path.name for path in env_dir.iterdir()
+                      if path.is_dir() and not path.is_symlink() and not path.name.startswith("."))
+
+    def garbage_collect(self, environment: str, keep: int = None) -> List[str]:
+        """Remove the oldest releases beyond the retention limit, never touching the current one"""
+        keep = self.keep_releases if keep is None else keep
+        current = self.current_release(environment)
+        releases = self.list_releases(environment)
+
+        removed = []
+        for release_id in releases[:max(0, len(releases) - keep)]:
+            if release_id == current:
+                continue
+            shutil.rmtree(self._env_dir(environment) / release_id)
+            removed.append(release_id)
+
+        if removed:
+            logger.info(f"Removed {len(removed)} old releases for {environment}")
+        return removed
+
+    def _env_dir(self, environment: str) -> Path:
+        return self.releases_dir / environment
+
+    def _file_digest(self, path: Path) -> str:
+        with open(path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+    def _atomic_write(self, path: Path, data: bytes):
+        """Write data to a temp file beside path and rename it into place"""
+        fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=str(path.parent))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(tmp_name, 0o644)
+            os.replace(tmp_name, path)
+        except BaseException:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            raise
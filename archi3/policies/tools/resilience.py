@@ -0,0 +1,488 @@
+#!/usr/bin/env python3
+"""
+Archi3 Resilience Layer
+Timeouts, circuit breakers, jittered exponential-backoff retries and per-target concurrency caps
+for MCP server calls, configured from the environment policy
+"""
+
+import json
+import sys
+import re
+import time
+import random
+import asyncio
+import threading
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from collections import deque
+from pathlib import Path
+from typing import Dict, Any, Optional, Callable
+import argparse
+import logging
+
+sys.path.append(str(Path(__file__).resolve().parent))
+from resolver import Archi3PolicyResolver
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DURATION_PATTERN = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*(ms|s|sec|seconds?|m|min|minutes?|h|hours?)\s*$", re.IGNORECASE)
+DURATION_UNITS = {"ms": 0.001, "s": 1, "sec": 1, "m": 60, "min": 60, "h": 3600}
+
+# HTTP statuses that signal a struggling upstream rather than a bad request
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+def parse_duration(value: Any) -> float:
+    """Seconds in '30s', '500ms', '2m' or a bare number of seconds"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = DURATION_PATTERN.match(str(value))
+    if not match:
+        raise ValueError(f"Unrecognized duration: {value!r}")
+    unit = match.group(2).lower()
+    unit = unit if unit in DURATION_UNITS else unit[0]
+    return float(match.group(1)) * DURATION_UNITS[unit]
+
+def retryable(error: BaseException) -> bool:
+    """Timeouts, connection failures and 408/429/5xx responses; other HTTP errors are the caller's fault"""
+    if isinstance(error, urllib.error.HTTPError):
+        return error.code in RETRYABLE_STATUSES
+    return isinstance(error, (TimeoutError, asyncio.TimeoutError, OSError))
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a target whose circuit breaker is open"""
+
+    def __init__(self, target: str, retry_in: float):
+        super().__init__(f"Circuit open for {target}, retry in {retry_in:.1f}s")
+        self.target = target
+        self.retry_in = retry_in
+
+def _resolve(future: "asyncio.Future"):
+    if not future.done():
+        future.set_result(None)
+
+class _SlotWaiter:
+    __slots__ = ("notify", "granted")
+
+    def __init__(self, notify: Callable[[], None]):
+        self.notify = notify
+        self.granted = False
+
+class _Slots:
+    """Concurrency cap shared by threads and coroutines, on whichever event loop they run
+
+    A released slot is handed straight to the longest waiter, thread or coroutine, so the cap
+    holds across call() and call_async() together and neither kind of caller starves the other.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._lock = threading.Lock()
+        self._free = limit
+        self._waiters = deque()
+
+    def acquire(self, timeout: float = None) -> bool:
+        with self._lock:
+            if self._free and not self._waiters:
+                self._free -= 1
+                return True
+            wake = threading.Event()
+            waiter = _SlotWaiter(wake.set)
+            self._waiters.append(waiter)
+        wake.wait(timeout)
+        return self._settle(waiter)
+
+    async def acquire_async(self, timeout: float = None) -> bool:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._free and not self._waiters:
+                self._free -= 1
+                return True
+            future = loop.create_future()
+            waiter = _SlotWaiter(lambda: loop.call_soon_threadsafe(_resolve, future))
+            self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            # A slot granted to a cancelled caller goes to the next waiter
+            if self._settle(waiter):
+                self.release()
+            raise
+        return self._settle(waiter)
+
+    def release(self):
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                waiter.granted = True
+                try:
+                    waiter.notify()
+                    return
+                except RuntimeError:
+                    # The waiter's event loop has closed; pass the slot on
+                    waiter.granted = False
+            if self._free >= self.limit:
+                raise ValueError("Slot released more times than it was acquired")
+            self._free += 1
+
+    def _settle(self, waiter: _SlotWaiter) -> bool:
+        """Whether the waiter was granted a slot; if not, stop it from being granted one later"""
+        with self._lock:
+            if waiter.granted:
+                return True
+            self._waiters.remove(waiter)
+            return False
+
+class _Target:
+    """Breaker state, concurrency cap and counters for one call target"""
+
+    def __init__(self, max_concurrency: int):
+        self.lock = threading.Lock()
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        # Token of the caller running the half-open probe; only that caller may clear it
+        self.probing = None
+        # One cap for sync and async callers alike, not bound to any event loop
+        self.slots = _Slots(max_concurrency)
+        self.in_flight = 0
+        self.counters = {"calls": 0, "successes": 0, "failures": 0, "retries": 0, "timeouts": 0,
+                         "rejected": 0, "trips": 0}
+
+class Archi3ResilientCaller:
+    """Wrap calls to an MCP server's targets with its policy's timeout, breaker and retry settings
+
+    A call is fn(timeout) for call() and an awaitable from fn(timeout) for call_async(); fn is
+    expected to honour the timeout it is given (as urllib does), and call_async also enforces it.
+    Only retryable failures are retried and count towards tripping a target's breaker. After
+    failure_threshold consecutive ones the breaker opens for reset_timeout seconds, then lets a
+    single probe through: its success closes the breaker, its failure reopens it.
+    """
+
+    def __init__(self, policies_dir: str, environment: str, server: str = "api-gateway",
+                 max_concurrency: int = 16, max_attempts: int = 4, base_delay: float = 0.1,
+                 max_delay: float = 10.0, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 check_interval: float = 5.0, clock=time.monotonic, rng: random.Random = None):
+        self.policies_dir = Path(policies_dir)
+        self.environment = environment
+        self.server = server
+        self.max_concurrency = max_concurrency
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.check_interval = check_interval
+        self.clock = clock
+        self.rng = rng or random.Random()
+        self.resolver = Archi3PolicyResolver(str(self.policies_dir))
+        self._lock = threading.Lock()
+        self._targets = {}
+        self.sources = None
+        self.reload()
+
+    def call(self, target: str, fn: Callable[[float], Any], timeout: float = None) -> Any:
+        """Call fn(timeout) for a target, retrying with backoff; raises the last error or CircuitOpenError"""
+        self._maybe_refresh()
+        timeout = self.timeout if timeout is None else timeout
+        state = self._target(target)
+        if not state.slots.acquire(timeout=timeout):
+            raise TimeoutError(f"No free slot for {target} within {timeout:g}s ({self.max_concurrency} in flight)")
+        self._enter(state)
+        probe = None
+        try:
+            attempt = 0
+            while True:
+                probe = self._admit(target, state)
+                try:
+                    result = fn(timeout)
+                except Exception as e:
+                    delay = self._failed(target, state, e, attempt, probe)
+                    if delay is None:
+                        raise
+                    time.sleep(delay)
+                    attempt += 1
+                    continue
+                self._succeeded(state, probe)
+                return result
+        finally:
+            self._leave(state, probe)
+            state.slots.release()
+
+    async def call_async(self, target: str, fn: Callable[[float], Any], timeout: float = None) -> Any:
+        """Like call, for a coroutine function; waits and backs off without blocking the event loop"""
+        self._maybe_refresh()
+        timeout = self.timeout if timeout is None else timeout
+        state = self._target(target)
+        if not await state.slots.acquire_async(timeout):
+            raise TimeoutError(f"No free slot for {target} within {timeout:g}s ({self.max_concurrency} in flight)")
+        self._enter(state)
+        probe = None
+        try:
+            attempt = 0
+            while True:
+                probe = self._admit(target, state)
+                try:
+                    result = await asyncio.wait_for(fn(timeout), timeout)
+                except Exception as e:
+                    delay = self._failed(target, state, e, attempt, probe)
+                    if delay is None:
+                        raise
+                    await asyncio.sleep(delay)
+                    attempt += 1
+                    continue
+                self._succeeded(state, probe)
+                return result
+        finally:
+            self._leave(state, probe)
+            state.slots.release()
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff: uniform over [0, min(max_delay, base_delay * 2^attempt)]"""
+        return self.rng.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def state(self, target: str) -> str:
+        state = self._targets.get(target)
+        if state is None:
+            return CLOSED
+        with state.lock:
+            if state.state == OPEN and self.clock() - state.opened_at >= self.reset_timeout:
+                return HALF_OPEN
+            return state.state
+
+    def reset(self, target: str = None):
+        """Close breakers and zero counters, for one target or all of them"""
+        with self._lock:
+            if target is None:
+                self._targets.clear()
+            else:
+                self._targets.pop(target, None)
+
+    def metrics(self) -> Dict[str, Any]:
+        targets = {}
+        for target, state in list(self._targets.items()):
+            with state.lock:
+                targets[target] = dict(state.counters, in_flight=state.in_flight, consecutive_failures=state.failures)
+            targets[target]["state"] = self.state(target)
+        return {
+            "environment": self.environment,
+            "server": self.server,
+            "timeout": self.timeout,
+            "circuit_breaker": self.breaker_enabled,
+            "retry_policy": self.retry_policy,
+            "targets": targets
+        }
+
+    def reload(self) -> bool:
+        """Re-read the server's settings if the environment policy changed; True when they were reloaded"""
+        with self._lock:
+            self._checked_at = time.monotonic()
+            if self.sources is not None and not self.resolver.is_stale(self.environment):
+                return False
+
+            artifact = self.resolver.resolve(self.environment)
+            servers = artifact["policy"].get("environment", {}).get("mcp-servers", {}) or {}
+            config = servers.get(self.server) or {}
+            self.timeout = parse_duration(config.get("timeout", "30s"))
+            self.breaker_enabled = bool(config.get("circuit-breaker", False))
+            self.retry_policy = config.get("retry-policy")
+            if self.retry_policy not in (None, "none", "exponential-backoff"):
+                logger.warning(f"Unsupported retry-policy {self.retry_policy!r} for {self.server}, not retrying")
+            self.attempts = self.max_attempts if self.retry_policy == "exponential-backoff" else 1
+            self.sources = artifact["sources"]
+            logger.info(f"Loaded {self.server} resilience settings for {self.environment}: timeout={self.timeout:g}s "
+                        f"circuit-breaker={self.breaker_enabled} retry-policy={self.retry_policy or 'none'}")
+            return True
+
+    def _maybe_refresh(self):
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            self.reload()
+
+    def _target(self, target: str) -> _Target:
+        state = self._targets.get(target)
+        if state is None:
+            with self._lock:
+                state = self._targets.setdefault(target, _Target(self.max_concurrency))
+        return state
+
+    def _enter(self, state: _Target):
+        with state.lock:
+            state.in_flight += 1
+
+    def _leave(self, state: _Target, probe: Optional[object]):
+        with state.lock:
+            state.in_flight -= 1
+            if probe is not None and state.probing is probe:
+                # A probe cancelled before it finished must not block the next one
+                state.probing = None
+
+    def _admit(self, target: str, state: _Target) -> bool:
+        """Count an attempt, or raise CircuitOpenError if the breaker refuses it; a token for a half-open probe"""
+        probe = None
+        with state.lock:
+            if self.breaker_enabled and state.state != CLOSED:
+                elapsed = self.clock() - state.opened_at
+                if state.state == OPEN and elapsed >= self.reset_timeout:
+                    state.state = HALF_OPEN
+                if state.state == OPEN or state.probing is not None:
+                    state.counters["rejected"] += 1
+                    raise CircuitOpenError(target, max(self.reset_timeout - elapsed, 0.0))
+                state.probing = probe = object()
+            state.counters["calls"] += 1
+        return probe
+
+    def _succeeded(self, state: _Target, probe: Optional[object] = None):
+        with state.lock:
+            state.counters["successes"] += 1
+            state.failures = 0
+            if probe is not None and state.probing is probe:
+                state.probing = None
+            state.state = CLOSED
+
+    def _failed(self, target: str, state: _Target, error: Exception, attempt: int,
+                probe: Optional[object] = None) -> Optional[float]:
+        """Record a failed attempt; seconds to back off before retrying, or None to give up"""
+        is_retryable = retryable(error)
+        with state.lock:
+            state.counters["failures"] += 1
+            if isinstance(error, (TimeoutError, asyncio.TimeoutError)):
+                state.counters["timeouts"] += 1
+            # Calls admitted before the breaker opened finish too; only the probe's own outcome frees its slot
+            if probe is not None and state.probing is probe:
+                state.probing = None
+            if not is_retryable:
+                # The upstream answered; a bad request says nothing about its health
+                if state.state == HALF_OPEN:
+                    state.state = CLOSED
+                return None
+
+            state.failures += 1
+            if self.breaker_enabled and (state.state == HALF_OPEN or state.failures >= self.failure_threshold):
+                if state.state != OPEN:
+                    state.counters["trips"] += 1
+                    logger.warning(f"Circuit breaker for {target} opened after {state.failures} failure(s): {error}")
+                state.state = OPEN
+                state.opened_at = self.clock()
+                return None
+            if attempt + 1 >= self.attempts:
+                return None
+            state.counters["retries"] += 1
+        return self.backoff(attempt)
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Answers 200 or, with probability failure_rate, 503, after latency seconds"""
+
+    failure_rate = 0.0
+    latency = 0.0
+    rng = random.Random(0)
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        status = 503 if self.rng.random() < self.failure_rate else 200
+        body = json.dumps({"status": status}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def run_stub_demo(caller: Archi3ResilientCaller, requests: int = 200, failure_rate: float = 0.3,
+                  latency: float = 0.01, threads: int = 8) -> Dict[str, Any]:
+    """Drive requests through the caller against a local stub server that fails failure_rate of them"""
+    handler = type("StubHandler", (_StubHandler,), {"failure_rate": failure_rate, "latency": latency,
+                                                    "rng": random.Random(42)})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    outcomes = {"ok": 0, "failed": 0, "circuit_open": 0}
+    outcomes_lock = threading.Lock()
+
+    def fetch(timeout: float) -> int:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            return response.status
+
+    def worker(count: int):
+        for _ in range(count):
+            try:
+                caller.call("stub", fetch)
+                outcome = "ok"
+            except CircuitOpenError as e:
+                outcome = "circuit_open"
+                time.sleep(e.retry_in)
+            except Exception:
+                outcome = "failed"
+            with outcomes_lock:
+                outcomes[outcome] += 1
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(requests // threads + (i < requests % threads),))
+               for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+    server.server_close()
+    return {"requests": requests, "failure_rate": failure_rate, "seconds": round(elapsed, 3),
+            "outcomes": outcomes, "metrics": caller.metrics()}
+
+def main():
+    """Main CLI interface for resilient MCP calls"""
+    parser = argparse.ArgumentParser(description="Archi3 Resilience Layer")
+    parser.add_argument("--policies-dir", default="./archi3/policies",
+                       help="Path to policies directory")
+    parser.add_argument("--environment", "-e", required=True,
+                       help="Environment whose mcp-servers settings to apply")
+    parser.add_argument("--server", default="api-gateway",
+                       help="MCP server whose timeout, circuit-breaker and retry-policy to use")
+    parser.add_argument("--url", help="GET a URL through the resilience layer")
+    parser.add_argument("--demo", type=int, metavar="REQUESTS",
+                       help="Send this many requests to a local failing stub server")
+    parser.add_argument("--failure-rate", type=float, default=0.3,
+                       help="Fraction of stub server responses that are 503")
+    parser.add_argument("--latency", type=float, default=0.01,
+                       help="Stub server response delay in seconds")
+    parser.add_argument("--max-concurrency", type=int, default=16,
+                       help="Concurrent calls allowed per target")
+    parser.add_argument("--reset-timeout", type=float, default=30.0,
+                       help="Seconds an open circuit breaker waits before a probe")
+    parser.add_argument("--verbose", "-v", action="store_true",
+                       help="Verbose output")
+
+    args = parser.parse_args()
+
+    if args.verbose:
+        logging.getLogger().setLevel(logging.DEBUG)
+
+    try:
+        caller = Archi3ResilientCaller(args.policies_dir, args.environment, server=args.server,
+                                       max_concurrency=args.max_concurrency, reset_timeout=args.reset_timeout)
+        if args.url:
+            def fetch(timeout: float) -> int:
+                with urllib.request.urlopen(args.url, timeout=timeout) as response:
+                    return response.status
+            print(f"{caller.call(args.url, fetch)} {args.url}")
+        elif args.demo:
+            print(json.dumps(run_stub_demo(caller, args.demo, args.failure_rate, args.latency), indent=2))
+        else:
+            print(json.dumps(caller.metrics(), indent=2))
+
+    except Exception as e:
+        logger.error(f"Resilient call failed: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
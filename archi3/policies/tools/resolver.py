@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Archi3 Policy Resolver
+Materialize effective per-environment policies from core policies and environment overlays
+"""
+
+import yaml
+import json
+import os
+import sys
+import copy
+import hashlib
+import tempfile
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Tuple
+from datetime import datetime
+import argparse
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+class Archi3PolicyResolver:
+    """Resolve core policies and environment overlays into effective policies"""
+
+    CORE_POLICIES = ["agent-policies", "orchestration-policies", "security-policies"]
+
+    # Environment sections merged onto a core policy: section -> (core policy, path inside it)
+    OVERLAY_TARGETS = {
+        "security-overrides": ("security-policies", []),
+        "network-security": ("security-policies", ["network-security"]),
+        "compliance": ("security-policies", ["compliance"]),
+        "performance-monitoring": ("agent-policies", ["performance-monitoring"]),
+    }
+
+    # Environment sections that are not carried into the effective policy
+    SKIPPED_SECTIONS = ["version", "validation"]
+
+    def __init__(self, policies_dir: str, output_dir: str = None):
+        self.policies_dir = Path(policies_dir)
+        self.core_dir = self.policies_dir / "core"
+        self.environments_dir = self.policies_dir / "environments"
+        self.output_dir = Path(output_dir) if output_dir else self.policies_dir / "effective"
+        self._artifacts = {}
+
+    def resolve(self, environment: str, force: bool = False, persist: bool = True) -> Dict[str, Any]:
+        """Compute the effective policy for an environment, reusing unchanged sections"""
+        env_rel = f"environments/{environment}.yaml"
+        if not (self.policies_dir / env_rel).exists():
+            raise FileNotFoundError(f"Environment policy not found: {self.policies_dir / env_rel}")
+
+        sources = self._hash_sources(environment)
+        previous = None if force else self._load_artifact(environment)
+        if previous and previous.get("sources") == sources:
+            self._artifacts[environment] = previous
+            return previous
+
+        previous_sources = previous.get("sources", {}) if previous else {}
+        changed = {rel for rel, digest in sources.items() if previous_sources.get(rel) != digest}
+
+        loaded = {}
+        policy = {}
+        provenance = {}
+        for section, inputs in self._section_inputs(environment).items():
+            if previous and section in previous["policy"] and not changed.intersection(inputs):
+                policy[section] = previous["policy"][section]
+                provenance[section] = previous["provenance"][section]
+                continue
+
+            for rel in inputs:
+                if rel not in loaded:
+                    loaded[rel] = self._load_yaml(self.policies_dir / rel)
+            policy[section], provenance[section] = self._resolve_section(section, environment, loaded)
+            logger.debug(f"Resolved section {section} for {environment}")
+
+        artifact = {
+            "version": "1.0.0",
+            "environment": environment,
+            "generated": datetime.now().isoformat(),
+            "sources": sources,
+            "policy": policy,
+            "provenance": provenance
+        }
+        if persist:
+            self._write_artifact(environment, artifact)
+        self._artifacts[environment] = artifact
+        logger.info(f"Resolved effective policy for {environment} ({len(changed)} changed source(s))")
+        return artifact
+
+    def load_effective(self, environment: str) -> Dict[str, Any]:
+        """Return the effective policy, re-resolving only when a source has changed"""
+        artifact = self._artifacts.get(environment)
+        if artifact is None or self.is_stale(environment, artifact):
+            artifact = self.resolve(environment)
+        return artifact["policy"]
+
+    def is_stale(self, environment: str, artifact: Dict[str, Any] = None) -> bool:
+        """Check whether any source of an effective policy has changed since it was resolved"""
+        artifact = artifact or self._artifacts.get(environment) or self._load_artifact(environment)
+        if not artifact:
+            return True
+        return artifact.get("sources") != self._hash_sources(environment)
+
+    def get_provenance(self, environment: str, key_path: str) -> Optional[str]:
+        """Return the source file that supplied a dotted key path of the effective policy"""
+        self.load_effective(environment)
+        section = key_path.split(".", 1)[0]
+        return self._artifacts[environment]["provenance"].get(section, {}).get(key_path)
+
+    def changed_sections(self, environment: str, previous_sources: Dict[str, str]) -> List[str]:
+        """Sections of the effective policy fed by a source whose hash differs from previous_sources"""
+        sources = self._hash_sources(environment)
+        return [section for section, inputs in self._section_inputs(environment).items()
+                if any(previous_sources.get(rel) != sources[rel] for rel in inputs)]
+
+    def list_environments(self) -> List[str]:
+        """List environments that have an overlay file"""
+        return sorted(path.stem for path in self.environments_dir.glob("*.yaml"))
+
+    def artifact_path(self, environment: str) -> Path:
+        """Path of the materialized effective policy for an environment"""
+        return self.output_dir / f"{environment}.json"
+
+    def _section_inputs(self, environment: str) -> Dict[str, List[str]]:
+        """Map each effective policy section to the source files it depends on"""
+        env_rel = f"environments/{environment}.yaml"
+        overlaid = {target for target, _ in self.OVERLAY_TARGETS.values()}
+        overlaid.add("agent-policies")
+
+        inputs = {}
+        for core_policy in self.CORE_POLICIES:
+            core_rel = f"core/{core_policy}.yaml"
+            if not (self.policies_dir / core_rel).exists():
+                continue
+            inputs[core_policy] = [core_rel, env_rel] if core_policy in overlaid else [core_rel]
+        inputs["environment"] = [env_rel]
+        return inputs
+
+    def _resolve_section(self, section: str, environment: str,
+                         loaded: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, str]]:
+        """Merge one section of the effective policy and record provenance for its keys"""
+        env_rel = f"environments/{environment}.yaml"
+        env_policy = loaded.get(env_rel) or {}
+        provenance = {}
+
+        if section == "environment":
+            consumed = set(self.OVERLAY_TARGETS) | {"agent-overrides"} | set(self.SKIPPED_SECTIONS)
+            content = {key: copy.deepcopy(value) for key, value in env_policy.items() if key not in consumed}
+            self._record_provenance(content, [section], env_rel, provenance)
+            return content, provenance
+
+        core_rel = f"core/{section}.yaml"
+        content = copy.deepcopy(loaded[core_rel] or {})
+        self._record_provenance(content, [section], core_rel, provenance)
+
+        for overlay, (target, path) in self.OVERLAY_TARGETS.items():
+            if target == section and overlay in env_policy:
+                self._merge(content, path, env_policy[overlay], [section] + path, env_rel, provenance)
+
+        if section == "agent-policies" and "agent-overrides" in env_policy:
+            self._apply_agent_overrides(content, env_policy["agent-overrides"], env_rel, provenance)
+
+        return content, provenance
+
+    def _apply_agent_overrides(self, content: Dict[str, Any], overrides: Dict[str, Any],
+                               source: str, provenance: Dict[str, str]):
+        """Apply agent-overrides onto agent definitions and coordination protocols"""
+        agent_paths = {}
+        for agent_type, agents in content.get("agents", {}).items():
+            for agent_name, agent_data in agents.items():
+                if isinstance(agent_data, dict) and "id" in agent_data:
+                    agent_paths[agent_data["id"]] = ["agents", agent_type, agent_name]
+
+        for agent_id, standards in overrides.get("quality-standards", {}).items():
+            if agent_id not in agent_paths:
+                logger.warning(f"Override references unknown agent {agent_id} in {source}")
+                continue
+            path = agent_paths[agent_id] + ["quality-standards"]
+            self._merge(content, path, standards, ["agent-policies"] + path, source, provenance)
+
+        if "communication-protocols" in overrides:
+            path = ["coordination", "communication-protocols"]
+            self._merge(content, path, overrides["communication-protocols"],
+                        ["agent-policies"] + path, source, provenance)
+
+    def _merge(self, content: Dict[str, Any], path: List[str], overlay: Any,
+               key_path: List[str], source: str, provenance: Dict[str, str]):
+        """Deep-merge an overlay into content at path, overlay values winning"""
+        node = content
+        for key in path[:-1]:
+            if not isinstance(node.get(key), dict):
+                node[key] = {}
+            node = node[key]
+
+        if not path:
+            for key, value in overlay.items():
+                self._merge(content, [key], value, key_path + [key], source, provenance)
+            return
+
+        key = path[-1]
+        if isinstance(overlay, dict) and isinstance(node.get(key), dict):
+            for child_key, child_value in overlay.items():
+                self._merge(node[key], [child_key], child_value, key_path + [child_key], source, provenance)
+            return
+
+        # Overlay replaces the value outright, drop provenance of whatever it replaced
+        joined = ".".join(key_path)
+        provenance.pop(joined, None)
+        if isinstance(node.get(key), dict):
+            for stale in [k for k in provenance if k.startswith(joined + ".")]:
+                del provenance[stale]
+        node[key] = copy.deepcopy(overlay)
+        self._record_provenance(node[key], key_path, source, provenance)
+
+    def _record_provenance(self, content: Any, key_path: List[str], source: str,
+                           provenance: Dict[str, str]):
+        """Record the source file for every leaf key path under content"""
+        if isinstance(content, dict) and content:
+            for key, value in content.items():
+                self._record_provenance(value, key_path + [str(key)], source, provenance)
+        else:
+            provenance[".".join(key_path)] = source
+
+    def _hash_sources(self, environment: str) -> Dict[str, str]:
+        """Hash every source file that feeds an environment's effective policy"""
+        sources = {}
+        for inputs in self._section_inputs(environment).values():
+            for rel in inputs:
+                if rel not in sources:
+                    with open(self.policies_dir / rel, 'rb') as f:
+                        sources[rel] = hashlib.sha256(f.read()).hexdigest()
+        return sources
+
+    def _load_yaml(self, path: Path) -> Any:
+        """Load a YAML policy file"""
+        with open(path, 'r') as f:
+            return yaml.safe_load(f)
+
+    def _load_artifact(self, environment: str) -> Optional[Dict[str, Any]]:
+        """Load a previously materialized effective policy"""
+        path = self.artifact_path(environment)
+        if not path.exists():
+            return None
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable effective policy {path}: {e}")
+            return None
+
+    def _write_artifact(self, environment: str, artifact: Dict[str, Any]):
+        """Write the effective policy through a temp file and atomic rename"""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        path = self.artifact_path(environment)
+        fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=str(self.output_dir))
+        try:
+            os.fchmod(fd, 0o644)
+            with os.fdopen(fd, 'w') as f:
+                json.dump(artifact, f, indent=2)
+            os.replace(tmp_name, path)
+        except BaseException:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            raise
+
+def main():
+    """Main CLI interface for effective policy resolution"""
+    parser = argparse.ArgumentParser(description="Archi3 Policy Resolver")
+    parser.add_argument("--policies-dir", default="./archi3/policies",
+                       help="Path to policies directory")
+    parser.add_argument("--environment", help="Environment to resolve")
+    parser.add_argument("--all-environments", action="store_true",
+                       help="Resolve every environment")
+    parser.add_argument("--key", help="Dotted key path to look up, e.g. security-policies.audit-logging")
+    parser.add_argument("--force", action="store_true",
+                       help="Re-resolve every section even if sources are unchanged")
+    parser.add_argument("--verbose", "-v", action="store_true",
+                       help="Verbose output")
+
+    args = parser.parse_args()
+
+    if args.verbose:
+        logging.getLogger().setLevel(logging.DEBUG)
+
+    resolver = Archi3PolicyResolver(args.policies_dir)
+
+    try:
+        if args.all_environments:
+            environments = resolver.list_environments()
+        elif args.environment:
+            environments = [args.environment]
+        else:
+            parser.error("--environment or --all-environments is required")
+
+        for environment in environments:
+            artifact = resolver.resolve(environment, force=args.force)
+
+            if args.key:
+                value = artifact["policy"]
+                for key in args.key.split("."):
+                    value = value[key]
+                section = artifact["provenance"].get(args.key.split(".", 1)[0], {})
+                sources = {key: source for key, source in section.items()
+                           if key == args.key or key.startswith(args.key + ".")}
+                print(json.dumps({"value": value, "provenance": sources}, indent=2))
+            else:
+                print(f"Effective policy for {environment}: {resolver.artifact_path(environment)}")
+                for rel, digest in artifact["sources"].items():
+                    print(f"   {rel} {digest[:12]}")
+
+    except Exception as e:
+        logger.error(f"Policy resolution failed: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Archi3 Task Router
+Route task descriptions to managers using the compiled agent-selection routing tables
+"""
+
+import json
+import os
+import sys
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, List, Tuple
+import argparse
+import logging
+
+sys.path.append(str(Path(__file__).resolve().parent))
+from generator import Archi3PolicyGenerator
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Router rebuilt once in each worker process of route_many
+_worker_router = None
+
+def _init_worker(routing_tables: Dict[str, Any]):
+    global _worker_router
+    _worker_router = Archi3TaskRouter.from_tables(routing_tables)
+
+def _route_chunk(texts: List[str]) -> List[Dict[str, Any]]:
+    return [_worker_router.route(text) for text in texts]
+
+class Archi3TaskRouter:
+    """Score task text against every trigger keyword in one pass and pick the managers"""
+
+    def __init__(self, policies_dir: str, workers: int = None, min_parallel: int = 2000,
+                 chunk_size: int = 500):
+        self.policies_dir = Path(policies_dir)
+        self.workers = workers or os.cpu_count() or 1
+        self.min_parallel = min_parallel
+        self.chunk_size = chunk_size
+        self._compile(self._load_routing_tables())
+
+    @classmethod
+    def from_tables(cls, routing_tables: Dict[str, Any]) -> "Archi3TaskRouter":
+        """Build a router from already-loaded routing tables"""
+        router = cls.__new__(cls)
+        router.policies_dir = None
+        router.workers = 1
+        router.min_parallel = 0
+        router.chunk_size = 0
+        router._compile(routing_tables)
+        return router
+
+    def route(self, text: str) -> Dict[str, Any]:
+        """Route one task description"""
+        return self.route_tokens(self.tokenize(text))
+
+    def tokenize(self, text: str) -> List[str]:
+        """Normalized tokens of a task description, in order"""
+        return [self._normalize(token) for token in TOKEN_PATTERN.findall(text.lower())]
+
+    def routing_sequence(self, tokens: List[str]) -> Tuple[str, ...]:
+        """The tokens that can take part in a keyword match, runs of any others collapsed to one gap
+
+        Routing the sequence gives the same route as routing the tokens, so it can key a cache.
+        """
+        sequence = []
+        for token in tokens:
+            if token in self.phrase_tokens:
+                sequence.append(token)
+            elif sequence and sequence[-1]:
+                sequence.append("")
+        return tuple(sequence)
+
+    def route_tokens(self, tokens: List[str]) -> Dict[str, Any]:
+        """Route already normalized tokens"""
+        scores = {}
+        matched = []
+        phrases = self.phrases
+        for position, token in enumerate(tokens):
+            candidates = phrases.get(token)
+            if not candidates:
+                continue
+            for phrase, keyword, domains in candidates:
+                if len(phrase) > 1 and tuple(tokens[position:position + len(phrase)]) != phrase:
+                    continue
+                matched.append(keyword)
+                for domain in domains:
+                    scores[domain] = scores.get(domain, 0) + 1
+
+        return self._resolve(scores, matched)
+
+    def route_many(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """Route a batch of task descriptions, across worker processes for large batches"""
+        if self.workers <= 1 or len(texts) < self.min_parallel:
+            return [self.route(text) for text in texts]
+
+        chunks = [texts[i:i + self.chunk_size] for i in range(0, len(texts), self.chunk_size)]
+        routes = []
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=(self.routing_tables,)) as executor:
+            for chunk_routes in executor.map(_route_chunk, chunks):
+                routes.extend(chunk_routes)
+        return routes
+
+    def _load_routing_tables(self) -> Dict[str, Any]:
+        """Load generated/routing-tables.json, recompiling it when the orchestration policy changed"""
+        return Archi3PolicyGenerator(str(self.policies_dir)).load_routing_tables()
+
+    def _compile(self, routing_tables: Dict[str, Any]):
+        """Index every trigger keyword by its first token; multi-word keywords become phrases"""
+        self.routing_tables = routing_tables
+        self.domains = routing_tables["domains"]
+        self.combinations = routing_tables["domain-combinations"]
+        self.fallback = routing_tables.get("fallback")
+
+        phrases = {}
+        for keyword, domains in routing_tables["keyword-domains"].items():
+            phrase = tuple(self._normalize(token) for token in TOKEN_PATTERN.findall(keyword.lower()))
+            if phrase:
+                phrases.setdefault(phrase[0], []).append((phrase, keyword, tuple(domains)))
+        self.phrases = phrases
+        self.phrase_tokens = frozenset(token for candidates in phrases.values()
+                                       for phrase, _, _ in candidates for token in phrase)
+
+    def _resolve(self, scores: Dict[str, int], matched: List[str]) -> Dict[str, Any]:
+        """Turn domain scores into a route, using multi-domain tasks for combinations"""
+        ranked = sorted(scores, key=lambda domain: (-scores[domain], domain))
+        route = {
+            "domains": {domain: scores[domain] for domain in ranked},
+            "matched-keywords": sorted(set(matched)),
+            "task": None,
+            "primary-manager": None,
+            "supporting-managers": [],
+            "coordination-strategy": None
+        }
+
+        if not ranked:
+            return route
+
+        if len(ranked) == 1:
+            domain = self.domains[ranked[0]]
+            route.update({
+                "task": ranked[0],
+                "primary-manager": domain["primary-manager"],
+                "supporting-managers": domain["supporting-managers"]
+            })
+            return route
+
+        # Exact multi-domain task, else the two strongest domains, else full orchestration
+        combination = self.combinations.get(Archi3PolicyGenerator.routing_key(ranked))
+        if combination is None and len(ranked) > 2:
+            combination = self.combinations.get(Archi3PolicyGenerator.routing_key(ranked[:2]))
+            if combination is None and self.fallback:
+                combination = self.fallback
+        if combination is None:
+            # Two domains with no multi-domain task: lead with the stronger, support with the other
+            lead, other = self.domains[ranked[0]], self.domains[ranked[1]]
+            supporting = [other["primary-manager"]] + [manager for manager in lead["supporting-managers"]
+                                                      if manager != other["primary-manager"]]
+            route.update({
+                "task": ranked[0],
+                "primary-manager": lead["primary-manager"],
+                "supporting-managers": supporting
+            })
+            return route
+
+        route.update({
+            "task": combination["task"],
+            "primary-manager": combination["primary-manager"],
+            "supporting-managers": combination["supporting-managers"],
+            "coordination-strategy": combination["coordination-strategy"]
+        })
+        return route
+
+    @staticmethod
+    def _normalize(token: str) -> str:
+        """Fold simple plurals so 'reports' matches the keyword 'report'"""
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            return token[:-1]
+        return token
+
+def main():
+    """Main CLI interface for task routing"""
+    parser = argparse.ArgumentParser(description="Archi3 Task Router")
+    parser.add_argument("--policies-dir", default="./archi3/policies",
+                       help="Path to policies directory")
+    parser.add_argument("--text", help="Task description to route")
+    parser.add_argument("--file", help="File with one task description per line")
+    parser.add_argument("--workers", type=int, help="Worker processes for --file (default: CPU count)")
+    parser.add_argument("--output", help="Write routes as JSON lines to this file")
+    parser.add_argument("--verbose", "-v", action="store_true",
+                       help="Verbose output")
+
+    args = parser.parse_args()
+
+    if args.verbose:
+        logging.getLogger().setLevel(logging.DEBUG)
+
+    if not args.text and not args.file:
+        parser.error("--text or --file is required")
+
+    try:
+        router = Archi3TaskRouter(args.policies_dir, workers=args.workers)
+
+        if args.text:
+            print(json.dumps(router.route(args.text), indent=2))
+            return
+
+        with open(args.file, 'r') as f:
+            texts = [line.rstrip("\n") for line in f if line.strip()]
+
+        started = time.perf_counter()
+        routes = router.route_many(texts)
+        elapsed = time.perf_counter() - started
+
+        if args.output:
+            with open(args.output, 'w') as f:
+                for text, route in zip(texts, routes):
+                    f.write(json.dumps({"text": text, **route}) + "\n")
+            print(f"Routes saved to {args.output}")
+
+        unmatched = sum(1 for route in routes if route["primary-manager"] is None)
+        print(f"Routed {len(routes)} tasks in {elapsed:.3f}s "
+              f"({1e6 * elapsed / max(len(routes), 1):.1f} µs/task, {unmatched} unmatched)")
+
+    except Exception as e:
+        logger.error(f"Routing failed: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
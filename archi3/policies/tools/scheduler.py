@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Archi3 Task Scheduler
+Priority-based-with-capacity queuing of tasks on manager agents, with overflow to supporting managers
+"""
+
+import json
+import sys
+import re
+import time
+import heapq
+import random
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Tuple
+import argparse
+import logging
+
+sys.path.append(str(Path(__file__).resolve().parent))
+from generator import Archi3PolicyGenerator
+from resolver import Archi3PolicyResolver
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Capacity units a task takes, by its complexity level's resource-requirements
+DEMAND_UNITS = {"low": 1, "medium": 2, "high": 4, "enterprise": 8}
+
+# Weight of an agent's resource-requirements levels; heavier agents run fewer tasks at once
+RESOURCE_WEIGHTS = {"low": 1, "medium": 2, "high": 3}
+
+PRIORITIES = {"low": 0, "normal": 1, "high": 2, "critical": 3}
+
+class _Task:
+    __slots__ = ("task_id", "primary", "supporting", "demand", "priority", "submitted",
+                 "started", "manager", "overflow")
+
+    def __init__(self, task_id: str, primary: str, supporting: Tuple[str, ...], demand: float,
+                 priority: int, submitted: float):
+        self.task_id = task_id
+        self.primary = primary
+        self.supporting = supporting
+        self.demand = demand
+        self.priority = priority
+        self.submitted = submitted
+        self.started = None
+        self.manager = None
+        self.overflow = False
+
+class Archi3TaskScheduler:
+    """Per-manager priority heaps, admitted against each manager's capacity
+
+    A task waits in its primary manager's heap. When that manager's backlog has reached the
+    queue-length threshold, the task is also offered to its supporting managers: it starts on
+    one with free capacity straight away, or sits in their overflow heaps until one frees up.
+    Heap entries of tasks that started elsewhere are skipped lazily, so every reassignment is
+    a heap push or pop.
+    """
+
+    def __init__(self, capacities: Dict[str, float], queue_threshold: int = 10,
+                 capacity_threshold: float = 0.8, overflow: bool = True):
+        self.capacities = dict(capacities)
+        self.queue_threshold = queue_threshold
+        self.capacity_threshold = capacity_threshold
+        self.overflow = overflow
+
+        self.load = {manager: 0.0 for manager in capacities}
+        self.backlog = {manager: 0 for manager in capacities}
+        self._queues = {manager: [] for manager in capacities}
+        self._overflow_queues = {manager: [] for manager in capacities}
+        self._tasks = {}
+        self._sequence = 0
+        self.reassigned = 0
+
+    @classmethod
+    def from_policies(cls, policies_dir: str, environment: str, base_capacity: float = 16,
+                      **kwargs) -> "Archi3TaskScheduler":
+        """Capacities from agent resource-requirements, thresholds from dynamic-allocation"""
+        policy = Archi3PolicyResolver(policies_dir).load_effective(environment)
+        managers = policy.get("agent-policies", {}).get("agents", {}).get("managers", {})
+        capacities = {}
+        for name, agent in managers.items():
+            requirements = agent.get("resource-requirements") or {}
+            weights = [RESOURCE_WEIGHTS.get(str(level), RESOURCE_WEIGHTS["medium"]) for level in requirements.values()]
+            intensity = sum(weights) / len(weights) if weights else RESOURCE_WEIGHTS["medium"]
+            capacities[agent.get("id", f"@{name}")] = base_capacity * RESOURCE_WEIGHTS["medium"] / intensity
+
+        allocation = policy.get("orchestration-policies", {}).get("resource-management", {}).get("dynamic-allocation", {})
+        thresholds = allocation.get("real-time-monitoring", {}).get("alert-thresholds", {})
+        queuing = allocation.get("intelligent-queuing", {})
+        kwargs.setdefault("queue_threshold", _leading_number(thresholds.get("queue-length"), 10))
+        kwargs.setdefault("capacity_threshold", _leading_number(thresholds.get("capacity"), 80) / 100)
+        kwargs.setdefault("overflow", queuing.get("overflow-strategy") == "alternative-agent-assignment")
+        return cls(capacities, **kwargs)
+
+    def submit(self, task_id: str, primary: str, supporting: List[str] = (), demand: float = 1,
+               priority: Any = "normal", now: float = 0.0) -> Dict[str, Any]:
+        """Start a task on its primary manager or a supporting one, or queue it"""
+        if primary not in self.capacities:
+            raise ValueError(f"Unknown manager: {primary}")
+        if demand > self.capacities[primary]:
+            raise ValueError(f"Task {task_id} needs {demand} units, {primary} has {self.capacities[primary]:g}")
+        if task_id in self._tasks:
+            raise ValueError(f"Duplicate task id: {task_id}")
+
+        priority = PRIORITIES[priority] if isinstance(priority, str) else priority
+        supporting = tuple(manager for manager in supporting
+                           if manager in self.capacities and manager != primary and demand <= self.capacities[manager])
+        task = _Task(task_id, primary, supporting, demand, priority, now)
+        self._tasks[task_id] = task
+
+        # Strict priority per manager: only start at once if nothing is waiting ahead
+        if self.backlog[primary] == 0 and self._fits(primary, demand):
+            self._start(task, primary, now)
+            return {"task": task_id, "status": "running", "manager": primary}
+
+        if self.overflow and supporting and self.backlog[primary] >= self.queue_threshold:
+            task.overflow = True
+            for manager in supporting:
+                if self.backlog[manager] == 0 and self._fits(manager, demand):
+                    self._start(task, manager, now)
+                    return {"task": task_id, "status": "running", "manager": manager, "reassigned": True}
+
+        self._enqueue(task)
+        return {"task": task_id, "status": "queued", "manager": primary, "position": self.backlog[primary]}
+
+    def complete(self, task_id: str, now: float = 0.0) -> List[Dict[str, Any]]:
+        """Release a finished task's capacity and start whatever now fits"""
+        task = self._tasks.get(task_id)
+        if task is None:
+            raise ValueError(f"Unknown task id: {task_id}")
+        if task.started is None:
+            raise ValueError(f"Task {task_id} has not started")
+        # Only forget the task once it is known to be running, so a rejected call changes nothing
+        del self._tasks[task_id]
+        manager = task.manager
+        self.load[manager] -= task.demand
+        return self._dispatch(manager, now)
+
+    def alerts(self) -> List[Dict[str, Any]]:
+        """Managers over the capacity or queue-length alert thresholds"""
+        alerts = []
+        for manager, capacity in self.capacities.items():
+            utilization = self.load[manager] / capacity
+            if utilization > self.capacity_threshold:
+                alerts.append({"manager": manager, "metric": "agent-capacity", "value": round(utilization, 3),
+                               "threshold": self.capacity_threshold})
+            if self.backlog[manager] > self.queue_threshold:
+                alerts.append({"manager": manager, "metric": "queue-length", "value": self.backlog[manager],
+                               "threshold": self.queue_threshold})
+        return alerts
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "managers": {manager: {"capacity": round(capacity, 2), "load": self.load[manager],
+                                   "queued": self.backlog[manager]}
+                         for manager, capacity in self.capacities.items()},
+            "tasks": len(self._tasks),
+            "reassigned": self.reassigned
+        }
+
+    def task(self, task_id: str) -> Optional[Dict[str, Any]]:
+        task = self._tasks.get(task_id)
+        if task is None:
+            return None
+        return {"task": task.task_id, "primary": task.primary, "manager": task.manager,
+                "priority": task.priority, "demand": task.demand, "submitted": task.submitted,
+                "started": task.started}
+
+    def _fits(self, manager: str, demand: float) -> bool:
+        return self.load[manager] + demand <= self.capacities[manager] + 1e-9
+
+    def _enqueue(self, task: _Task):
+        self._sequence += 1
+        entry = (-task.priority, self._sequence, task)
+        heapq.heappush(self._queues[task.primary], entry)
+        self.backlog[task.primary] += 1
+        if task.overflow:
+            for manager in task.supporting:
+                heapq.heappush(self._overflow_queues[manager], entry)
+
+    def _start(self, task: _Task, manager: str, now: float):
+        task.started = now
+        task.manager = manager
+        self.load[manager] += task.demand
+        if manager != task.primary:
+            self.reassigned += 1
+
+    def _dispatch(self, manager: str, now: float) -> List[Dict[str, Any]]:
+        """Start the manager's own queued tasks in priority order, then overflow from others"""
+        started = []
+        queue = self._queues[manager]
+        while queue:
+            _, _, task = queue[0]
+            if task.started is not None:
+                heapq.heappop(queue)
+                continue
+            if not self._fits(manager, task.demand):
+                # The head waits for capacity and nothing in this queue may overtake it, but
+                # other managers' overflow does not wait behind it
+                break
+            heapq.heappop(queue)
+            self.backlog[manager] -= 1
+            self._start(task, manager, now)
+            started.append({"task": task.task_id, "manager": manager, "waited": now - task.submitted})
+
+        overflow = self._overflow_queues[manager]
+        while overflow:
+            _, _, task = overflow[0]
+            if task.started is not None:
+                heapq.heappop(overflow)
+                continue
+            if not self._fits(manager, task.demand):
+                break
+            heapq.heappop(overflow)
+            # Its entry in the primary's heap is now stale and skipped when reached
+            self.backlog[task.primary] -= 1
+            self._start(task, manager, now)
+            started.append({"task": task.task_id, "manager": manager, "waited": now - task.submitted,
+                            "reassigned": True})
+        return started
+
+def _leading_number(value: Any, default: float) -> float:
+    match = re.match(r"\s*(\d+(?:\.\d+)?)", str(value)) if value is not None else None
+    return float(match.group(1)) if match else default
+
+def simulate(scheduler: Archi3TaskScheduler, routing_tables: Dict[str, Any], tasks: int = 20000,
+             load: float = 0.7, seed: int = 42) -> Dict[str, Any]:
+    """Replay a synthetic Poisson task stream and report throughput and wait-time percentiles
+
+    Domains are drawn uniformly from the routing tables and complexity levels with the weights
+    below; service times are exponential with a per-level mean, in hours. load sets the arrival
+    rate as the utilization of the busiest primary manager's packable capacity: a manager fits
+    only whole tasks, so one with 12.8 units runs a single 8-unit task, and the nominal capacity
+    would overstate what it can serve. The report gives the utilization each manager reached.
+    """
+    rng = random.Random(seed)
+    levels = {
+        "simple": (0.5, 4.0),
+        "moderate": (0.3, 24.0),
+        "complex": (0.15, 80.0),
+        "enterprise": (0.05, 240.0)
+    }
+    demands = {level: DEMAND_UNITS[routing_tables["complexity"][level]["resource-requirements"]]
+               for level in levels}
+    routes = [(domain["primary-manager"], domain["supporting-managers"])
+              for domain in routing_tables["domains"].values() if domain["primary-manager"] in scheduler.capacities]
+    names = list(levels)
+    weights = [levels[name][0] for name in names]
+
+    # Arrivals are paced so the busiest primary manager would be at load utilization on its own.
+    # Each level's work is served at most at the capacity its whole tasks can fill on that manager.
+    work = {name: levels[name][0] * levels[name][1] * demands[name] for name in names}
+    share = {}
+    for primary, _ in routes:
+        share[primary] = share.get(primary, 0) + 1 / len(routes)
+
+    def hours_per_task(manager: str) -> float:
+        capacity = scheduler.capacities[manager]
+        return sum(work[name] / (capacity // demands[name] * demands[name]) for name in names)
+
+    arrival_rate = load * min(1 / (fraction * hours_per_task(manager)) for manager, fraction in share.items())
+
+    events = []
+    clock = 0.0
+    for i in range(tasks):
+        clock += rng.expovariate(arrival_rate)
+        level = rng.choices(names, weights)[0]
+        primary, supporting = rng.choice(routes)
+        priority = rng.choices([0, 1, 2, 3], [0.2, 0.6, 0.15, 0.05])[0]
+        duration = rng.expovariate(1.0 / levels[level][1])
+        heapq.heappush(events, (clock, 1, f"task-{i}", (primary, supporting, demands[level], priority, duration)))
+
+    durations = {}
+    priorities = {}
+    waits = []
+    by_priority = {}
+    max_backlog = 0
+    alerts = 0
+    operations = 0
+    finished_at = 0.0
+    last_event = 0.0
+    busy = {manager: 0.0 for manager in scheduler.capacities}
+    started_at = time.perf_counter()
+
+    def record(task_id: str, waited: float, now: float):
+        waits.append(waited)
+        by_priority.setdefault(priorities[task_id], []).append(waited)
+        heapq.heappush(events, (now + durations.pop(task_id), 0, task_id, None))
+
+    while events:
+        now, kind, task_id, payload = heapq.heappop(events)
+        operations += 1
+        for manager, used in scheduler.load.items():
+            busy[manager] += used * (now - last_event)
+        last_event = now
+        if kind == 1:
+            primary, supporting, demand, priority, duration = payload
+            durations[task_id] = duration
+            priorities[task_id] = priority
+            result = scheduler.submit(task_id, primary, supporting, demand, priority, now)
+            if result["status"] == "running":
+                record(task_id, 0.0, now)
+            max_backlog = max(max_backlog, max(scheduler.backlog.values()))
+            if operations % 100 == 0 and scheduler.alerts():
+                alerts += 1
+        else:
+            finished_at = now
+            for started in scheduler.complete(task_id, now):
+                record(started["task"], started["waited"], now)
+    elapsed = time.perf_counter() - started_at
+
+    def percentile(values: List[float], fraction: float) -> float:
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 3)
+
+    return {
+        "tasks": tasks,
+        "load": load,
+        "simulated_hours": round(finished_at, 1),
+        "throughput_tasks_per_hour": round(tasks / finished_at, 3) if finished_at else None,
+        "wait_hours": {"p50": percentile(waits, 0.50), "p95": percentile(waits, 0.95),
+                       "p99": percentile(waits, 0.99), "max": percentile(waits, 1.0)},
+        "wait_hours_p99_by_priority": {str(priority): percentile(values, 0.99)
+                                       for priority, values in sorted(by_priority.items())},
+        "utilization": {manager: round(busy[manager] / (capacity * finished_at), 3) if finished_at else 0.0
+                        for manager, capacity in scheduler.capacities.items()},
+        "reassigned": scheduler.reassigned,
+        "max_backlog": max_backlog,
+        "alert_samples": alerts,
+        "scheduler_operations_per_second": round(operations / elapsed) if elapsed else None
+    }
+
+def main():
+    """Main CLI interface for task scheduling"""
+    parser = argparse.ArgumentParser(description="Archi3 Task Scheduler")
+    parser.add_argument("--policies-dir", default="./archi3/policies",
+                       help="Path to policies directory")
+    parser.add_argument("--environment", "-e", required=True,
+                       help="Environment whose agent and orchestration policies apply")
+    parser.add_argument("--simulate", type=int, metavar="TASKS",
+                       help="Replay a synthetic stream of this many tasks")
+    parser.add_argument("--load", type=float, default=0.7,
+                       help="Simulated utilization of the busiest primary manager")
+    parser.add_argument("--base-capacity", type=float, default=16,
+                       help="Capacity units of a manager with medium resource requirements")
+    parser.add_argument("--no-overflow", action="store_true",
+                       help="Never reassign tasks to supporting managers")
+    parser.add_argument("--seed", type=int, default=42, help="Simulation random seed")
+    parser.add_argument("--verbose", "-v", action="store_true",
+                       help="Verbose output")
+
+    args = parser.parse_args()
+
+    if args.verbose:
+        logging.getLogger().setLevel(logging.DEBUG)
+
+    try:
+        kwargs = {"overflow": False} if args.no_overflow else {}
+        scheduler = Archi3TaskScheduler.from_policies(args.policies_dir, args.environment,
+                                                      base_capacity=args.base_capacity, **kwargs)
+        if args.simulate:
+            routing_tables = Archi3PolicyGenerator(args.policies_dir).load_routing_tables()
+            print(json.dumps(simulate(scheduler, routing_tables, args.simulate, args.load, args.seed), indent=2))
+        else:
+            print(json.dumps(scheduler.stats(), indent=2))
+
+    except Exception as e:
+        logger.error(f"Scheduling failed: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
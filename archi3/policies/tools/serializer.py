@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Archi3 Policy Serializer
+Fast, order-preserving YAML serialization for generated policies
+"""
+
+import yaml
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, List
+import logging
+
+try:
+    from yaml import CSafeDumper as PolicyDumper
+    LIBYAML_AVAILABLE = True
+except ImportError:
+    from yaml import SafeDumper as PolicyDumper
+    LIBYAML_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+DUMP_OPTIONS = {
+    "Dumper": PolicyDumper,
+    "default_flow_style": False,
+    "sort_keys": False
+}
+
+def _dump_chunk(documents: List[Any]) -> List[str]:
+    """Serialize a chunk of documents (runs in a worker process)"""
+    return [yaml.dump(document, **DUMP_OPTIONS) for document in documents]
+
+class Archi3PolicySerializer:
+    """Serialize policies to YAML with libyaml when available, in parallel for large batches"""
+
+    def __init__(self, workers: int = None, min_parallel: int = 256, chunk_size: int = 64):
+        self.workers = workers or os.cpu_count() or 1
+        self.min_parallel = min_parallel
+        self.chunk_size = chunk_size
+
+    @property
+    def uses_libyaml(self) -> bool:
+        return LIBYAML_AVAILABLE
+
+    def dump(self, document: Any) -> str:
+        """Serialize one document, keeping key order"""
+        return yaml.dump(document, **DUMP_OPTIONS)
+
+    def dump_many(self, documents: List[Any]) -> List[str]:
+        """Serialize independent documents, spreading large batches across worker processes"""
+        if self.workers <= 1 or len(documents) < self.min_parallel:
+            return _dump_chunk(documents)
+
+        chunks = [documents[i:i + self.chunk_size] for i in range(0, len(documents), self.chunk_size)]
+        logger.debug(f"Serializing {len(documents)} documents in {len(chunks)} chunks on {self.workers} workers")
+
+        texts = []
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            for chunk_texts in executor.map(_dump_chunk, chunks):
+                texts.extend(chunk_texts)
+        return texts
+
+    def dump_stream(self, documents: List[Any]) -> str:
+        """Serialize documents into a single multi-document YAML stream"""
+        return "".join(f"---\n{text}" for text in self.dump_many(documents))
+
+    def load_stream(self, text: str) -> List[Any]:
+        """Load every document of a multi-document YAML stream"""
+        loader = yaml.CSafeLoader if LIBYAML_AVAILABLE else yaml.SafeLoader
+        return list(yaml.load_all(text, Loader=loader))
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Archi3 Tracing
+Span tracing exported as OpenTelemetry-shaped JSON lines
+"""
+
+import json
+import os
+import fcntl
+import time
+import contextvars
+from pathlib import Path
+from typing import Dict, Any, Optional, List
+from contextlib import contextmanager
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Innermost open span of the current thread or task; copy the context to carry it into worker threads
+_current_span = contextvars.ContextVar("archi3_current_span", default=None)
+
+class Archi3Span:
+    """One timed operation within a trace"""
+
+    def __init__(self, name: str, trace_id: str, parent_span_id: Optional[str],
+                 attributes: Dict[str, Any] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_span_id = parent_span_id
+        self.attributes = dict(attributes or {})
+        self.status_code = "STATUS_CODE_OK"
+        self.status_message = ""
+        self.start_time_ns = time.time_ns()
+        self.end_time_ns = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_error(self, message: str):
+        self.status_code = "STATUS_CODE_ERROR"
+        self.status_message = message
+
+    def end(self):
+        if self.end_time_ns is None:
+            self.end_time_ns = time.time_ns()
+
+    def to_otel(self, service_name: str) -> Dict[str, Any]:
+        """Render the span like an OTLP/JSON span, with its resource inlined"""
+        return {
+            "resource": {"attributes": [_otel_attribute("service.name", service_name)]},
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_span_id or "",
+            "name": self.name,
+            "kind": "SPAN_KIND_INTERNAL",
+            "startTimeUnixNano": str(self.start_time_ns),
+            "endTimeUnixNano": str(self.end_time_ns),
+            "attributes": [_otel_attribute(key, value) for key, value in self.attributes.items()],
+            "status": {"code": self.status_code, "message": self.status_message}
+        }
+
+class Archi3Tracer:
+    """Create nested spans and append finished ones to a JSONL trace file"""
+
+    def __init__(self, trace_path: str, service_name: str = "archi3-deployer"):
+        self.trace_path = Path(trace_path)
+        self.service_name = service_name
+
+    @contextmanager
+    def span(self, name: str, attributes: Dict[str, Any] = None):
+        """Time a block as a child of the current span, or as the root of a new trace"""
+        parent = _current_span.get()
+        span = Archi3Span(name, parent.trace_id if parent else os.urandom(16).hex(),
+                          parent.span_id if parent else None, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set_error(str(e))
+            raise
+        finally:
+            span.end()
+            _current_span.reset(token)
+            self._export(span)
+
+    def current_span(self) -> Optional[Archi3Span]:
+        return _current_span.get()
+
+    def read_trace(self, trace_id: str) -> List[Dict[str, Any]]:
+        """Load every span of a trace, ordered by start time"""
+        if not self.trace_path.exists():
+            return []
+
+        spans = []
+        with open(self.trace_path, 'r') as f:
+            for line in f:
+                # Cheap substring test before parsing, most lines belong to other traces
+                if trace_id not in line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record["traceId"] == trace_id:
+                    spans.append(record)
+        return sorted(spans, key=lambda record: int(record["startTimeUnixNano"]))
+
+    def find_trace_id(self, key: str, value: str) -> Optional[str]:
+        """Trace ID of the most recent span carrying attribute key == value"""
+        if not self.trace_path.exists():
+            return None
+
+        found = None
+        with open(self.trace_path, 'r') as f:
+            for line in f:
+                if value not in line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if attribute_values(record).get(key) == value:
+                    found = record["traceId"]
+        return found
+
+    def critical_path(self, spans: List[Dict[str, Any]], root_span_id: str = None) -> List[Dict[str, Any]]:
+        """Spans that determined the end time of the root, in start order
+
+        Working back from a span's end, the child that finished last is critical, then the
+        child that finished last before that one started, and so on; the same applies to
+        each critical child in turn.
+        """
+        children = {}
+        for record in spans:
+            children.setdefault(record["parentSpanId"], []).append(record)
+
+        if root_span_id:
+            root = next((record for record in spans if record["spanId"] == root_span_id), None)
+        else:
+            span_ids = {record["spanId"] for record in spans}
+            root = next((record for record in spans if record["parentSpanId"] not in span_ids), None)
+        if root is None:
+            return []
+
+        path = []
+        def visit(node):
+            path.append(node)
+            cursor = int(node["endTimeUnixNano"])
+            chosen = []
+            for child in sorted(children.get(node["spanId"], []),
+                                key=lambda record: int(record["endTimeUnixNano"]), reverse=True):
+                if int(child["endTimeUnixNano"]) <= cursor:
+                    chosen.append(child)
+                    cursor = int(child["startTimeUnixNano"])
+            for child in reversed(chosen):
+                visit(child)
+
+        visit(root)
+        return path
+
+    def _export(self, span: Archi3Span):
+        line = json.dumps(span.to_otel(self.service_name), sort_keys=True) + "\n"
+        try:
+            self.trace_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.trace_path, 'a') as f:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                try:
+                    f.write(line)
+                finally:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        except OSError as e:
+            # Tracing must never fail the operation being traced
+            logger.warning(f"Could not export span {span.name}: {e}")
+
+def attribute_values(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn a span record's OTel attribute list back into a plain dict"""
+    values = {}
+    for attribute in record.get("attributes", []):
+        (kind, value), = attribute["value"].items()
+        values[attribute["key"]] = int(value) if kind == "intValue" else value
+    return values
+
+def _otel_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Archi3 Deployment Transport
+Delta-sync policy files to deployment targets as a single tar stream
+"""
+
+import abc
+import io
+import json
+import os
+import shutil
+import struct
+import hashlib
+import tarfile
+import tempfile
+from pathlib import Path, PurePosixPath
+from typing import Dict, Any, Set, BinaryIO, List, Optional, Tuple
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Archi3BlockDelta:
+    """rsync-style block delta: rebuild a changed file from the blocks the target already holds"""
+
+    # Delta opcodes: copy block <index> of the deployed file, or insert <length> literal bytes
+    COPY = b"C"
+    LITERAL = b"L"
+    OPERAND = struct.Struct(">Q")
+
+    def __init__(self, block_size: int = 2048):
+        self.block_size = block_size
+
+    def signatures(self, data: bytes) -> List[Tuple[int, bytes]]:
+        """Weak rolling checksum and sha256 of every block of the deployed file"""
+        return [(self._weak(data[i:i + self.block_size]), hashlib.sha256(data[i:i + self.block_size]).digest())
+                for i in range(0, len(data), self.block_size)]
+
+    def encode(self, data: bytes, signatures: List[Tuple[int, bytes]]) -> bytes:
+        """Describe data as copies of matching deployed blocks plus the literal bytes between them"""
+        size = self.block_size
+        blocks = {}
+        for index, (weak, strong) in enumerate(signatures):
+            blocks.setdefault(weak, {}).setdefault(strong, index)
+
+        delta = bytearray()
+        literal_start = position = 0
+        weak = self._weak(data[:size])
+        while position + size <= len(data):
+            candidates = blocks.get(weak)
+            if candidates:
+                index = candidates.get(hashlib.sha256(data[position:position + size]).digest())
+                if index is not None:
+                    self._literal(delta, data[literal_start:position])
+                    delta += self.COPY + self.OPERAND.pack(index)
+                    position += size
+                    literal_start = position
+                    weak = self._weak(data[position:position + size])
+                    continue
+
+            # Roll the window one byte forward without rehashing the whole block
+            if position + size < len(data):
+                a, b = weak & 0xffff, weak >> 16
+                outgoing, incoming = data[position], data[position + size]
+                a = (a - outgoing + incoming) & 0xffff
+                b = (b - size * outgoing + a) & 0xffff
+                weak = (b << 16) | a
+            position += 1
+
+        self._literal(delta, data[literal_start:])
+        return bytes(delta)
+
+    def decode(self, delta: bytes, base: bytes) -> bytes:
+        """Rebuild the new file from its delta and the deployed file it was computed against"""
+        output = bytearray()
+        position = 0
+        while position < len(delta):
+            opcode = delta[position:position + 1]
+            (operand,) = self.OPERAND.unpack_from(delta, position + 1)
+            position += 1 + self.OPERAND.size
+            if opcode == self.COPY:
+                output += base[operand * self.block_size:(operand + 1) * self.block_size]
+            elif opcode == self.LITERAL:
+                output += delta[position:position + operand]
+                position += operand
+            else:
+                raise ValueError(f"Unknown delta opcode {opcode!r}")
+        return bytes(output)
+
+    def _literal(self, delta: bytearray, data: bytes):
+        if data:
+            delta += self.LITERAL + self.OPERAND.pack(len(data)) + data
+
+    def _weak(self, block: bytes) -> int:
+        a = sum(block) & 0xffff
+        b = sum((len(block) - i) * byte for i, byte in enumerate(block)) & 0xffff
+        return (b << 16) | a
+
+class Archi3DeployTarget(abc.ABC):
+    """Interface of a deployment target that accepts delta updates"""
+
+    # Tar members carrying this pax header hold a block delta against the deployed file, not its content
+    DELTA_HEADER = "ARCHI3.delta-block-size"
+
+    @abc.abstractmethod
+    def manifest(self) -> Dict[str, str]:
+        """Map every file currently deployed on the target to its sha256"""
+
+    @abc.abstractmethod
+    def apply(self, stream: BinaryIO, manifest: Dict[str, str]) -> Dict[str, Any]:
+        """Atomically make the target hold exactly manifest, taking changed files from the tar stream"""
+
+    def block_signatures(self, rel: str, block_size: int) -> Optional[List[Tuple[int, bytes]]]:
+        """Block signatures of a deployed file; targets that cannot apply block deltas return None"""
+        return None
+
+    def describe(self) -> str:
+        return self.__class__.__name__
+
+class LocalDirectoryTarget(Archi3DeployTarget):
+    """Deploy into versioned snapshots under a directory, switched by a current symlink"""
+
+    CURRENT = "current"
+    MANIFEST = ".archi3-manifest.json"
+
+    def __init__(self, target_dir: str, keep_versions: int = 3):
+        self.target_dir = Path(target_dir)
+        self.versions_dir = self.target_dir / ".versions"
+        self.keep_versions = keep_versions
+
+    def describe(self) -> str:
+        return str(self.target_dir)
+
+    def current_path(self) -> Path:
+        """Path readers on the target use to reach the deployed files"""
+        return self.target_dir / self.CURRENT
+
+    def manifest(self) -> Dict[str, str]:
+        manifest_path = self.current_path() / self.MANIFEST
+        if not manifest_path.exists():
+            return {}
+        with open(manifest_path, 'r') as f:
+            return json.load(f)
+
+    def block_signatures(self, rel: str, block_size: int) -> Optional[List[Tuple[int, bytes]]]:
+        deployed = self.current_path() / rel
+        if not deployed.is_file():
+            return None
+        with open(deployed, 'rb') as f:
+            return Archi3BlockDelta(block_size).signatures(f.read())
+
+    def apply(self, stream: BinaryIO, manifest: Dict[str, str]) -> Dict[str, Any]:
+        self.versions_dir.mkdir(parents=True, exist_ok=True)
+        version = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        staging_dir = self.versions_dir / f".staging-{version}"
+        staging_dir.mkdir()
+
+        try:
+            received = self._extract(stream, staging_dir, manifest)
+
+            # Unchanged files are hardlinked from the deployed version, so no bytes are copied
+            current_dir = self.current_path()
+            linked = 0
+            for rel in manifest:
+                if rel in received:
+                    continue
+                source = current_dir / rel
+                if not source.is_file():
+                    raise FileNotFoundError(f"Target is missing unchanged file {rel}; resync required")
+                target = staging_dir / rel
+                target.parent.mkdir(parents=True, exist_ok=True)
+                os.link(source.resolve(), target)
+                linked += 1
+
+            with open(staging_dir / self.MANIFEST, 'w') as f:
+                json.dump(manifest, f, indent=2, sort_keys=True)
+
+            os.rename(staging_dir, self.versions_dir / version)
+        except BaseException:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            raise
+
+        tmp_link = self.target_dir / f".{self.CURRENT}.{os.getpid()}.tmp"
+        if tmp_link.is_symlink() or tmp_link.exists():
+            tmp_link.unlink()
+        os.symlink(os.path.join(self.versions_dir.name, version), tmp_link)
+        os.replace(tmp_link, self.current_path())
+
+        self._prune_versions(version)
+        return {"version": version, "received": len(received), "linked": linked}
+
+    def _extract(self, stream: BinaryIO, staging_dir: Path, manifest: Dict[str, str]) -> Set[str]:
+        """Unpack regular files from the tar stream, checking each against the manifest"""
+        received = set()
+        with tarfile.open(fileobj=stream, mode="r|*") as tar:
+            for member in tar:
+                rel = PurePosixPath(member.name)
+                if not member.isfile() or rel.is_absolute() or ".." in rel.parts:
+                    raise ValueError(f"Refusing tar member {member.name}")
+                if member.name not in manifest:
+                    raise ValueError(f"Tar member {member.name} is not in the manifest")
+
+                target = staging_dir / member.name
+                target.parent.mkdir(parents=True, exist_ok=True)
+                digest = hashlib.sha256()
+                with tar.extractfile(member) as source, open(target, 'wb') as f:
+                    if self.DELTA_HEADER in member.pax_headers:
+                        source = io.BytesIO(self._apply_delta(member, source.read()))
+                    for block in iter(lambda: source.read(1024 * 1024), b""):
+                        digest.update(block)
+                        f.write(block)
+                    f.flush()
+                    os.fsync(f.fileno())
+                if digest.hexdigest() != manifest[member.name]:
+                    raise ValueError(f"Checksum mismatch for {member.name}")
+                os.chmod(target, 0o644)
+                received.add(member.name)
+        return received
+
+    def _apply_delta(self, member: tarfile.TarInfo, delta: bytes) -> bytes:
+        """Rebuild a file sent as a block delta from the currently deployed copy"""
+        deployed = self.current_path() / member.name
+        if not deployed.is_file():
+            raise FileNotFoundError(f"Target is missing the base of delta {member.name}; resync required")
+        with open(deployed, 'rb') as f:
+            base = f.read()
+        return Archi3BlockDelta(int(member.pax_headers[self.DELTA_HEADER])).decode(delta, base)
+
+    def _prune_versions(self, current_version: str):
+        versions = sorted(path.name for path in self.versions_dir.iterdir()
+                          if path.is_dir() and not path.name.startswith("."))
+        for version in versions[:max(0, len(versions) - self.keep_versions)]:
+            if version != current_version:
+                shutil.rmtree(self.versions_dir / version)
+
+class Archi3DeltaSync:
+    """Send only the files whose content differs from what a target already has"""
+
+    def __init__(self, block_size: int = 2048, min_delta_size: int = 64 * 1024):
+        self.block_size = block_size
+        self.min_delta_size = min_delta_size
+
+    def sync(self, target: Archi3DeployTarget, files: Dict[str, Path]) -> Dict[str, Any]:
+        """Make target hold exactly files (target-relative path -> local file)"""
+        local = {rel: self._file_digest(Path(path)) for rel, path in files.items()}
+        remote = target.manifest()
+
+        changed = sorted(rel for rel, digest in local.items() if remote.get(rel) != digest)
+        deleted = sorted(rel for rel in remote if rel not in local)
+        result = {
+            "target": target.describe(),
+            "changed": changed,
+            "deleted": deleted,
+            "unchanged": len(local) - len(changed),
+            "delta": [],
+            "bytes_sent": 0
+        }
+        if not changed and not deleted:
+            logger.info(f"Target {target.describe()} is up to date")
+            return result
+
+        with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as stream:
+            with tarfile.open(fileobj=stream, mode="w|gz") as tar:
+                for rel in changed:
+                    # Add as plain files: release files share inodes and would otherwise become tar hardlinks
+                    with open(files[rel], 'rb') as f:
+                        info = tarfile.TarInfo(rel)
+                        info.size = os.fstat(f.fileno()).st_size
+                        info.mtime = int(os.fstat(f.fileno()).st_mtime)
+                        info.mode = 0o644
+                        delta = self._block_delta(target, rel, f, info.size) if rel in remote else None
+                        if delta is not None:
+                            info.size = len(delta)
+                            info.pax_headers = {target.DELTA_HEADER: str(self.block_size)}
+                            tar.addfile(info, io.BytesIO(delta))
+                            result["delta"].append(rel)
+                        else:
+                            tar.addfile(info, f)
+            result["bytes_sent"] = stream.tell()
+            stream.seek(0)
+            result.update(target.apply(stream, local))
+
+        logger.info(f"Synced {len(changed)} changed and {len(deleted)} deleted files to "
+                    f"{target.describe()} ({result['bytes_sent']} bytes)")
+        return result
+
+    def _block_delta(self, target: Archi3DeployTarget, rel: str, f: BinaryIO, size: int) -> Optional[bytes]:
+        """Delta of a large changed file against the target's copy, when that is smaller than the file"""
+        if size < self.min_delta_size:
+            return None
+        signatures = target.block_signatures(rel, self.block_size)
+        if not signatures:
+            return None
+
+        delta = Archi3BlockDelta(self.block_size).encode(f.read(), signatures)
+        f.seek(0)
+        return delta if len(delta) < size else None
+
+    def _file_digest(self, path: Path) -> str:
+        with open(path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
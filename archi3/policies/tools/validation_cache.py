@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Archi3 Validation Cache
+Fingerprints of policy trees that have passed full validation
+"""
+
+import json
+import os
+import hashlib
+import tempfile
+from pathlib import Path
+from typing import Dict, Any, Optional
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Archi3ValidationCache:
+    """Record which tree contents passed validation so identical trees need not be validated again"""
+
+    # Sources that determine the validation outcome: component -> (directory, glob)
+    CONTENT_SOURCES = [("core", "*.yaml"), ("environments", "*.yaml"), ("templates", "*.yaml")]
+    SCHEMA_SOURCES = [("validation/schema", "*.json")]
+    RULE_SOURCES = [("validation/rules", "**/*")]
+
+    def __init__(self, policies_dir: str, max_entries: int = 100):
+        self.policies_dir = Path(policies_dir)
+        self.tools_dir = Path(__file__).resolve().parent
+        self.cache_path = self.policies_dir / "deployments" / "validation-fingerprints.json"
+        self.max_entries = max_entries
+
+    def fingerprint(self) -> Dict[str, str]:
+        """Fingerprint the policy content, schemas, custom rules and validator version"""
+        components = {
+            "content": self._hash_sources(self.CONTENT_SOURCES),
+            "schemas": self._hash_sources(self.SCHEMA_SOURCES),
+            "rules": self._hash_sources(self.RULE_SOURCES),
+            "validator": self._validator_version()
+        }
+        combined = hashlib.sha256(json.dumps(components, sort_keys=True).encode("utf-8")).hexdigest()
+        return {"fingerprint": combined, **components}
+
+    def lookup(self, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """Return the record of a passed validation with this fingerprint, if any"""
+        return self._load().get(fingerprint)
+
+    def record(self, fingerprint: Dict[str, str], summary: Dict[str, Any]):
+        """Remember that a tree with this fingerprint passed validation"""
+        entries = self._load()
+        entries.pop(fingerprint["fingerprint"], None)
+        entries[fingerprint["fingerprint"]] = {
+            "validated_at": datetime.now().isoformat(),
+            "components": {key: value for key, value in fingerprint.items() if key != "fingerprint"},
+            "summary": summary
+        }
+
+        # Keep only the most recently recorded fingerprints
+        for stale in list(entries)[:max(0, len(entries) - self.max_entries)]:
+            del entries[stale]
+        self._write(entries)
+
+    def _hash_sources(self, sources: list) -> str:
+        """Hash relative paths and contents of every file matched by sources"""
+        digest = hashlib.sha256()
+        for directory, pattern in sources:
+            base = self.policies_dir / directory
+            if not base.exists():
+                continue
+            for path in sorted(base.glob(pattern)):
+                if not path.is_file():
+                    continue
+                with open(path, 'rb') as f:
+                    content_digest = hashlib.sha256(f.read()).hexdigest()
+                digest.update(f"{path.relative_to(self.policies_dir).as_posix()}\0{content_digest}\n".encode("utf-8"))
+        return digest.hexdigest()
+
+    def _validator_version(self) -> str:
+        """Hash the validator's own code and the jsonschema release it runs on"""
+        digest = hashlib.sha256()
+        for name in ["validator.py", "validation_cache.py"]:
+            path = self.tools_dir / name
+            if path.exists():
+                with open(path, 'rb') as f:
+                    digest.update(f.read())
+        try:
+            from importlib.metadata import version, PackageNotFoundError
+            digest.update(f"jsonschema=={version('jsonschema')}".encode("utf-8"))
+        except PackageNotFoundError:
+            digest.update(b"jsonschema missing")
+        return digest.hexdigest()
+
+    def _load(self) -> Dict[str, Any]:
+        if not self.cache_path.exists():
+            return {}
+        try:
+            with open(self.cache_path, 'r') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable validation cache {self.cache_path}: {e}")
+            return {}
+
+    def _write(self, entries: Dict[str, Any]):
+        """Write the cache through a temp file and atomic rename"""
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(prefix=f".{self.cache_path.name}.", suffix=".tmp",
+                                        dir=str(self.cache_path.parent))
+        try:
+            os.fchmod(fd, 0o644)
+            with os.fdopen(fd, 'w') as f:
+                json.dump(entries, f, indent=2)
+            os.replace(tmp_name, self.cache_path)
+        except BaseException:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            raise
@@ -15,6 +15,9 @@ from datetime import datetime
 import argparse
 import logging
 
+sys.path.append(str(Path(__file__).resolve().parent))
+from validation_cache import Archi3ValidationCache
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -29,11 +32,14 @@ class Archi3PolicyValidator:
         self.errors = []
         self.warnings = []
         self.validation_results = {}
+        self.validation_cache = Archi3ValidationCache(str(self.policies_dir))
         
     def validate_all(self) -> Dict[str, Any]:
         """Validate all policies in the policies directory"""
         logger.info("Starting comprehensive policy validation")
         
+        fingerprint = self.validation_cache.fingerprint()
+        
         # Load all schemas
         schemas = self._load_schemas()
         
@@ -54,6 +60,12 @@ class Archi3PolicyValidator:
             core_policies, env_policies, template_policies, cross_validation
         )
         
+        # Record the pass only if nothing changed while validating
+        if (report["validation_summary"]["overall_status"] == "PASSED" and
+                self.validation_cache.fingerprint() == fingerprint):
+            self.validation_cache.record(fingerprint, report["validation_summary"])
+            report["validation_summary"]["fingerprint"] = fingerprint["fingerprint"]
+        
         return report
     
     def validate_specific(self, policy_type: str, policy_name: str = None) -> Dict[str, Any]: